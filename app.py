@@ -2,16 +2,30 @@ from viktor import ViktorController, UserError, Color
 from viktor.parametrization import ViktorParametrization, Text, OptionField, \
     GeoPointField, Step, NumberField, DownloadButton, GeoPoint, \
     SetParamsButton, MapSelectInteraction, OptionListElement, OutputField
-from viktor.utils import memoize
 from viktor.views import MapView, MapResult, MapPoint, MapPolygon, PlotlyView, PlotlyResult
 from viktor.result import SetParamsResult, DownloadResult
-
-from geopy.distance import geodesic
-
-from src.epw_charts import epw_temp_flood_plot, epw_rh_flood_plot, epw_cloud_flood_plot, epw_wind_rose
+from typing import Tuple
+
+from src.caching import LRUCache
+from src.chart_cache import get_chart_cache
+from src.data_objects import StationQueryResult
+from src.epw_charts import epw_temp_flood_plot, epw_rh_flood_plot, epw_cloud_flood_plot, epw_wind_rose, \
+    station_comparison_figure
+from src.epw_cache import get_weather_cache
+from src.epw_download import get_downloader
 from src.epw_management import DownloadMethod
+from src.map_clustering import StationClusters, get_map_cluster_cache
 from src.speckle_integration import GraphQLSpeckleIntegration, SpecklePyIntegration
-from src.station_retrieval import MongoEpwStorage
+from src.station_comparison import compare_stations
+from src.station_retrieval import get_station_cache
+from src.utility import geodesic_circle
+
+MAX_COMPARED_STATIONS = 12
+# above this many stations in range, nearby stations are drawn as one cluster marker on the map
+MAP_MARKER_LIMIT = 100
+PREFETCHED_STATIONS = 3  # the nearest stations of a query whose EPW files are downloaded ahead
+_station_results = LRUCache(maxsize=64, ttl=60)
+_prefetched_queries = LRUCache(maxsize=64, ttl=60)
 
 s = GraphQLSpeckleIntegration()
 try:
@@ -23,6 +37,8 @@ except TypeError as e:
 def create_map_circle(lat, long, radius):
     """Create a list of points based on the location coordinates and radius.
 
+    The number of points adapts to the radius and the circles are cached, see `geodesic_circle`.
+
     Parameters:
     lat (float): Latitude of the location.
     long (float): Longitude of the location.
@@ -31,32 +47,82 @@ def create_map_circle(lat, long, radius):
     Returns:
     list_of_points: A list of points.
     """
-    # Create the circle points
-    circle_points = []
-    for i in range(360):
-        temp = geodesic(kilometers=radius).destination((lat, long), i)
-        circle_points.append((temp[0], temp[1]))
-
-    return circle_points
-
-
-@memoize
-def load_weather_stations(lat: float, lon: float, radius: float):
-    storage = MongoEpwStorage()
-    stations = storage.fetch_range_stations(lat, lon, radius=radius)
-    # make sure the results are json serializable to ensure that it can be memoized
-    return [{'elevation': station['elevation'],
-             'years': station['years'],
-             'period': station['period'],
-             'wmo': station['wmo'],
-             'dataset': station['dataset'],
-             'source': station['source'],
-             'lat': station['lat'],
-             'lng': station['lng'],
-             'name': station['name'],
-             'url': station['url'],
-             '_id': str(station['_id']),
-             } for station in stations]
+    return geodesic_circle(lat, long, radius)
+
+
+def station_description(station) -> str:
+    """Renders the description shown with the marker of the station on the map."""
+    return f"""
+                        **Elevation**:{station['elevation']}\n
+                        **Years**:{station['years']}\n
+                        **Period**:{station['period']}\n
+                        **WMO**:{station['wmo']}\n
+                        **Dataset**:{station['dataset']}\n
+                        **Source**:{station['source']}\n
+                        """
+
+
+def _query_weather_stations(lat: float, lon: float, radius: float) -> StationQueryResult:
+    # served from the per-tile station cache, so nearby points and other radii do not query again
+    stations = get_station_cache().fetch_range_stations(lat, lon, radius=radius)
+    return StationQueryResult.from_stations([{'elevation': station['elevation'],
+                                              'years': station['years'],
+                                              'period': station['period'],
+                                              'wmo': station['wmo'],
+                                              'dataset': station['dataset'],
+                                              'source': station['source'],
+                                              'lat': station['lat'],
+                                              'lng': station['lng'],
+                                              'name': station['name'],
+                                              'url': station['url'],
+                                              '_id': str(station['_id']),
+                                              } for station in stations], describe=station_description)
+
+
+def load_weather_stations(lat: float, lon: float, radius: float) -> StationQueryResult:
+    """
+    Returns the indexed weather stations within the radius. The callbacks of one interaction
+    ask for the same query several times, so the results are kept for a short while.
+    """
+    return _station_results.get_or_set((lat, lon, radius), lambda: _query_weather_stations(lat, lon, radius))
+
+
+def load_map_clusters(lat: float, lon: float, radius: float) -> Tuple[StationQueryResult, StationClusters]:
+    """
+    Returns the weather stations within the radius together with their map markers, clustered
+    when there are more than `MAP_MARKER_LIMIT` stations. The grouping into clusters is cached
+    per station tile and zoom level, so nearby queries and other radii of the level reuse it.
+    """
+    stations = load_weather_stations(lat, lon, radius)
+    if len(stations) <= MAP_MARKER_LIMIT:
+        return stations, StationClusters.unclustered(stations)
+    return stations, get_map_cluster_cache().clusters(stations, lat, lon, radius)
+
+
+def prefetch_weather_stations(lat: float, lon: float, radius: float, selected_station=None) -> None:
+    """
+    Starts downloading the EPW files of the selected and the nearest few stations in the
+    background, so they are local once a station is picked. Every query (and selection) is
+    prefetched once, however often the map is rendered.
+    """
+    def prefetch():
+        stations = load_weather_stations(lat, lon, radius)
+        nearest = [stations.get(selected_station)] + stations.nearest(lat, lon, PREFETCHED_STATIONS)
+        return get_downloader().prefetch(station['url'] for station in nearest if station is not None)
+
+    _prefetched_queries.get_or_set((lat, lon, radius, selected_station), prefetch)
+
+
+def cluster_description(stations, station_ids) -> str:
+    """Renders the description shown with a cluster marker on the map."""
+    names = ', '.join(stations.get(station_id)['name'] for station_id in station_ids[:5])
+    more = f' and {len(station_ids) - 5} more' if len(station_ids) > 5 else ''
+    return f"{names}{more}\n\nReduce the radius or move the location to select one of these stations."
+
+
+def _station_download_method(station):
+    return DownloadMethod(station['url'], downloader=get_downloader(), weather_cache=get_weather_cache(),
+                          station_id=station['_id'])
 
 
 def weather_station_options(params, **kwargs):
@@ -64,7 +130,7 @@ def weather_station_options(params, **kwargs):
     radius = params.step_1.radius
     if not all([location, radius]):
         return []
-    return [OptionListElement(label=station['name'], value=str(station['_id'])) for station in load_weather_stations(location.lat, location.lon, radius)]
+    return [OptionListElement(label=station['name'], value=station['_id']) for station in load_weather_stations(location.lat, location.lon, radius)]
 
 
 def project_options(params, **kwargs):
@@ -77,10 +143,8 @@ def selected_location(params, **kwargs):
     selected_weather_station = params.step_1.selected_location
     if not all([location, radius, selected_weather_station]):
         return ''
-    for station in load_weather_stations(location.lat, location.lon, radius):
-        if str(station['_id']) == selected_weather_station:
-            return station['name']
-    return ''
+    station = load_weather_stations(location.lat, location.lon, radius).get(selected_weather_station)
+    return station['name'] if station is not None else ''
 
 
 def update_coordinates(params, **kwargs):
@@ -116,7 +180,8 @@ of environmental data extracted from EnergyPlus Weather .epw files.
     step_2 = Step('Step 2 - Analysis Results', width=20, views=['get_epw_temperature_view',
                                                                 'get_epw_relative_humidity_view',
                                                                 'get_epw_cloud_cover_view',
-                                                                'get_wind_rose_view'])
+                                                                'get_wind_rose_view',
+                                                                'get_station_comparison_view'])
     step_2.download_epw_file_btn = DownloadButton('Download Weather data', method='download_weather_data', longpoll=True, flex=100)
 
 
@@ -141,22 +206,28 @@ class ModelController(ViktorController):
                 circle_points = create_map_circle(location.lat, location.lon, radius)
                 circle_polygon = MapPolygon([MapPoint(lat=lat, lon=lon) for lat, lon in circle_points])
                 features.append(circle_polygon)
-                for station in load_weather_stations(location.lat, location.lon, radius):
-                    description = f"""
-                        **Elevation**:{station['elevation']}\n
-                        **Years**:{station['years']}\n
-                        **Period**:{station['period']}\n
-                        **WMO**:{station['wmo']}\n
-                        **Dataset**:{station['dataset']}\n
-                        **Source**:{station['source']}\n
-                        """
+                stations, clusters = load_map_clusters(location.lat, location.lon, radius)
+                selected = params.step_1.selected_location
+                prefetch_weather_stations(location.lat, location.lon, radius, selected)
+                clusters = clusters.release(selected)  # the selected station always keeps its own marker
+                for station_id in clusters.singles:
+                    station = stations.get(station_id)
                     features.append(MapPoint(
                         lat=station['lat'],
                         lon=station['lng'],
                         title=station['name'],
-                        description=description,
-                        color=Color.red() if str(station['_id']) == params.step_1.selected_location else Color.viktor_blue(),
-                        identifier=str(station['_id'])
+                        description=stations.descriptions[station_id],
+                        color=Color.red() if station_id == selected else Color.viktor_blue(),
+                        identifier=station_id
+                    ))
+                for lat, lon, station_ids in zip(clusters.lats, clusters.lngs, clusters.members):
+                    features.append(MapPoint(
+                        lat=float(lat),
+                        lon=float(lon),
+                        title=f'{len(station_ids)} weather stations',
+                        description=cluster_description(stations, station_ids),
+                        color=Color.viktor_blue(),
+                        size='large'
                     ))
 
         for project in projects:
@@ -207,11 +278,19 @@ class ModelController(ViktorController):
         selected_weather_station = params.step_1.selected_location
         if not selected_weather_station:
             raise UserError('No weather station has been selected')
-        for station in load_weather_stations(location.lat, location.lon, radius):
-            if str(station['_id']) == selected_weather_station:
-                return DownloadMethod(station['url'])
+        station = load_weather_stations(location.lat, location.lon, radius).get(selected_weather_station)
+        if station is not None:
+            return _station_download_method(station)
         raise UserError(f'No weather station was found with id "{selected_weather_station}"')
 
+    def _render_chart(self, params, chart, **options):
+        """Returns the Plotly JSON of the chart for the selected station, served from the chart cache when possible."""
+        download_method = self._get_download_method(params)
+        # the archive hash invalidates the chart once the EPW file of the station was updated
+        key = (str(download_method.station_id), download_method.content_hash(), chart.__name__,
+               tuple(sorted(options.items())))
+        return get_chart_cache().get_or_render(key, lambda: chart(download_method.get_weather_data(), **options))
+
     def download_weather_data(self, params, **kwargs):
         download_method = self._get_download_method(params)
         file_content = download_method.get_zip_in_memory()
@@ -219,28 +298,38 @@ class ModelController(ViktorController):
 
     @PlotlyView('EPW temperature', duration_guess=10)
     def get_epw_temperature_view(self, params, **kwargs):
-        download_method = self._get_download_method(params)
-        epw_data = download_method.get_weather_data()
-        fig = epw_temp_flood_plot(epw_data)
-        return PlotlyResult(fig.to_json())
+        return PlotlyResult(self._render_chart(params, epw_temp_flood_plot))
 
     @PlotlyView('EPW Relative humidity', duration_guess=10)
     def get_epw_relative_humidity_view(self, params, **kwargs):
-        download_method = self._get_download_method(params)
-        epw_data = download_method.get_weather_data()
-        fig = epw_rh_flood_plot(epw_data)
-        return PlotlyResult(fig.to_json())
+        return PlotlyResult(self._render_chart(params, epw_rh_flood_plot))
 
     @PlotlyView('EPW Cloud cover', duration_guess=10)
     def get_epw_cloud_cover_view(self, params, **kwargs):
-        download_method = self._get_download_method(params)
-        epw_data = download_method.get_weather_data()
-        fig = epw_cloud_flood_plot(epw_data)
-        return PlotlyResult(fig.to_json())
+        return PlotlyResult(self._render_chart(params, epw_cloud_flood_plot))
 
     @PlotlyView('EPW Wind Rose', duration_guess=10)
     def get_wind_rose_view(self, params, **kwargs):
-        download_method = self._get_download_method(params)
-        epw_data = download_method.get_weather_data()
-        fig = epw_wind_rose(epw_data)
-        return PlotlyResult(fig.to_json())
+        return PlotlyResult(self._render_chart(params, epw_wind_rose))
+
+    @PlotlyView('Station comparison', duration_guess=30)
+    def get_station_comparison_view(self, params, **kwargs):
+        location = params.step_1.geo_point
+        radius = params.step_1.radius
+        if not all([location, radius]):
+            raise UserError('No location or radius has been defined')
+        stations = load_weather_stations(location.lat, location.lon, radius)
+        stations = stations.nearest(location.lat, location.lon, MAX_COMPARED_STATIONS)
+        if not stations:
+            raise UserError('No weather stations were found within the radius')
+
+        def build():
+            comparison = compare_stations(stations, lambda station: _station_download_method(station).get_weather_data())
+            if comparison is None:
+                raise UserError('None of the weather stations could be loaded')
+            return station_comparison_figure(comparison)
+
+        # only the hashes already in the zip cache: building the key must never download (or fail)
+        key = ('station_comparison', tuple((station['_id'], get_downloader().cache.content_hash(station['url']))
+                                           for station in stations))
+        return PlotlyResult(get_chart_cache().get_or_render(key, build))
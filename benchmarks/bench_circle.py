@@ -0,0 +1,38 @@
+"""
+Compares building the map radius circle with geopy (one geodesic solution per vertex) against
+the vectorised spherical `geodesic_circle`, both uncached and cached.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_circle
+"""
+import timeit
+from geopy.distance import geodesic
+from src.utility import circle_vertex_count, geodesic_circle, _circle
+
+
+def geopy_circle(lat, lng, radius):
+    """The former implementation: 360 vertices, each solved on the ellipsoid."""
+    return [(point.latitude, point.longitude)
+            for point in (geodesic(kilometers=radius).destination((lat, lng), bearing) for bearing in range(360))]
+
+
+def uncached_circle(lat, lng, radius):
+    _circle.cache_clear()
+    return geodesic_circle(lat, lng, radius)
+
+
+def main():
+    print(f"{'radius [km]':>12} {'vertices':>9} {'geopy [ms]':>11} {'vector [ms]':>12} {'cached [us]':>12} {'speed-up':>9}")
+    for radius in (1, 10, 100):
+        repeats, number = 3, 20
+        old = min(timeit.repeat(lambda: geopy_circle(51.5, -0.12, radius), number=number, repeat=repeats)) / number
+        new = min(timeit.repeat(lambda: uncached_circle(51.5, -0.12, radius), number=number, repeat=repeats)) / number
+        geodesic_circle(51.5, -0.12, radius)
+        cached = min(timeit.repeat(lambda: geodesic_circle(51.5, -0.12, radius), number=number, repeat=repeats)) / number
+        print(f"{radius:>12} {circle_vertex_count(radius):>9} {old * 1e3:>11.2f} {new * 1e3:>12.3f} "
+              f"{cached * 1e6:>12.1f} {old / new:>8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
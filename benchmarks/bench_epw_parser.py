@@ -0,0 +1,30 @@
+"""
+Compares the parse time of a full EPW year with Ladybug against the NumPy column parser.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_epw_parser
+"""
+import timeit
+import numpy as np
+from ladybug.epw import EPW
+from src.epw_management import LadybugEpwParser, NumpyEpwParser
+
+
+def synthetic_epw_text() -> str:
+    epw = EPW.from_missing_values()
+    rng = np.random.default_rng(42)
+    epw.dry_bulb_temperature.values = rng.uniform(-10, 35, 8760).round(1).tolist()
+    epw.wind_speed.values = rng.uniform(0, 20, 8760).round(1).tolist()
+    return epw.to_file_string()
+
+
+def main():
+    text = synthetic_epw_text()
+    for name, parser, repeats in (('ladybug', LadybugEpwParser(), 3), ('numpy', NumpyEpwParser(), 10)):
+        best = min(timeit.repeat(lambda: parser.parse(text), number=1, repeat=repeats))
+        print(f"{name:>8}: {best * 1e3:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""
+Compares the scalar `haversine` used in a Python loop against the vectorised `haversine_many`.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_haversine
+"""
+import timeit
+import numpy as np
+from src.utility import haversine, haversine_many
+
+
+def main():
+    rng = np.random.default_rng(42)
+    print(f"{'stations':>10} {'scalar [ms]':>12} {'float64 [ms]':>13} {'float32 [ms]':>13} {'speed-up':>9}")
+    for n in (1_000, 10_000, 100_000):
+        lats, lngs = rng.uniform(-90, 90, n), rng.uniform(-180, 180, n)
+        lat_list, lng_list = lats.tolist(), lngs.tolist()
+        repeats = 3
+
+        scalar = min(timeit.repeat(lambda: [haversine(-0.12, 51.5, x, y) for x, y in zip(lng_list, lat_list)],
+                                   number=1, repeat=repeats))
+        vector64 = min(timeit.repeat(lambda: haversine_many(51.5, -0.12, lats, lngs), number=1, repeat=repeats))
+        vector32 = min(timeit.repeat(lambda: haversine_many(51.5, -0.12, lats, lngs, dtype=np.float32),
+                                     number=1, repeat=repeats))
+        print(f"{n:>10} {scalar * 1e3:>12.2f} {vector64 * 1e3:>13.2f} {vector32 * 1e3:>13.2f} {scalar / vector64:>8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
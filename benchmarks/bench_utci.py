@@ -0,0 +1,45 @@
+"""
+Compares the table based UTCI evaluation against a term by term evaluation of the same
+polynomial (which allocates temporaries for every term, like the original expanded form),
+for a single station year and for a batch of 1000 station years. The term by term variant
+takes about a minute on the batch, so it only runs on the single year.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_utci
+"""
+import timeit
+import numpy as np
+from src.utility import UTCI_COEFFICIENTS, utci_optimised
+
+
+def utci_term_by_term(tdb, v, delta_t_tr, pa):
+    result = np.zeros_like(tdb)
+    for (j, k, l), coefficients in UTCI_COEFFICIENTS.items():
+        for i, coefficient in enumerate(coefficients):
+            result = result + coefficient * tdb ** i * v ** j * delta_t_tr ** k * pa ** l
+    return result
+
+
+def main():
+    rng = np.random.default_rng(42)
+    for label, shape, repeats in (('1 station year', (8760,), 5), ('1000 station years', (1000, 8760), 3)):
+        tdb = rng.uniform(-20, 40, shape)
+        v = rng.uniform(0.5, 10, shape)
+        delta_t_tr = rng.uniform(-10, 30, shape)
+        pa = rng.uniform(0.1, 4, shape)
+        out = np.empty(shape)
+        timings = {
+            'table float64': lambda: utci_optimised(tdb, v, delta_t_tr, pa, out=out),
+            'table float32': lambda: utci_optimised(tdb, v, delta_t_tr, pa, dtype=np.float32),
+        }
+        if len(shape) == 1:
+            timings['term by term'] = lambda: utci_term_by_term(tdb, v, delta_t_tr, pa)
+        print(label)
+        for name, function in timings.items():
+            best = min(timeit.repeat(function, number=1, repeat=repeats))
+            print(f"  {name:>14}: {best * 1e3:10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import threading
+from typing import Callable, Hashable
+import numpy as np
+import plotly
+import plotly.graph_objects as go
+from src.caching import LRUCache
+
+
+# Trace properties holding the (large) numeric data arrays of the charts
+ARRAY_PROPERTIES = ('x', 'y', 'z', 'r', 'theta', 'marker.color')
+# plotly 6+ serialises NumPy arrays as base64 typed arrays ({"dtype", "bdata"}) instead of JSON lists
+TYPED_ARRAYS = int(plotly.__version__.split('.')[0]) >= 6
+
+_INTEGER_TYPES = (np.int8, np.uint8, np.int16, np.uint16, np.int32)
+
+
+def compact_array(values, decimals: int = 2):
+    """
+    Rounds a numeric array to `decimals` and stores it in the smallest type that holds it: a
+    small integer type for whole numbers and float32 otherwise. Non-numeric values are returned as is.
+    """
+    array = np.asarray(values)
+    if array.dtype.kind not in 'fiu' or array.size == 0:
+        return values
+    if array.dtype.kind == 'f':
+        array = np.round(array, decimals)
+        if not np.all(np.isfinite(array)) or np.any(array != np.trunc(array)):
+            return array.astype(np.float32) if TYPED_ARRAYS else array
+    low, high = array.min(), array.max()
+    for dtype in _INTEGER_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return array.astype(dtype)
+    return array
+
+
+def compact_figure(fig: go.Figure, decimals: int = 2) -> go.Figure:
+    """Compacts the data arrays of every trace of the figure in place, see `compact_array`."""
+    for trace in fig.data:
+        for path in ARRAY_PROPERTIES:
+            if path in trace and trace[path] is not None:
+                trace[path] = compact_array(trace[path], decimals)
+    return fig
+
+
+def figure_json(fig: go.Figure, decimals: int = 2) -> str:
+    """Serialises the figure with its data arrays compacted, as expected by `PlotlyResult`."""
+    return compact_figure(fig, decimals).to_json()
+
+
+class ChartCache:
+    """
+    Caches the finished Plotly JSON of the charts, so repeated views of a station skip both
+    building and serialising the figure. Keys are typically (station id, chart type, options).
+    """
+
+    def __init__(self, maxsize: int = 64, decimals: int = 2):
+        self.decimals = decimals
+        self._cache = LRUCache(maxsize=maxsize)
+
+    def get_or_render(self, key: Hashable, build: Callable[[], go.Figure]) -> str:
+        """Returns the cached JSON of the chart, building and serialising the figure when missing."""
+        return self._cache.get_or_set(key, lambda: figure_json(build(), self.decimals))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+_chart_cache = None
+_chart_cache_lock = threading.Lock()
+
+
+def get_chart_cache() -> ChartCache:
+    """Returns the process-wide chart cache, creating it on first use."""
+    global _chart_cache
+    with _chart_cache_lock:
+        if _chart_cache is None:
+            _chart_cache = ChartCache()
+        return _chart_cache
@@ -1,21 +1,132 @@
 from dataclasses import dataclass
 from ladybug.datacollection import HourlyContinuousCollection
-import pandas as pd
+from ladybug.header import Header
+from ladybug.location import Location
 import numpy as np
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Sequence, Union
+from src.utility import haversine_many
+
+
+class HourlyArray:
+    """
+    Lightweight stand-in for a Ladybug `HourlyContinuousCollection` whose values are held in a
+    NumPy array (which may be memory-mapped) instead of a list of Python floats.
+
+    It offers the parts of the collection interface used throughout the app (`header`, `values`,
+    `average`, `datetimes`, `datetime_strings` and the unit conversions), and `to_collection`
+    returns a regular Ladybug collection whenever the full Ladybug functionality is needed.
+    """
+
+    def __init__(self, header: Header, values: np.ndarray):
+        self.header = header
+        self.values = values
+
+    @classmethod
+    def from_collection(cls, collection: HourlyContinuousCollection) -> 'HourlyArray':
+        return cls(collection.header.duplicate(), np.asarray(collection.values, dtype=np.float64))
+
+    def to_collection(self) -> HourlyContinuousCollection:
+        return HourlyContinuousCollection(self.header.duplicate(), self.values.tolist())
+
+    @property
+    def unit(self) -> str:
+        return self.header.unit
+
+    @property
+    def average(self) -> float:
+        return float(np.mean(self.values))
+
+    @property
+    def datetimes(self):
+        return self.header.analysis_period.datetimes
+
+    @property
+    def datetime_strings(self):
+        return [str(dt) for dt in self.datetimes]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def convert_to_si(self) -> 'HourlyArray':
+        """Returns a copy of the data in SI units."""
+        return self._convert(*self.header.data_type.to_si([0.0, 1.0], self.header.unit))
+
+    def convert_to_ip(self) -> 'HourlyArray':
+        """Returns a copy of the data in imperial units."""
+        return self._convert(*self.header.data_type.to_ip([0.0, 1.0], self.header.unit))
+
+    def _convert(self, reference: list, unit: str) -> 'HourlyArray':
+        # the units of the weather fields are related linearly, so two reference values define the conversion
+        offset, scale = reference[0], reference[1] - reference[0]
+        header = Header(self.header.data_type, unit, self.header.analysis_period, dict(self.header.metadata))
+        return HourlyArray(header, self.values * scale + offset)
+
+
+HourlyData = Union[HourlyContinuousCollection, HourlyArray]
+
+COMPASS_LABELS = ('N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE', 'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW')
+DEFAULT_SPEED_BANDS = (0, 2, 4, 6, 8, 10)
+MISSING_WIND = 999  # EPW marks a missing wind direction or speed with 999
+
+
+def valid_wind(directions: np.ndarray, speeds: np.ndarray) -> np.ndarray:
+    """Returns the mask of the hours with a wind direction in [0, 360] and a (non-missing) wind speed."""
+    return (np.isfinite(directions) & (directions >= 0) & (directions <= 360)
+            & np.isfinite(speeds) & (speeds >= 0) & (speeds < MISSING_WIND))
+
+
+def sector_indices(directions: np.ndarray, sectors: int) -> np.ndarray:
+    """Returns the index of the direction sector of every wind direction [deg], with sector 0 centred on north."""
+    width = 360.0 / sectors
+    return np.floor(np.mod(directions + width / 2, 360.0) / width).astype(np.intp) % sectors
+
+
+def band_indices(speeds: np.ndarray, speed_bands: Sequence[float]) -> np.ndarray:
+    """Returns the index of the speed band of every wind speed, given the lower edges of the bands."""
+    return np.clip(np.searchsorted(np.asarray(speed_bands, dtype=np.float64), speeds, side='right') - 1,
+                   0, len(speed_bands) - 1)
+
+
+def sector_labels(sectors: int) -> List[str]:
+    """Compass point names for 4, 8 or 16 sectors, or the centre direction in degrees otherwise."""
+    if len(COMPASS_LABELS) % sectors == 0:
+        return list(COMPASS_LABELS[::len(COMPASS_LABELS) // sectors])
+    return [f"{direction:g}°" for direction in np.arange(sectors) * (360.0 / sectors)]
+
+
+def speed_band_labels(speed_bands: Sequence[float]) -> List[str]:
+    """Labels such as '2-4 m/s' for the speed bands, the last one being open ended."""
+    edges = list(speed_bands)
+    return [f"{low:g}-{high:g} m/s" for low, high in zip(edges, edges[1:])] + [f">{edges[-1]:g} m/s"]
+
+
+@dataclass
+class WindStats:
+    """
+    Wind statistics per direction sector. `directions` holds the sector centres [deg] and
+    `band_frequency` the number of hours per sector (rows) and speed band (columns).
+    """
+    directions: np.ndarray
+    labels: List[str]
+    speed_bands: np.ndarray
+    frequency: np.ndarray
+    average_speed: np.ndarray
+    band_frequency: np.ndarray
+
 
 @dataclass
 class WeatherData:
     """
     Class for keeping track of weather data necessary for UTCI calculation using hourly data collections.
     """
-    dry_bulb_temp: HourlyContinuousCollection
-    radiant_temp: HourlyContinuousCollection
-    wind_speed: HourlyContinuousCollection
-    wind_direction: HourlyContinuousCollection
-    relative_humidity: HourlyContinuousCollection
-    total_sky_cover: HourlyContinuousCollection
+    dry_bulb_temp: HourlyData
+    radiant_temp: HourlyData
+    wind_speed: HourlyData
+    wind_direction: HourlyData
+    relative_humidity: HourlyData
+    total_sky_cover: HourlyData
     units: str = "SI"
+    location: Optional[Location] = None
 
     def __post_init__(self):
         if self.units.lower() == "ip":
@@ -45,33 +156,88 @@ class WeatherData:
         self.total_sky_cover = self.total_sky_cover.convert_to_ip()
         self.units = "IP"
     
-    def get_wind_stats(self):
+    def get_wind_stats(self, sectors: int = 16, speed_bands: Sequence[float] = DEFAULT_SPEED_BANDS) -> 'WindStats':
+        """
+        Generates wind statistics by binning the wind directions into sectors (and the wind
+        speeds into bands) and calculating the frequency and average wind speed per sector.
+
+        Parameters:
+        - sectors (int): Number of direction sectors, e.g. 8, 16 or 36. The first sector is centred on north.
+        - speed_bands (Sequence[float]): Lower edges of the wind speed bands; the last band is open ended.
+
+        Returns:
+        - WindStats: The frequencies and average speeds per sector and speed band.
+        """
+        directions = np.asarray(self.wind_direction.values, dtype=np.float64)
+        speeds = np.asarray(self.wind_speed.values, dtype=np.float64)
+        valid = valid_wind(directions, speeds)
+        if not valid.all():
+            directions, speeds = directions[valid], speeds[valid]
+        sector = sector_indices(directions, sectors)
+        band = band_indices(speeds, speed_bands)
+
+        counts = np.bincount(sector * len(speed_bands) + band, minlength=sectors * len(speed_bands))
+        frequency = np.bincount(sector, minlength=sectors)
+        speed_sums = np.bincount(sector, weights=speeds, minlength=sectors)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            average_speed = speed_sums / frequency
+        return WindStats(
+            directions=np.arange(sectors) * (360.0 / sectors),
+            labels=sector_labels(sectors),
+            speed_bands=np.asarray(speed_bands, dtype=np.float64),
+            frequency=frequency,
+            average_speed=average_speed,
+            band_frequency=counts.reshape(sectors, len(speed_bands)),
+        )
+
+
+@dataclass
+class StationQueryResult:
+    """
+    The weather stations found by a query, indexed for the app callbacks.
+
+    `stations` keeps the query order, `by_id` maps the (string) station id onto the station,
+    `lats`/`lngs` hold the coordinates as arrays and `descriptions` the pre-rendered marker
+    description per station id.
+    """
+    stations: List[Dict]
+    by_id: Dict[str, Dict]
+    lats: np.ndarray
+    lngs: np.ndarray
+    descriptions: Dict[str, str]
+
+    @classmethod
+    def from_stations(cls, stations: List[Dict], describe: Optional[Callable[[Dict], str]] = None) -> 'StationQueryResult':
         """
-        Generates wind statistics by categorizing wind directions into bins and calculating
-        the frequency and average wind speed for each bin.
-
-        Returns
-        pandas.DataFrame
-            A DataFrame with columns:
-            - 'Wind Direction Bin': Categorical bins of wind direction (e.g., 'N', 'NE', 'E', etc.).
-            - 'Frequency': The count of data points within each wind direction bin.
-            - 'Average_Speed': The average wind speed (in the same units as input) for each bin.
-
-        This function is currently part of a dataclass but should be refactored into its own
-        behavior-focused class.
+        Parameters:
+        - stations (List[Dict]): Stations with at least an `_id`, `lat` and `lng`.
+        - describe (Callable): Renders the marker description of a station, if any.
         """
-        wind_df = pd.DataFrame({
-            'Datetime': self.wind_direction.datetimes,
-            'Wind Direction': self.wind_direction.values,
-            'Wind Speed': self.wind_speed.values
-        })
+        return cls(
+            stations=stations,
+            by_id={str(station['_id']): station for station in stations},
+            lats=np.fromiter((station['lat'] for station in stations), dtype=np.float64, count=len(stations)),
+            lngs=np.fromiter((station['lng'] for station in stations), dtype=np.float64, count=len(stations)),
+            descriptions={str(station['_id']): describe(station) for station in stations} if describe else {},
+        )
+
+    def nearest(self, lat: float, lng: float, count: int) -> List[Dict]:
+        """Returns the `count` stations nearest to the point, nearest first."""
+        distances = haversine_many(lat, lng, self.lats, self.lngs)
+        return [self.stations[i] for i in np.argsort(distances, kind='stable')[:count]]
+
+    def get(self, station_id: Optional[str]) -> Optional[Dict]:
+        """Returns the station with the id, or None when it is not part of the result."""
+        return self.by_id.get(str(station_id)) if station_id is not None else None
 
-        direction_labels = ['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE', 'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW']
-        wind_df['Wind Direction Bin'] = pd.cut(wind_df['Wind Direction'], bins=np.linspace(0, 360, num=17, endpoint=True), labels=direction_labels, right=False)
+    def __contains__(self, station_id) -> bool:
+        return str(station_id) in self.by_id
 
-        stats_df = wind_df.groupby('Wind Direction Bin').agg(Frequency=('Wind Direction', 'size'), Average_Speed=('Wind Speed', 'mean')).reset_index()
+    def __iter__(self):
+        return iter(self.stations)
 
-        return stats_df
+    def __len__(self) -> int:
+        return len(self.stations)
 
 
 @dataclass
@@ -0,0 +1,298 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Hashable, Optional, Tuple
+import requests
+from src.caching import LRUCache
+from src.data_objects import WeatherData
+from src.epw_columnar import read_columnar, write_columnar
+
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'dandelion')
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """Writes the file next to its destination and renames it, so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _evict_lru(directory: str, max_bytes: int) -> None:
+    """
+    Removes the least recently modified entries in the directory until it fits within `max_bytes`.
+    The files of one entry share their name up to the extension (e.g. the `.npy` and `.json` of a
+    columnar copy) and are always removed together.
+    """
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    entries = {}
+    for name in names:
+        if name.startswith('.tmp-'):
+            continue
+        try:
+            stat = os.stat(os.path.join(directory, name))
+        except FileNotFoundError:
+            continue
+        mtime, size, files = entries.get(os.path.splitext(name)[0], (0.0, 0, []))
+        entries[os.path.splitext(name)[0]] = (max(mtime, stat.st_mtime), size + stat.st_size, files + [name])
+
+    total = sum(size for _, size, _ in entries.values())
+    for _, size, files in sorted(entries.values()):
+        if total <= max_bytes:
+            break
+        for name in files:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+        total -= size
+
+
+def _read_and_touch(path: str) -> Optional[bytes]:
+    """Reads the file and bumps its modification time, which doubles as the last access time for the eviction."""
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return data
+
+
+class EpwZipCache:
+    """
+    Content-addressed disk cache for the downloaded EPW zip archives.
+
+    The archives are stored once per content hash under `blobs/`, while `index/` maps the
+    hash of every url onto the content hash and its HTTP validators (ETag / Last-Modified).
+    Entries older than `max_age` are revalidated with a conditional request. All files are
+    written atomically, so several workers can share the same directory, and the least
+    recently used archives are evicted when the cache grows beyond `max_bytes`.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = 512 * 1024 ** 2,
+                 max_age: float = 24 * 3600, timeout: float = 30):
+        self.root = root or os.path.join(os.getenv('EPW_CACHE_DIR', DEFAULT_CACHE_DIR), 'epw')
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.timeout = timeout
+
+    def get(self, url: str) -> bytes:
+        """
+        Returns the archive at the url, downloading or revalidating it when needed.
+        """
+        data, fresh = self.lookup(url)
+        if fresh:
+            return data
+
+        try:
+            response = requests.get(url, headers=self.conditional_headers(url), timeout=self.timeout, verify=False)
+        except requests.RequestException:
+            if data is not None:
+                return data  # serve the stale copy rather than failing
+            raise
+
+        if response.status_code == 304 and data is not None:
+            self.mark_fresh(url)
+            return data
+
+        response.raise_for_status()
+        return self.store(url, response.content, etag=response.headers.get('ETag'),
+                          last_modified=response.headers.get('Last-Modified'))
+
+    def lookup(self, url: str) -> Tuple[Optional[bytes], bool]:
+        """
+        Returns the cached archive for the url (or None) and whether it is still fresh.
+        """
+        entry = self._read_entry(url)
+        data = self._read_blob(entry['sha256']) if entry else None
+        return data, data is not None and time.time() - entry['fetched_at'] < self.max_age
+
+    def conditional_headers(self, url: str) -> dict:
+        """Returns the headers to revalidate the cached archive of the url with the server."""
+        entry = self._read_entry(url)
+        headers = {}
+        if entry and os.path.exists(self._blob_path(entry['sha256'])):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def mark_fresh(self, url: str) -> None:
+        """Restarts the freshness period of the entry after the server confirmed it is unchanged (304)."""
+        entry = self._read_entry(url)
+        if entry:
+            entry['fetched_at'] = time.time()
+            self._write_entry(url, entry)
+
+    def store(self, url: str, data: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None) -> bytes:
+        """Adds the archive downloaded from the url to the cache."""
+        writer = self.writer()
+        writer.write(data)
+        writer.commit(url, etag=etag, last_modified=last_modified)
+        return data
+
+    def writer(self) -> 'BlobWriter':
+        """Returns a writer which streams a new archive into the cache chunk by chunk."""
+        return BlobWriter(self)
+
+    def _commit_blob(self, url: str, temp_path: str, sha256: str, etag: Optional[str], last_modified: Optional[str]):
+        blob_path = self._blob_path(sha256)
+        try:
+            os.utime(blob_path)  # the same archive is cached already
+            os.remove(temp_path)
+        except FileNotFoundError:
+            # not cached yet, or evicted by another worker in the meantime
+            os.replace(temp_path, blob_path)
+        self._write_entry(url, {
+            'url': url,
+            'sha256': sha256,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': time.time(),
+        })
+        self.evict()
+
+    def content_hash(self, url: str, fresh: bool = False) -> Optional[str]:
+        """
+        Returns the sha256 of the cached archive for the url, or None when it is not cached
+        (or, with `fresh`, when it is due for revalidation).
+        """
+        entry = self._read_entry(url)
+        if not entry or not os.path.exists(self._blob_path(entry['sha256'])):
+            return None
+        if fresh and time.time() - entry['fetched_at'] >= self.max_age:
+            return None
+        return entry['sha256']
+
+    def evict(self) -> None:
+        """Removes the least recently used archives until the cache fits within `max_bytes`."""
+        _evict_lru(os.path.join(self.root, 'blobs'), self.max_bytes)
+
+    def _read_blob(self, sha256: str) -> Optional[bytes]:
+        return _read_and_touch(self._blob_path(sha256))
+
+    def _read_entry(self, url: str) -> Optional[dict]:
+        try:
+            with open(self._entry_path(url), 'r') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_entry(self, url: str, entry: dict) -> None:
+        _atomic_write(self._entry_path(url), json.dumps(entry).encode())
+
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.root, 'blobs', sha256)
+
+    def _entry_path(self, url: str) -> str:
+        return os.path.join(self.root, 'index', hashlib.sha256(url.encode()).hexdigest() + '.json')
+
+
+class BlobWriter:
+    """
+    Streams an archive into a temporary file of the cache while hashing it, and moves it into
+    place under its content hash on `commit`.
+    """
+
+    def __init__(self, cache: EpwZipCache):
+        self._cache = cache
+        directory = os.path.join(cache.root, 'blobs')
+        os.makedirs(directory, exist_ok=True)
+        fd, self._temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        self._file = os.fdopen(fd, 'wb')
+        self._hash = hashlib.sha256()
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self._hash.update(chunk)
+
+    def commit(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> str:
+        """Finishes the archive and registers it for the url, returning its sha256."""
+        self._file.close()
+        sha256 = self._hash.hexdigest()
+        self._cache._commit_blob(url, self._temp_path, sha256, etag, last_modified)
+        return sha256
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+
+class WeatherDataCache:
+    """
+    Two tier cache for parsed `WeatherData`, keyed by station id and the hash of the EPW archive.
+
+    An in-process LRU serves repeated requests of the same worker, while a columnar copy on
+    disk (see `src.epw_columnar`) lets other workers (and restarts) memory-map the values
+    instead of extracting and parsing the EPW again.
+    """
+
+    def __init__(self, root: Optional[str] = None, maxsize: int = 16, max_bytes: int = 256 * 1024 ** 2):
+        self.root = root or os.path.join(os.getenv('EPW_CACHE_DIR', DEFAULT_CACHE_DIR), 'weather')
+        self.max_bytes = max_bytes
+        self._memory = LRUCache(maxsize=maxsize)
+
+    def get_or_load(self, station_id: Hashable, file_hash: str, loader: Callable[[], WeatherData]) -> WeatherData:
+        """
+        Returns the cached weather data, falling back to the disk tier and finally to `loader`.
+        """
+        key = (str(station_id), file_hash)
+        return self._memory.get_or_set(key, lambda: self._load(key, loader))
+
+    def _load(self, key, loader: Callable[[], WeatherData]) -> WeatherData:
+        path = self._path(key)
+        try:
+            weather_data = read_columnar(path)
+            for extension in ('.npy', '.json'):
+                os.utime(path + extension)  # the modification time doubles as the last access time
+            return weather_data
+        except (OSError, ValueError, KeyError):
+            pass  # missing, evicted or outdated files are simply rebuilt
+        write_columnar(loader(), path)
+        weather_data = read_columnar(path)
+        _evict_lru(self.root, self.max_bytes)
+        return weather_data
+
+    def _path(self, key) -> str:
+        station_id, file_hash = key
+        return os.path.join(self.root, hashlib.sha256(station_id.encode()).hexdigest()[:16] + '-' + file_hash)
+
+
+_zip_cache = None
+_weather_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_zip_cache() -> EpwZipCache:
+    """Returns the process-wide zip archive cache, creating it on first use."""
+    global _zip_cache
+    with _cache_lock:
+        if _zip_cache is None:
+            _zip_cache = EpwZipCache()
+        return _zip_cache
+
+
+def get_weather_cache() -> WeatherDataCache:
+    """Returns the process-wide parsed weather data cache, creating it on first use."""
+    global _weather_cache
+    with _cache_lock:
+        if _weather_cache is None:
+            _weather_cache = WeatherDataCache()
+        return _weather_cache
@@ -1,159 +1,197 @@
-from datetime import datetime
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Sequence
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+from plotly.colors import sample_colorscale
+from plotly.subplots import make_subplots
 from ladybug.epw import EPW
+from src.data_objects import DEFAULT_SPEED_BANDS, WindStats, speed_band_labels
+
+
+HOURS_PER_DAY = 24
+# heatmap axes for a (leap) year of hourly values, shared by every chart
+DAY_OF_YEAR_AXES = {days: np.arange(1, days + 1) for days in (365, 366)}
+MINUTE_OF_DAY_AXIS = np.arange(HOURS_PER_DAY) * 60
+
+
+def day_hour_grid(values) -> np.ndarray:
+    """
+    Reshapes a year of hourly values into the (24, days) matrix plotted by the flood plots,
+    with the hours of the day as rows and the days of the year as columns.
+
+    Parameters:
+    - values: 8760 (or 8784 for a leap year) hourly values, starting on the 1st of January.
+
+    Returns:
+    - np.ndarray: The values as a float matrix, without copying when they already are floats.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return values.reshape(_days_in_year(values.size), HOURS_PER_DAY).T
+
+
+def _days_in_year(hours: int) -> int:
+    days, remainder = divmod(hours, HOURS_PER_DAY)
+    if remainder or days not in DAY_OF_YEAR_AXES:
+        raise ValueError(f"Expected a year of hourly values, got {hours}")
+    return days
+
+
+@dataclass(frozen=True)
+class HeatmapSpec:
+    """Describes an annual heatmap of one hourly field: its title, colour scale and colour bar label."""
+    title: str
+    colorbar_title: str
+    colorscale: str = 'blues'
+
+
+HEATMAP_SPECS = {
+    'dry_bulb_temp': HeatmapSpec('Dry Bulb Temperature Distribution', 'Temperature (°C)', 'jet'),
+    'relative_humidity': HeatmapSpec('Relative Humidity %', 'Relative Humidity'),
+    'total_sky_cover': HeatmapSpec('Cloud Cover %', 'Cloud Cover'),
+    'radiant_temp': HeatmapSpec('Dew Point Temperature Distribution', 'Temperature (°C)', 'jet'),
+    'wind_speed': HeatmapSpec('Wind Speed Distribution', 'Wind Speed (m/s)', 'viridis'),
+}
+
+# Layout shared by the heatmaps, with custom tick marks
+MONTH_AXIS = dict(
+    title='Month',
+    tickmode='array',
+    tickvals=[15, 46, 74, 105, 135, 166, 196, 227, 258, 288, 319, 349],
+    ticktext=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+)
+TIME_OF_DAY_AXIS = dict(
+    title='Time of Day',
+    tickmode='array',
+    tickvals=[0, 180, 360, 540, 720, 900, 1080, 1260, 1380],
+    ticktext=['12 AM', '3 AM', '6 AM', '9 AM', '12 PM', '3 PM', '6 PM', '9 PM', '11 PM']
+)
+
+
+def heatmap_figure(data, spec: HeatmapSpec) -> go.Figure:
+    """
+    Builds the annual day/hour heatmap of one field.
+
+    Parameters:
+    - data: A year of hourly values: a data collection (anything with `values`), a NumPy column
+      or a (24, days) grid from `day_hour_grid`.
+    - spec (HeatmapSpec): Title and colours of the chart.
+
+    Returns:
+    - go.Figure: The heatmap.
+    """
+    values = getattr(data, 'values', data)
+    z = values if np.ndim(values) == 2 else day_hour_grid(values)
 
-
-def epw_temp_flood_plot(epw: EPW):
-    datetimes = [datetime.strptime(dt_str, "%d %b %H:%M") for dt_str in epw.dry_bulb_temp.datetime_strings]
-    day_of_year_list = [dt.timetuple().tm_yday for dt in datetimes]
-    minute_list = [dt.hour * 60 + dt.minute for dt in datetimes]
-
-
-    # Create a heatmap
     heatmap = go.Heatmap(
-        z=epw.dry_bulb_temp.values,  # Data values
-        x=day_of_year_list,  # Day of year on x-axis
-        y=minute_list,  # Minutes on y-axis
-        colorscale='jet',  # Color scale for the heatmap
-        colorbar=dict(
-            title='Temperature (°C)',  # Title for the color bar indicating temperature in Celsius
-            titleside='right'
-        )
+        z=z,  # Data values
+        x=DAY_OF_YEAR_AXES[z.shape[1]],  # Day of year on x-axis
+        y=MINUTE_OF_DAY_AXIS,  # Minutes on y-axis
+        colorscale=spec.colorscale,
+        colorbar=dict(title=dict(text=spec.colorbar_title, side='right'))
     )
+    layout = go.Layout(title=spec.title, xaxis=MONTH_AXIS, yaxis=TIME_OF_DAY_AXIS)
+    return go.Figure(data=[heatmap], layout=layout)
 
-    # Layout configuration, including custom tick marks
-    layout = go.Layout(
-        title='Dry Bulb Temperature Distribution',
-        xaxis=dict(
-            title='Month',
-            tickmode='array',
-            tickvals=[15, 46, 74, 105, 135, 166, 196, 227, 258, 288, 319, 349],
-            ticktext=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        ),
-        yaxis=dict(
-            title='Time of Day',
-            tickmode='array',
-            tickvals=[0, 180, 360, 540, 720, 900, 1080, 1260, 1380],
-            ticktext=['12 AM', '3 AM', '6 AM', '9 AM', '12 PM', '3 PM', '6 PM', '9 PM', '11 PM']
-        )
-    )
 
-    # Creating the figure with data and layout
-    fig = go.Figure(data=[heatmap], layout=layout)
-    return fig
+def heatmap_figures(weather_data, fields: Optional[Iterable[str]] = None,
+                    specs: Optional[Dict[str, HeatmapSpec]] = None) -> Dict[str, go.Figure]:
+    """
+    Builds the heatmaps of several fields of the weather data in one batch, reshaping all
+    columns into their day/hour grids with a single NumPy operation.
 
+    Parameters:
+    - weather_data: The weather data (e.g. `WeatherData` or a Ladybug `EPW`) holding the fields.
+    - fields: Names of the fields to plot, by default every field of `specs`.
+    - specs (dict): The chart spec per field name, by default `HEATMAP_SPECS`.
 
-def epw_rh_flood_plot(epw: EPW):
-    datetimes = [datetime.strptime(dt_str, "%d %b %H:%M") for dt_str in epw.relative_humidity.datetime_strings]
-    day_of_year_list = [dt.timetuple().tm_yday for dt in datetimes]
-    minute_list = [dt.hour * 60 + dt.minute for dt in datetimes]
+    Returns:
+    - Dict[str, go.Figure]: The heatmap per field.
+    """
+    specs = HEATMAP_SPECS if specs is None else specs
+    fields = list(specs if fields is None else fields)
+    columns = np.vstack([np.asarray(getattr(weather_data, field).values, dtype=np.float64) for field in fields])
+    grids = columns.reshape(len(fields), _days_in_year(columns.shape[1]), HOURS_PER_DAY).transpose(0, 2, 1)
+    return {field: heatmap_figure(grid, specs[field]) for field, grid in zip(fields, grids)}
 
 
-    # Create a heatmap
-    heatmap = go.Heatmap(
-        z=epw.relative_humidity.values,  # Data values
-        x=day_of_year_list,  # Day of year on x-axis
-        y=minute_list,  # Minutes on y-axis
-        colorscale='blues',  # Color scale for the heatmap
-        colorbar=dict(
-            title='Relative Humidity',  # Title for the color bar indicating temperature in Celsius
-            titleside='right'
-        )
-    )
+def epw_temp_flood_plot(epw: EPW):
+    return heatmap_figure(epw.dry_bulb_temp, HEATMAP_SPECS['dry_bulb_temp'])
 
-    # Layout configuration, including custom tick marks
-    layout = go.Layout(
-        title='Relative Humidity %',
-        xaxis=dict(
-            title='Month',
-            tickmode='array',
-            tickvals=[15, 46, 74, 105, 135, 166, 196, 227, 258, 288, 319, 349],
-            ticktext=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        ),
-        yaxis=dict(
-            title='Time of Day',
-            tickmode='array',
-            tickvals=[0, 180, 360, 540, 720, 900, 1080, 1260, 1380],
-            ticktext=['12 AM', '3 AM', '6 AM', '9 AM', '12 PM', '3 PM', '6 PM', '9 PM', '11 PM']
-        )
-    )
 
-    # Creating the figure with data and layout
-    fig = go.Figure(data=[heatmap], layout=layout)
-    return fig
+def epw_rh_flood_plot(epw: EPW):
+    return heatmap_figure(epw.relative_humidity, HEATMAP_SPECS['relative_humidity'])
 
 
 def epw_cloud_flood_plot(epw: EPW):
-    datetimes = [datetime.strptime(dt_str, "%d %b %H:%M") for dt_str in epw.total_sky_cover.datetime_strings]
-    day_of_year_list = [dt.timetuple().tm_yday for dt in datetimes]
-    minute_list = [dt.hour * 60 + dt.minute for dt in datetimes]
+    return heatmap_figure(epw.total_sky_cover, HEATMAP_SPECS['total_sky_cover'])
 
-    # Create a heatmap
-    heatmap = go.Heatmap(
-        z=epw.total_sky_cover.values,  # Data values
-        x=day_of_year_list,  # Day of year on x-axis
-        y=minute_list,  # Minutes on y-axis
-        colorscale='blues',  # Color scale for the heatmap
-        colorbar=dict(
-            title='Relative Humidity',  # Title for the color bar indicating temperature in Celsius
-            titleside='right'
-        )
-    )
 
-    # Layout configuration, including custom tick marks
-    layout = go.Layout(
-        title='Cloud Cover %',
-        xaxis=dict(
-            title='Month',
-            tickmode='array',
-            tickvals=[15, 46, 74, 105, 135, 166, 196, 227, 258, 288, 319, 349],
-            ticktext=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        ),
-        yaxis=dict(
-            title='Time of Day',
-            tickmode='array',
-            tickvals=[0, 180, 360, 540, 720, 900, 1080, 1260, 1380],
-            ticktext=['12 AM', '3 AM', '6 AM', '9 AM', '12 PM', '3 PM', '6 PM', '9 PM', '11 PM']
-        )
-    )
-
-    # Creating the figure with data and layout
-    fig = go.Figure(data=[heatmap], layout=layout)
-    return fig
+def epw_wind_rose(epw_data, sectors: int = 16, speed_bands: Sequence[float] = DEFAULT_SPEED_BANDS):
+    return wind_rose_figure(epw_data.get_wind_stats(sectors=sectors, speed_bands=speed_bands))
 
 
-def epw_wind_rose(epw_data):
-    stats_df = epw_data.get_wind_stats()
+def wind_rose_figure(stats: WindStats, title: str = 'Wind Rose'):
+    """Renders precomputed wind statistics (e.g. a slice from `src.wind_analysis`) as a stacked wind rose."""
+    total = max(stats.frequency.sum(), 1)
+    colors = sample_colorscale('blues', np.linspace(0.25, 1.0, len(stats.speed_bands)))
 
-    # Creating the wind rose plot
-    wind_rose = go.Barpolar(
-        r=stats_df['Frequency'],
-        theta=stats_df['Wind Direction Bin'],
-        marker=dict(
-            color=stats_df['Average_Speed'],
-            colorscale='blues',  # You can choose a different color scale as needed
-            cmin=stats_df['Average_Speed'].min(),
-            cmax=stats_df['Average_Speed'].max()
-        ),
-        hoverinfo='r+theta'
-    )
+    # Creating the wind rose plot, one stacked bar per speed band
+    wind_rose = [
+        go.Barpolar(
+            r=stats.band_frequency[:, band] / total * 100,
+            theta=stats.labels,
+            name=label,
+            marker=dict(color=color),
+            hovertemplate='%{theta}: %{r:.1f}%'
+        )
+        for band, (label, color) in enumerate(zip(speed_band_labels(stats.speed_bands), colors))
+    ]
 
     # Layout configuration
     layout = go.Layout(
-        title='Wind Rose',
+        title=title,
         polar=dict(
+            barmode='stack',
+            angularaxis=dict(direction='clockwise', rotation=90),
             radialaxis=dict(
-                visible=False,  # Change this to True
-                range=[0, stats_df['Frequency'].max()]  # Make sure this is set to the max of Frequency, not Average_Speed
+                visible=False,
+                range=[0, stats.frequency.max() / total * 100]
             )
         ),
         legend=dict(title='Wind Speed (m/s)')
     )
 
-
     # Creating the figure with data and layout
-    fig = go.Figure(data=[wind_rose], layout=layout)
+    fig = go.Figure(data=wind_rose, layout=layout)
     return fig
 
+
+def station_comparison_figure(comparison):
+    """Renders a `StationComparison`: monthly mean temperatures, degree days and the UTCI stress distribution."""
+    fig = make_subplots(rows=3, cols=1, vertical_spacing=0.1,
+                        subplot_titles=('Monthly Mean Dry Bulb Temperature (°C)', 'Degree Days (K day)',
+                                        'UTCI Stress Categories (% of hours)'))
+    colors = sample_colorscale('turbo', np.linspace(0, 1, max(len(comparison.names), 2)))
+    for name, monthly, color in zip(comparison.names, comparison.monthly_mean_temp, colors):
+        fig.add_trace(go.Scatter(x=MONTH_AXIS['ticktext'], y=monthly, name=name, mode='lines+markers',
+                                 line=dict(color=color), legendgroup='stations'), row=1, col=1)
+
+    for column, label in enumerate(('Heating', 'Cooling')):
+        fig.add_trace(go.Bar(x=comparison.names, y=comparison.degree_days[:, column], name=label,
+                             legendgroup='degree_days'), row=2, col=1)
+
+    for column, label in enumerate(comparison.utci_labels):
+        if comparison.utci_fractions[:, column].any():
+            fig.add_trace(go.Bar(x=comparison.names, y=comparison.utci_fractions[:, column] * 100, name=label,
+                                 legendgroup='utci'), row=3, col=1)
+
+    title = 'Station Comparison'
+    if comparison.errors:
+        # name the stations left out, so they do not silently disappear from the comparison
+        failed = ', '.join(f"{comparison.error_names.get(station_id, station_id)} ({error})"
+                           for station_id, error in comparison.errors.items())
+        title += f"<br><sup>Not available: {failed}</sup>"
+    fig.update_layout(title=title, barmode='stack', height=1000, yaxis3=dict(range=[0, 100]))
+    return fig
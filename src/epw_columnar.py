@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+import numpy as np
+from ladybug.header import Header
+from ladybug.location import Location
+from src.data_objects import WeatherData, HourlyArray
+
+
+WEATHER_FIELDS = ('dry_bulb_temp', 'radiant_temp', 'wind_speed', 'wind_direction', 'relative_humidity', 'total_sky_cover')
+FORMAT_VERSION = 1
+
+
+def write_columnar(weather_data: WeatherData, path: str) -> None:
+    """
+    Writes the hourly fields of the weather data to a compact columnar file.
+
+    The values are stored as one `.npy` matrix with a row per field, so every field is a
+    contiguous block that can be memory-mapped on its own, next to a `.json` file holding the
+    Ladybug headers. The JSON is written last and marks the pair as complete.
+
+    Parameters:
+    - weather_data (WeatherData): The weather data to store.
+    - path (str): Path of the files without extension.
+    """
+    columns = np.vstack([np.asarray(getattr(weather_data, field).values, dtype=np.float64) for field in WEATHER_FIELDS])
+    meta = {
+        'version': FORMAT_VERSION,
+        'units': weather_data.units,
+        'fields': list(WEATHER_FIELDS),
+        'headers': {field: getattr(weather_data, field).header.to_dict() for field in WEATHER_FIELDS},
+        'location': weather_data.location.to_dict() if weather_data.location is not None else None,
+    }
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    for extension, write in (('.npy', lambda file: np.save(file, columns)),
+                             ('.json', lambda file: file.write(json.dumps(meta).encode()))):
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                write(file)
+            os.replace(temp_path, path + extension)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+def read_columnar(path: str, mmap: bool = True) -> WeatherData:
+    """
+    Loads weather data written by `write_columnar` without parsing any text.
+
+    Parameters:
+    - path (str): Path of the files without extension.
+    - mmap (bool): Memory-map the values, so workers reading the same station share the pages.
+
+    Returns:
+    - WeatherData: Weather data backed by `HourlyArray` fields.
+    """
+    with open(path + '.json', 'r') as file:
+        meta = json.load(file)
+    if meta.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported columnar format version {meta.get('version')}")
+
+    columns = np.load(path + '.npy', mmap_mode='r' if mmap else None)
+    if columns.shape[0] != len(meta['fields']):
+        raise ValueError("Columnar file does not match its header")
+
+    fields = {field: HourlyArray(Header.from_dict(meta['headers'][field]), columns[index])
+              for index, field in enumerate(meta['fields'])}
+    # the values were stored in their final units: bypass `__post_init__`, which would convert IP data again
+    weather_data = object.__new__(WeatherData)
+    for field, values in fields.items():
+        setattr(weather_data, field, values)
+    weather_data.units = meta['units']
+    weather_data.location = Location.from_dict(meta['location']) if meta.get('location') else None
+    return weather_data
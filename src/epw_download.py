@@ -0,0 +1,152 @@
+import asyncio
+import concurrent.futures
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+import aiohttp
+from src.epw_cache import EpwZipCache, get_zip_cache
+
+
+class AsyncEpwDownloader:
+    """
+    Downloads EPW archives into the zip cache with aiohttp.
+
+    A single `ClientSession` (and therefore one connection pool, limited per host) lives on a
+    background event loop, so the synchronous VIKTOR callbacks can share it. Downloads are
+    bounded by a semaphore, retried with exponential backoff on connection errors and 5xx/429
+    responses, and streamed chunk by chunk into the cache. The (blocking) disk I/O of the cache
+    runs on a small thread pool, so it never stalls the other downloads on the event loop.
+
+    Certificate verification is off by default, like the other EPW downloads of the app
+    (`DownloadMethod`, `EpwZipCache`), because some of the EPW sources serve incomplete
+    certificate chains. Pass `verify_ssl=True`, or set `EPW_VERIFY_SSL=1`, to enable it.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, cache: EpwZipCache, max_concurrency: int = 4, limit_per_host: int = 4,
+                 retries: int = 3, backoff: float = 0.5, timeout: float = 60, chunk_size: int = 64 * 1024,
+                 verify_ssl: Optional[bool] = None):
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.limit_per_host = limit_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.verify_ssl = verify_ssl if verify_ssl is not None else os.getenv('EPW_VERIFY_SSL', '0') == '1'
+        self._io = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='epw-io')
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='epw-downloader', daemon=True)
+        self._thread.start()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def download(self, url: str) -> bytes:
+        """
+        Returns the archive at the url from the cache, downloading or revalidating it when needed.
+        Blocks the calling thread until the archive is available.
+        """
+        return self._submit(self.fetch(url)).result()
+
+    def prefetch(self, urls: Iterable[str]) -> concurrent.futures.Future:
+        """
+        Starts downloading every archive that is not fresh in the cache yet and returns immediately.
+        Failures are ignored; the archive is simply downloaded again when it is requested.
+        """
+        urls = [url for url in dict.fromkeys(urls) if url and self.cache.content_hash(url, fresh=True) is None]
+
+        async def prefetch_all():
+            return await asyncio.gather(*(self.fetch(url) for url in urls), return_exceptions=True)
+
+        return self._submit(prefetch_all())
+
+    async def fetch(self, url: str) -> bytes:
+        """Coroutine returning the archive; concurrent requests for the same url share one download."""
+        task = self._in_flight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url))
+            self._in_flight[url] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _run_io(self, function, *args):
+        """Runs a blocking cache call on the I/O thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(self._io, function, *args)
+
+    async def _fetch(self, url: str) -> bytes:
+        data, fresh = await self._run_io(self.cache.lookup, url)
+        if fresh:
+            return data
+
+        session, semaphore = self._get_session()
+        for attempt in range(self.retries + 1):
+            try:
+                # every attempt takes its own slot, so a failing station does not hold one while backing off
+                async with semaphore:
+                    return await self._fetch_once(session, url, data)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                retryable = not isinstance(e, aiohttp.ClientResponseError) or e.status in self.RETRY_STATUSES
+                if not retryable or attempt == self.retries:
+                    if data is not None:
+                        return data  # serve the stale copy rather than failing
+                    raise
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    async def _fetch_once(self, session: aiohttp.ClientSession, url: str, cached: Optional[bytes]) -> bytes:
+        headers = await self._run_io(self.cache.conditional_headers, url) if cached is not None else {}
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304 and cached is not None:
+                await self._run_io(self.cache.mark_fresh, url)
+                return cached
+            response.raise_for_status()
+
+            writer = await self._run_io(self.cache.writer)
+            chunks: List[bytes] = []
+            try:
+                async for chunk in response.content.iter_chunked(self.chunk_size):
+                    await self._run_io(writer.write, chunk)
+                    chunks.append(chunk)
+            except BaseException:
+                await self._run_io(writer.abort)
+                raise
+            await self._run_io(writer.commit, url, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return b''.join(chunks)
+
+    def _get_session(self):
+        # only ever called on the event loop thread
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.limit_per_host, ssl=None if self.verify_ssl else False)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session, self._semaphore
+
+    def _submit(self, coroutine) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def close(self) -> None:
+        """Closes the connection pool and stops the background event loop."""
+        async def close_session():
+            if self._session is not None:
+                await self._session.close()
+
+        self._submit(close_session()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._io.shutdown(wait=True)
+
+
+_downloader = None
+_downloader_lock = threading.Lock()
+
+
+def get_downloader() -> AsyncEpwDownloader:
+    """Returns the process-wide downloader writing into the shared zip cache, creating it on first use."""
+    global _downloader
+    with _downloader_lock:
+        if _downloader is None:
+            _downloader = AsyncEpwDownloader(get_zip_cache())
+        return _downloader
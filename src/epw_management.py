@@ -1,12 +1,28 @@
 from abc import ABC, abstractmethod
 import pandas as pd
+import numpy as np
+import hashlib
 import requests
 import zipfile
 import io
-import os
-import tempfile
-from ladybug.epw import EPW
-from src.data_objects import WeatherData
+from typing import Dict, Optional
+from ladybug.analysisperiod import AnalysisPeriod
+from ladybug.epw import EPW, EPWFields
+from ladybug.header import Header
+from ladybug.location import Location
+from src.data_objects import WeatherData, HourlyArray
+from src.epw_cache import EpwZipCache, WeatherDataCache
+from src.epw_download import AsyncEpwDownloader
+
+# EPW field numbers of the WeatherData attributes (the dew point serves as the radiant temperature)
+EPW_FIELD_NUMBERS = {
+    'dry_bulb_temp': 6,
+    'radiant_temp': 7,
+    'relative_humidity': 8,
+    'wind_direction': 20,
+    'wind_speed': 21,
+    'total_sky_cover': 22,
+}
 
 
 class EpwManager(ABC):
@@ -20,12 +36,116 @@ class EpwManager(ABC):
         pass
 
 
+class EpwParser(ABC):
+    """
+    Abstract base class turning the text of an EPW file into weather data.
+    """
+
+    @abstractmethod
+    def parse(self, epw_text: str) -> WeatherData:
+        pass
+
+
+class LadybugEpwParser(EpwParser):
+    """
+    Parses the complete EPW with Ladybug, building a collection for each of its fields.
+    """
+
+    def parse(self, epw_text: str) -> WeatherData:
+        epw_data = EPW.from_file_string(epw_text)
+
+        return WeatherData(
+            dry_bulb_temp=epw_data.dry_bulb_temperature,
+            radiant_temp= epw_data.dew_point_temperature,
+            total_sky_cover= epw_data.total_sky_cover,
+            wind_direction= epw_data.wind_direction,
+            wind_speed= epw_data.wind_speed,
+            relative_humidity=epw_data.relative_humidity,
+            units= "SI" if epw_data.is_ip == False else "I{}",
+            location=epw_data.location
+        )
+
+
+class NumpyEpwParser(EpwParser):
+    """
+    Reads only the EPW columns used by the app into NumPy arrays with the C CSV reader of pandas.
+
+    The resulting `HourlyArray` fields carry the same headers, values and point-in-time shift as
+    the collections Ladybug would build, without creating a Python object for every hour.
+    """
+
+    def __init__(self, field_numbers: Optional[Dict[str, int]] = None):
+        self.field_numbers = field_numbers or EPW_FIELD_NUMBERS
+
+    def parse(self, epw_text: str) -> WeatherData:
+        lines = epw_text.split('\n', 8)
+        if len(lines) < 9:
+            raise ValueError("EPW file is missing its header or data")
+        location = self._parse_location(lines[0])
+        metadata = {
+            'source': location.source,
+            'country': location.country,
+            'city': location.city,
+            'time-zone': location.time_zone
+        }
+
+        columns = sorted(set(self.field_numbers.values()))
+        table = pd.read_csv(io.StringIO(lines[8]), header=None, usecols=columns,
+                            dtype={column: np.float64 for column in columns}, engine='c',
+                            float_precision='round_trip')
+        analysis_period = AnalysisPeriod(is_leap_year=len(table) == 8784)
+        if len(table) != len(analysis_period):
+            raise ValueError(f"Expected hourly data for a full year, got {len(table)} rows")
+
+        fields = {}
+        for name, number in self.field_numbers.items():
+            field = EPWFields.field_by_number(number)
+            values = table[number].to_numpy()
+            if field.value_type is int:
+                values = np.round(values)
+            if field.name.point_in_time:
+                # the EPW starts at 1 AM, Ladybug moves the last hour to the start of the year
+                values = np.roll(values, 1)
+            header = Header(data_type=field.name, unit=field.unit, analysis_period=analysis_period,
+                            metadata=dict(metadata))
+            fields[name] = HourlyArray(header, np.ascontiguousarray(values))
+
+        return WeatherData(**fields, units="SI", location=location)
+
+    @staticmethod
+    def _parse_location(line: str) -> Location:
+        location_data = line.strip().split(',')
+        location = Location()
+        location.city = location_data[1].replace('\\', ' ').replace('/', ' ')
+        location.state = location_data[2]
+        location.country = location_data[3]
+        location.source = location_data[4]
+        location.station_id = location_data[5]
+        location.latitude = location_data[6]
+        location.longitude = location_data[7]
+        location.time_zone = location_data[8]
+        location.elevation = location_data[9]
+        return location
+
+
 class DownloadMethod(EpwManager):
 
-    def __init__(self, url: str):
+    def __init__(self, url: str, cache: Optional[EpwZipCache] = None,
+                 weather_cache: Optional[WeatherDataCache] = None, station_id: Optional[str] = None,
+                 parser: Optional[EpwParser] = None, downloader: Optional[AsyncEpwDownloader] = None):
         self.url = url
+        self.downloader = downloader
+        self.cache = cache if cache is not None or downloader is None else downloader.cache
+        self.weather_cache = weather_cache
+        self.station_id = station_id if station_id is not None else url
+        self.parser = parser or NumpyEpwParser()
 
     def get_zip_in_memory(self):
+        if self.downloader is not None:
+            return io.BytesIO(self.downloader.download(self.url))
+        if self.cache is not None:
+            return io.BytesIO(self.cache.get(self.url))
+
         # Download the zip file content securely
         response = requests.get(self.url, verify=False)
         response.raise_for_status()
@@ -34,31 +154,50 @@ class DownloadMethod(EpwManager):
         return io.BytesIO(response.content)
 
 
+    def content_hash(self) -> str:
+        """
+        Returns the sha256 of the archive, revalidating (or downloading) it when the zip cache
+        does not hold a fresh copy, so it changes as soon as the EPW file of the station does.
+        """
+        file_hash = self.cache.content_hash(self.url, fresh=True) if self.cache is not None else None
+        if file_hash is None:
+            zip_in_memory = self.get_zip_in_memory()
+            file_hash = self.cache.content_hash(self.url) if self.cache is not None else None
+            if file_hash is None:
+                file_hash = hashlib.sha256(zip_in_memory.getbuffer()).hexdigest()
+        return file_hash
+
     def get_weather_data(self) -> WeatherData:
-        zip_in_memory = self.get_zip_in_memory()
+        if self.weather_cache is None:
+            return self._read_weather_data(self.get_zip_in_memory())
 
-        # Extract the EPW file's content
-        with zipfile.ZipFile(zip_in_memory) as zip_ref, tempfile.TemporaryDirectory() as temp_dir:
+        # With a fresh archive in the zip cache its hash is known without reading the archive itself
+        zip_in_memory = None
+        file_hash = self.cache.content_hash(self.url, fresh=True) if self.cache is not None else None
+        if file_hash is None:
+            zip_in_memory = self.get_zip_in_memory()
+            file_hash = hashlib.sha256(zip_in_memory.getbuffer()).hexdigest()
+        return self.weather_cache.get_or_load(
+            self.station_id, file_hash,
+            lambda: self._read_weather_data(zip_in_memory if zip_in_memory is not None else self.get_zip_in_memory())
+        )
+
+    @staticmethod
+    def _read_epw_text(zip_in_memory: io.BytesIO) -> str:
+        """Reads the first EPW file of the archive straight into memory, without extracting it to disk."""
+        with zipfile.ZipFile(zip_in_memory) as zip_ref:
             epw_names = [name for name in zip_ref.namelist() if name.endswith('.epw')]
             if not epw_names:
                 raise FileNotFoundError("No EPW file found in the zip archive")
-            epw_name = epw_names[0]  # Taking the first EPW file found
-
-            # Extract the EPW file to the temporary directory
-            zip_ref.extract(epw_name, temp_dir)
-            epw_file_path = os.path.join(temp_dir, epw_name)
-            
-            # Now you can use the EPW file path with Ladybug
-            epw_data = EPW(epw_file_path)
-
-            weather_data_instance = WeatherData(
-                dry_bulb_temp=epw_data.dry_bulb_temperature,
-                radiant_temp= epw_data.dew_point_temperature,
-                total_sky_cover= epw_data.total_sky_cover,
-                wind_direction= epw_data.wind_direction,
-                wind_speed= epw_data.wind_speed,
-                relative_humidity=epw_data.relative_humidity,
-                units= "SI" if epw_data.is_ip == False else "I{}"
-            )
-    
-            return weather_data_instance
\ No newline at end of file
+            raw = zip_ref.read(epw_names[0])  # Taking the first EPW file found
+
+        try:
+            text = raw.decode('utf-8')
+        except UnicodeDecodeError:  # station names are frequently latin-1 encoded
+            text = raw.decode('latin-1')
+        text = text.replace('\r\n', '\n')
+        # Ladybug drops the last line of the split file, which is the blank after the final newline
+        return text if text.endswith('\n') else text + '\n'
+
+    def _read_weather_data(self, zip_in_memory: io.BytesIO) -> WeatherData:
+        return self.parser.parse(self._read_epw_text(zip_in_memory))
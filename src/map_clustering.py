@@ -0,0 +1,184 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import threading
+import numpy as np
+from src.caching import LRUCache
+from src.data_objects import StationQueryResult
+from src.station_retrieval import TileStationCache, get_station_cache
+from src.utility import EARTH_RADIUS_KM
+
+KM_PER_DEGREE = 2 * np.pi * EARTH_RADIUS_KM / 360
+MAX_SUBDIVISIONS = 64
+_COLUMN_OFFSET = 1 << 31  # keeps the grid columns positive in the combined cell key
+
+
+@dataclass
+class StationClusters:
+    """
+    The stations of a query reduced to the markers drawn on the map.
+
+    - singles: Ids of the stations drawn as their own marker, in query order.
+    - members: Station ids per cluster.
+    - coordinates: (lat, lng) of the members per cluster, one (members, 2) array each.
+    """
+    singles: List[str]
+    members: List[List[str]]
+    coordinates: List[np.ndarray]
+
+    @classmethod
+    def unclustered(cls, result: StationQueryResult) -> 'StationClusters':
+        """Every station of the result drawn as its own marker."""
+        return cls(singles=[str(station['_id']) for station in result.stations], members=[], coordinates=[])
+
+    @property
+    def counts(self) -> np.ndarray:
+        return np.fromiter((len(ids) for ids in self.members), dtype=np.intp, count=len(self.members))
+
+    @property
+    def lats(self) -> np.ndarray:
+        """Centroid latitude of every cluster [deg]."""
+        return np.array([points[:, 0].mean() for points in self.coordinates])
+
+    @property
+    def lngs(self) -> np.ndarray:
+        """Centroid longitude of every cluster [deg]."""
+        return np.array([points[:, 1].mean() for points in self.coordinates])
+
+    def release(self, station_id: Optional[str]) -> 'StationClusters':
+        """
+        Returns the clusters with the station taken out of its cluster and drawn on its own, e.g. to
+        keep the selected station visible. A cluster left with a single station is dissolved.
+        """
+        station_id = str(station_id) if station_id is not None else None
+        index = next((i for i, ids in enumerate(self.members) if station_id in ids), None)
+        if index is None:
+            return self
+        keep = [other != station_id for other in self.members[index]]
+        remaining = [other for other, kept in zip(self.members[index], keep) if kept]
+        members, coordinates = list(self.members), list(self.coordinates)
+        if len(remaining) > 1:
+            members[index], coordinates[index] = remaining, coordinates[index][keep]
+            singles = [station_id]
+        else:
+            del members[index], coordinates[index]
+            singles = [station_id] + remaining
+        return StationClusters(singles=self.singles + singles, members=members, coordinates=coordinates)
+
+
+def cluster_subdivisions(radius: float, cells_per_radius: int = 10, tile_degrees: float = 1.0) -> int:
+    """
+    The zoom level of the clusters: the number of grid cells per tile side (a power of two) for
+    which cells are at most radius / `cells_per_radius` [km] high. Radii of the same level share
+    the grid, so the stations cluster the same way.
+    """
+    cells = tile_degrees * KM_PER_DEGREE * cells_per_radius / max(radius, 1e-9)
+    return int(min(2 ** np.ceil(np.log2(max(cells, 1.0))), MAX_SUBDIVISIONS))
+
+
+def grid_cells(lats: np.ndarray, lngs: np.ndarray, subdivisions: int, tile_degrees: float = 1.0) -> np.ndarray:
+    """
+    Assigns every point to a cell of an (approximately) square grid nested in the tiles of
+    `TileStationCache`: every tile is split into `subdivisions` rows, and into as many columns
+    as keep the cells square at the latitude of the tile. Cells never cross a tile border, so
+    the cells of a tile can be computed (and cached) from that tile alone.
+
+    Returns:
+    - np.ndarray: One int64 cell key per point.
+    """
+    lats, lngs = np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64)
+    tile_rows = np.minimum(np.floor((lats + 90) / tile_degrees), np.ceil(180 / tile_degrees) - 1)
+    tile_lats = np.clip((tile_rows + 0.5) * tile_degrees - 90, -89.9, 89.9)
+    columns_per_tile = np.maximum(np.round(subdivisions * np.cos(np.radians(tile_lats))), 1)
+    rows = np.minimum(np.floor((lats + 90) * subdivisions / tile_degrees), (tile_rows + 1) * subdivisions - 1)
+    columns = np.floor(np.mod(lngs + 180, 360) * columns_per_tile / tile_degrees)
+    return rows.astype(np.int64) * (1 << 32) + (columns.astype(np.int64) + _COLUMN_OFFSET)
+
+
+def group_stations(stations: List[Dict], subdivisions: int, min_cluster_size: int = 3,
+                   tile_degrees: float = 1.0) -> List[List[str]]:
+    """Returns the ids of the stations per grid cell, for the cells holding at least `min_cluster_size`."""
+    if not stations:
+        return []
+    lats = np.fromiter((station['lat'] for station in stations), dtype=np.float64, count=len(stations))
+    lngs = np.fromiter((station['lng'] for station in stations), dtype=np.float64, count=len(stations))
+    _, cells, counts = np.unique(grid_cells(lats, lngs, subdivisions, tile_degrees),
+                                 return_inverse=True, return_counts=True)
+    cells = cells.ravel()
+    in_cluster = (counts >= min_cluster_size)[cells]
+    if not in_cluster.any():
+        return []
+    order = np.argsort(cells[in_cluster], kind='stable')
+    ids = np.array([str(station['_id']) for station in stations], dtype=object)[in_cluster][order]
+    splits = np.cumsum(counts[counts >= min_cluster_size])[:-1]
+    return [list(group) for group in np.split(ids, splits)]
+
+
+def cluster_stations(result: StationQueryResult, groups: List[List[str]], min_cluster_size: int = 3) -> StationClusters:
+    """
+    Collapses the stations of the query that share a group (grid cell) into one cluster marker,
+    provided at least `min_cluster_size` of them are part of the query.
+
+    Parameters:
+    - result (StationQueryResult): The stations of the query.
+    - groups (List[List[str]]): Station ids per grid cell, see `group_stations`.
+    - min_cluster_size (int): Smallest number of stations drawn as a cluster instead of one by one.
+
+    Returns:
+    - StationClusters: The stations drawn on their own and the clusters.
+    """
+    positions = {str(station['_id']): i for i, station in enumerate(result.stations)}
+    members, coordinates = [], []
+    for group in groups:
+        inside = [station_id for station_id in group if station_id in positions]
+        if len(inside) >= min_cluster_size:
+            index = np.fromiter((positions[station_id] for station_id in inside), dtype=np.intp, count=len(inside))
+            members.append(inside)
+            coordinates.append(np.column_stack((result.lats[index], result.lngs[index])))
+    clustered = {station_id for ids in members for station_id in ids}
+    return StationClusters(singles=[station_id for station_id in positions if station_id not in clustered],
+                           members=members, coordinates=coordinates)
+
+
+class MapClusterCache:
+    """
+    Clusters the stations of a map query on a grid per zoom level (see `cluster_subdivisions`).
+
+    The grouping of the stations into grid cells is cached per tile of the `TileStationCache`
+    and zoom level, so panning the map or moving the radius slider within a level reuses it;
+    every query then only picks the stations in range from the cached groups.
+    """
+
+    def __init__(self, stations: TileStationCache, cells_per_radius: int = 10, min_cluster_size: int = 3,
+                 ttl: Optional[float] = 900, maxsize: int = 512):
+        self.stations = stations
+        self.cells_per_radius = cells_per_radius
+        self.min_cluster_size = min_cluster_size
+        self._groups = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def clusters(self, result: StationQueryResult, lat: float, lng: float, radius: float) -> StationClusters:
+        """Returns the clusters of the stations of the query around (lat, lng) within the radius [km]."""
+        tile_degrees = self.stations.tile_degrees
+        subdivisions = cluster_subdivisions(radius, self.cells_per_radius, tile_degrees)
+        groups = [group for tile in self.stations.covering_tiles(lat, lng, radius)
+                  for group in self._groups.get_or_set(
+                      (tile, subdivisions),
+                      lambda tile=tile: group_stations(self.stations.tile_stations(tile), subdivisions,
+                                                       self.min_cluster_size, tile_degrees))]
+        return cluster_stations(result, groups, self.min_cluster_size)
+
+    def clear(self) -> None:
+        self._groups.clear()
+
+
+_map_cluster_cache = None
+_map_cluster_cache_lock = threading.Lock()
+
+
+def get_map_cluster_cache() -> MapClusterCache:
+    """Returns the process-wide map cluster cache over the station tile cache, creating it on first use."""
+    global _map_cluster_cache
+    station_cache = get_station_cache()
+    with _map_cluster_cache_lock:
+        if _map_cluster_cache is None:
+            _map_cluster_cache = MapClusterCache(station_cache)
+        return _map_cluster_cache
@@ -0,0 +1,134 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+from src.data_objects import WeatherData
+from src.weather_analysis import UTCICalculator
+
+
+HOURS_PER_YEAR = 8760
+HOURS_PER_DAY = 24
+DAYS_PER_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+MONTH_STARTS = np.concatenate(([0], np.cumsum(DAYS_PER_MONTH)[:-1])) * HOURS_PER_DAY
+LEAP_DAY = slice(59 * HOURS_PER_DAY, 60 * HOURS_PER_DAY)  # the 29th of February in a leap year
+DEFAULT_PERCENTILES = (1, 10, 50, 90, 99)
+
+
+@dataclass
+class StationComparison:
+    """
+    Summary statistics of several stations, stacked with one row per station.
+
+    - monthly_mean_temp: Monthly mean dry bulb temperature [degC], (stations, 12).
+    - monthly_mean_rh: Monthly mean relative humidity [%], (stations, 12).
+    - temp_percentiles: Dry bulb temperature at `percentiles` [degC], (stations, len(percentiles)).
+    - degree_days: Heating and cooling degree days [K day], (stations, 2).
+    - utci_fractions: Fraction of the hours per UTCI stress category (`utci_labels`), (stations, categories).
+    - errors: Why a station could not be compared, per station id; `error_names` holds the names of those stations.
+    """
+    station_ids: List[str]
+    names: List[str]
+    percentiles: np.ndarray
+    monthly_mean_temp: np.ndarray
+    monthly_mean_rh: np.ndarray
+    temp_percentiles: np.ndarray
+    degree_days: np.ndarray
+    utci_labels: np.ndarray
+    utci_fractions: np.ndarray
+    errors: Dict[str, str] = field(default_factory=dict)
+    error_names: Dict[str, str] = field(default_factory=dict)
+
+
+def load_stations(stations: Sequence[dict], loader: Callable[[dict], WeatherData],
+                  max_workers: int = 4) -> Dict[str, WeatherData]:
+    """
+    Loads the weather data of the stations concurrently on a bounded thread pool.
+
+    Parameters:
+    - stations (Sequence[dict]): Stations as returned by `load_weather_stations`.
+    - loader (Callable): Downloads and parses the weather data of one station, e.g. through `DownloadMethod`.
+    - max_workers (int): Maximum number of stations loaded at the same time.
+
+    Returns:
+    - Dict[str, WeatherData | Exception]: The weather data (or the error raised) per station id, in input order.
+    """
+    def load(station):
+        try:
+            return loader(station)
+        except Exception as e:  # one unavailable station should not fail the whole comparison
+            return e
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(load, stations)
+        return {str(station['_id']): result for station, result in zip(stations, results)}
+
+
+def _year_of_hours(values) -> np.ndarray:
+    """Returns a year of hourly values as 8760 floats, dropping the 29th of February of leap years."""
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == HOURS_PER_YEAR + HOURS_PER_DAY:
+        values = np.delete(values, np.arange(LEAP_DAY.start, LEAP_DAY.stop))
+    if values.size != HOURS_PER_YEAR:
+        raise ValueError(f"Expected a year of hourly values, got {values.size}")
+    return values
+
+
+def summarise_stations(weather_data: Sequence[WeatherData], heating_base: float = 18.0, cooling_base: float = 18.0,
+                       percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, np.ndarray]:
+    """
+    Computes the comparison statistics of all stations at once on their stacked (stations, 8760) arrays.
+
+    Returns:
+    - Dict[str, np.ndarray]: The statistics named as the fields of `StationComparison`.
+    """
+    fields = ('dry_bulb_temp', 'radiant_temp', 'wind_speed', 'relative_humidity')
+    stacked = {name: np.vstack([_year_of_hours(getattr(data, name).values) for data in weather_data])
+               for name in fields}
+    temp = stacked['dry_bulb_temp']
+
+    hours_per_month = DAYS_PER_MONTH * HOURS_PER_DAY
+    daily_mean = temp.reshape(len(temp), -1, HOURS_PER_DAY).mean(axis=2)
+    degree_days = np.stack([np.maximum(heating_base - daily_mean, 0).sum(axis=1),
+                            np.maximum(daily_mean - cooling_base, 0).sum(axis=1)], axis=1)
+
+    calculator = UTCICalculator(weather_data[0])
+    utci = calculator.calculate_arrays(temp, stacked['radiant_temp'], stacked['wind_speed'],
+                                       stacked['relative_humidity'])['utci']
+    utci_hours = calculator.category_hours(utci)
+
+    return {
+        'percentiles': np.asarray(percentiles, dtype=np.float64),
+        'monthly_mean_temp': np.add.reduceat(temp, MONTH_STARTS, axis=1) / hours_per_month,
+        'monthly_mean_rh': np.add.reduceat(stacked['relative_humidity'], MONTH_STARTS, axis=1) / hours_per_month,
+        'temp_percentiles': np.percentile(temp, percentiles, axis=1).T,
+        'degree_days': degree_days,
+        'utci_labels': utci_hours['labels'],
+        'utci_fractions': utci_hours['fractions'],
+    }
+
+
+def compare_stations(stations: Sequence[dict], loader: Callable[[dict], WeatherData], max_workers: int = 4,
+                     **options) -> Optional[StationComparison]:
+    """
+    Loads all stations concurrently and summarises them into one `StationComparison`.
+    Stations that fail to load are left out and reported in `errors`; None is returned when none loaded.
+
+    Parameters:
+    - stations (Sequence[dict]): Stations as returned by `load_weather_stations`.
+    - loader (Callable): Downloads and parses the weather data of one station.
+    - max_workers (int): Maximum number of stations loaded at the same time.
+    - options: Passed on to `summarise_stations`.
+    """
+    loaded = load_stations(stations, loader, max_workers=max_workers)
+    names = {str(station['_id']): station['name'] for station in stations}
+    errors = {station_id: str(result) for station_id, result in loaded.items() if isinstance(result, Exception)}
+    errors.update({station_id: "Not a year of hourly data" for station_id, result in loaded.items()
+                   if station_id not in errors and len(result.dry_bulb_temp.values) not in (8760, 8784)})
+    weather_data = {station_id: result for station_id, result in loaded.items() if station_id not in errors}
+    if not weather_data:
+        return None
+
+    summary = summarise_stations(list(weather_data.values()), **options)
+    return StationComparison(station_ids=list(weather_data), names=[names[station_id] for station_id in weather_data],
+                             errors=errors, error_names={station_id: names[station_id] for station_id in errors},
+                             **summary)
@@ -1,8 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
-from pymongo import MongoClient
-from src.utility import haversine
+from typing import Callable, List, Dict, Optional
+from pymongo import MongoClient, GEOSPHERE, monitoring
+from pymongo.errors import OperationFailure
+from scipy.spatial import cKDTree
+from src.caching import LRUCache
+from src.utility import EARTH_RADIUS_KM, haversine_many
 from dotenv import load_dotenv
+import numpy as np
+import threading
+import time
 import os
 
 
@@ -43,22 +49,467 @@ class WeatherStationRetrieval(ABC):
 # Load environment variables from .env file
 load_dotenv()
 
+GEO_FIELD = 'location'
+
+# the station fields used by the app, everything else stays on the server
+STATION_FIELDS = ('elevation', 'years', 'period', 'wmo', 'dataset', 'source', 'lat', 'lng', 'name', 'url', 'updatedAt')
+STATION_PROJECTION = {field: 1 for field in STATION_FIELDS}
+DEFAULT_BATCH_SIZE = 1000
+
+MONGO_CLIENT_OPTIONS = {
+    'appname': 'dandelion',
+    'maxPoolSize': 20,
+    'minPoolSize': 0,
+    'maxIdleTimeMS': 300000,
+    'connectTimeoutMS': 5000,
+    'serverSelectionTimeoutMS': 5000,
+    'socketTimeoutMS': 30000,
+    # the station catalogue is read only, so secondaries can share the load
+    'readPreference': 'secondaryPreferred',
+    'retryReads': True,
+}
+
+
+class MongoInstrumentation(monitoring.CommandListener, monitoring.ConnectionPoolListener):
+    """
+    Reports the cost of the MongoDB traffic to a hook, keeping connection setup and queries apart.
+
+    The hook is called with the kind of event and its statistics:
+    - 'command': {'command', 'database', 'duration_ms', 'documents'} for every command that
+      succeeded, where `documents` is the number of documents in the returned batch.
+    - 'connection': {'address', 'duration_ms'} for every new connection that became ready
+      (connecting, TLS and authentication).
+    """
+
+    def __init__(self, hook: Optional[Callable[[str, Dict], None]] = None):
+        self.hook = hook
+
+    def _report(self, kind: str, stats: Dict) -> None:
+        if self.hook is not None:
+            self.hook(kind, stats)
+
+    def succeeded(self, event) -> None:
+        if self.hook is None:
+            return
+        cursor = event.reply.get('cursor', {}) if isinstance(event.reply, dict) else {}
+        documents = len(cursor.get('firstBatch', cursor.get('nextBatch', [])))
+        self._report('command', {
+            'command': event.command_name,
+            'database': event.database_name,
+            'duration_ms': event.duration_micros / 1000,
+            'documents': documents,
+        })
+
+    def connection_ready(self, event) -> None:
+        duration = getattr(event, 'duration', None)  # seconds, reported by pymongo 4.7+
+        self._report('connection', {
+            'address': event.address,
+            'duration_ms': duration * 1000 if duration is not None else None,
+        })
+
+    def started(self, event) -> None:
+        pass
+
+    def failed(self, event) -> None:
+        pass
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        pass
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        pass
+
+    def connection_checked_out(self, event) -> None:
+        pass
+
+    def connection_checked_in(self, event) -> None:
+        pass
+
+
+_instrumentation = MongoInstrumentation()
+_mongo_client = None
+_mongo_client_lock = threading.Lock()
+
+
+def set_instrumentation_hook(hook: Optional[Callable[[str, Dict], None]]) -> None:
+    """Sets the function receiving the query latency and connection setup statistics, None to disable it."""
+    _instrumentation.hook = hook
+
+
+def get_mongo_client() -> MongoClient:
+    """
+    Returns the process-wide MongoDB client, creating it on first use from the `MONGODB_URI`
+    environment variable (pymongo falls back to localhost when it is not set). The client holds
+    a connection pool shared by all threads and connects lazily on the first query.
+    """
+    global _mongo_client
+    with _mongo_client_lock:
+        if _mongo_client is None:
+            _mongo_client = MongoClient(os.getenv('MONGODB_URI'), event_listeners=[_instrumentation],
+                                        **MONGO_CLIENT_OPTIONS)
+        return _mongo_client
+
+
+def backfill_geo_locations(collection, field: str = GEO_FIELD) -> int:
+    """
+    Migration helper which adds a GeoJSON point to every station document that does not have
+    one yet and makes sure the 2dsphere index on that field exists.
+
+    The point is built server side from the existing `lat`/`lng` fields, so no documents are
+    transferred to the client.
+
+    Parameters:
+    - collection: The pymongo collection holding the weather stations.
+    - field (str): Name of the GeoJSON field to populate.
+
+    Returns:
+    - int: The number of documents that were updated.
+    """
+    result = collection.update_many(
+        {field: {'$exists': False}, 'lat': {'$type': 'number'}, 'lng': {'$type': 'number'}},
+        [{'$set': {field: {'type': 'Point', 'coordinates': ['$lng', '$lat']}}}]
+    )
+    collection.create_index([(field, GEOSPHERE)])
+    return result.modified_count
+
+
 class MongoEpwStorage(WeatherStationRetrieval):
     """
     Retrieves EPW file from internal database.
+
+    When the collection has a 2dsphere index on the GeoJSON `location` field the queries are
+    answered by MongoDB ($geoNear / $geoWithin). Otherwise, or when the geo query fails, the
+    stations are scanned and the distances are computed in Python.
     """
 
-    def __init__(self):
-        self.client = MongoClient('MONGODB_URI')
+    def __init__(self, use_geo_index: bool = True, client: Optional[MongoClient] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        self.client = client if client is not None else get_mongo_client()
         self.db = self.client['dandelion']
         self.collection = self.db['epw']
+        self.use_geo_index = use_geo_index
+        self.batch_size = batch_size
+        self._geo_index_available = None
+
+    def has_geo_index(self) -> bool:
+        """Checks (once per instance) whether the 2dsphere index on the location field exists."""
+        if self._geo_index_available is None:
+            try:
+                indexes = self.collection.index_information()
+            except OperationFailure:
+                indexes = {}
+            self._geo_index_available = any(
+                (GEO_FIELD, GEOSPHERE) in [tuple(key) for key in index.get('key', [])]
+                for index in indexes.values()
+            )
+        return self._geo_index_available
 
     def fetch_closest_station(self, lat: float, lng: float) -> Optional[Dict]:
-        documents = self.collection.find({})
-        distances = [(doc, haversine(lng, lat, doc['lng'], doc['lat'])) for doc in documents]
-        closest_doc = min(distances, key=lambda x: x[1])[0] if distances else None
-        return closest_doc
+        if self.use_geo_index and self.has_geo_index():
+            try:
+                return self._geo_closest_station(lat, lng)
+            except OperationFailure:
+                self._geo_index_available = False
+        return self._scan_closest_station(lat, lng)
 
     def fetch_range_stations(self, lat: float, lng: float, radius: float = 10) -> List[Dict]:
-        documents = self.collection.find({})
-        return [doc for doc in documents if haversine(lng, lat, doc['lng'], doc['lat']) <= radius]
\ No newline at end of file
+        if self.use_geo_index and self.has_geo_index():
+            try:
+                return self._geo_range_stations(lat, lng, radius)
+            except OperationFailure:
+                self._geo_index_available = False
+        return self._scan_range_stations(lat, lng, radius)
+
+    def _geo_closest_station(self, lat: float, lng: float) -> Optional[Dict]:
+        pipeline = [
+            {'$geoNear': {
+                'near': {'type': 'Point', 'coordinates': [lng, lat]},
+                'key': GEO_FIELD,
+                'distanceField': 'distance',
+                'spherical': True,
+            }},
+            {'$limit': 1},
+            {'$project': {**STATION_PROJECTION, 'distance': 1}},
+        ]
+        return next(iter(self.collection.aggregate(pipeline)), None)
+
+    def _geo_range_stations(self, lat: float, lng: float, radius: float) -> List[Dict]:
+        query = {GEO_FIELD: {'$geoWithin': {'$centerSphere': [[lng, lat], radius / EARTH_RADIUS_KM]}}}
+        return list(self.collection.find(query, STATION_PROJECTION, batch_size=self.batch_size))
+
+    def _scan_closest_station(self, lat: float, lng: float) -> Optional[Dict]:
+        documents, distances = self._scan_distances(lat, lng)
+        return documents[int(np.argmin(distances))] if documents else None
+
+    def _scan_range_stations(self, lat: float, lng: float, radius: float) -> List[Dict]:
+        documents, distances = self._scan_distances(lat, lng)
+        return [documents[i] for i in np.flatnonzero(distances <= radius)]
+
+    def _scan_distances(self, lat: float, lng: float):
+        documents = list(self.collection.find({}, STATION_PROJECTION, batch_size=self.batch_size))
+        lats = np.fromiter((doc['lat'] for doc in documents), dtype=np.float64, count=len(documents))
+        lngs = np.fromiter((doc['lng'] for doc in documents), dtype=np.float64, count=len(documents))
+        return documents, haversine_many(lat, lng, lats, lngs)
+
+
+class InMemoryStationIndex(WeatherStationRetrieval):
+    """
+    Holds the whole station catalogue in memory and answers spatial queries with a KD-tree.
+
+    The stations are stored as unit vectors on the sphere, so the great circle radius of a query
+    maps onto a straight chord length which the tree can search directly. The catalogue is
+    refreshed incrementally using the `updatedAt` watermark of the documents, or by feeding
+    change stream events to `apply_change`.
+
+    A watermark refresh only sees added and updated documents, not deleted ones, so the
+    catalogue is reloaded completely every `reload_interval` seconds (deletions are applied
+    right away when they arrive through `apply_change`). Collections without `updatedAt` have
+    no watermark and are reloaded completely on every refresh.
+    """
+
+    def __init__(self, collection=None, refresh_interval: Optional[float] = 300,
+                 reload_interval: Optional[float] = 3600):
+        """
+        Parameters:
+        - collection: The pymongo collection holding the weather stations. Defaults to the
+          collection used by `MongoEpwStorage`.
+        - refresh_interval (float): Seconds after which a query triggers a watermark refresh,
+          None disables the automatic refresh.
+        - reload_interval (float): Seconds after which a refresh reloads the complete catalogue
+          to drop deleted documents, None to only ever refresh by watermark.
+        """
+        self.collection = collection if collection is not None else MongoEpwStorage().collection
+        self.refresh_interval = refresh_interval
+        self.reload_interval = reload_interval
+        self._lock = threading.RLock()
+        self._documents: Dict[str, Dict] = {}
+        self._watermark = None
+        self._last_refresh = None
+        self._last_load = None
+        self._stations: List[Dict] = []
+        self._tree = None
+
+    def load(self) -> None:
+        """(Re)loads the complete catalogue from the collection."""
+        with self._lock:
+            self._documents = {}
+            self._watermark = None
+            self._last_load = time.monotonic()
+            self._merge(self.collection.find({}, STATION_PROJECTION, batch_size=DEFAULT_BATCH_SIZE))
+
+    def refresh(self) -> int:
+        """
+        Loads the documents that changed since the last load/refresh, or reloads the complete
+        catalogue when there is no watermark or the `reload_interval` has passed.
+
+        Returns:
+        - int: The number of documents that were added or updated (all of them on a reload).
+        """
+        with self._lock:
+            reload_due = self.reload_interval is not None and (
+                self._last_load is None or time.monotonic() - self._last_load > self.reload_interval)
+            if self._tree is None or self._watermark is None or reload_due:
+                self.load()
+                return len(self._documents)
+            return self._merge(self.collection.find({'updatedAt': {'$gt': self._watermark}}, STATION_PROJECTION,
+                                                    batch_size=DEFAULT_BATCH_SIZE))
+
+    def apply_change(self, change: Dict) -> None:
+        """
+        Applies a single change stream event (as returned by `collection.watch(full_document='updateLookup')`).
+        """
+        with self._lock:
+            key = str(change['documentKey']['_id'])
+            if change['operationType'] == 'delete':
+                if self._documents.pop(key, None) is not None:
+                    self._rebuild()
+            elif change.get('fullDocument') is not None:
+                self._merge([change['fullDocument']])
+
+    def fetch_closest_station(self, lat: float, lng: float) -> Optional[Dict]:
+        nearest = self.fetch_nearest_stations(lat, lng, k=1)
+        return nearest[0] if nearest else None
+
+    def fetch_nearest_stations(self, lat: float, lng: float, k: int = 5) -> List[Dict]:
+        """
+        Fetches the `k` stations closest to the global coordinates, nearest first.
+        """
+        stations, tree = self._snapshot()
+        if tree is None or k < 1:
+            return []
+        k = min(k, len(stations))
+        _, positions = tree.query(_unit_vectors(lat, lng), k=k)
+        return [stations[i] for i in np.atleast_1d(positions)]
+
+    def fetch_range_stations(self, lat: float, lng: float, radius: float = 10) -> List[Dict]:
+        stations, tree = self._snapshot()
+        if tree is None:
+            return []
+        chord = 2 * np.sin(min(radius / EARTH_RADIUS_KM, np.pi) / 2)
+        positions = tree.query_ball_point(_unit_vectors(lat, lng), r=chord)
+        return [stations[i] for i in sorted(positions)]
+
+    def _snapshot(self):
+        """
+        Returns the stations and the tree built from them. Both are replaced (never modified) on
+        a rebuild, so queries can use them outside the lock while changes are applied.
+        """
+        with self._lock:
+            stale = self._last_refresh is None or (
+                self.refresh_interval is not None
+                and time.monotonic() - self._last_refresh > self.refresh_interval
+            )
+            if stale:
+                self.refresh()
+            return self._stations, self._tree
+
+    def _merge(self, documents) -> int:
+        count = 0
+        for doc in documents:
+            if doc.get('lat') is None or doc.get('lng') is None:
+                continue
+            self._documents[str(doc['_id'])] = doc
+            updated_at = doc.get('updatedAt')
+            if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+                self._watermark = updated_at
+            count += 1
+        if count or self._tree is None:
+            self._rebuild()
+        self._last_refresh = time.monotonic()
+        return count
+
+    def _rebuild(self) -> None:
+        stations = list(self._documents.values())
+        lat = np.radians([station['lat'] for station in stations])
+        lng = np.radians([station['lng'] for station in stations])
+        tree = cKDTree(_unit_vectors_rad(lat, lng)) if stations else None
+        self._stations, self._tree = stations, tree
+
+
+class TileStationCache(WeatherStationRetrieval):
+    """
+    Caches the stations of another retrieval per tile of a regular latitude/longitude grid.
+
+    A radius query is answered by merging the cached tiles covering the bounding box of the
+    circle and filtering their stations locally by distance, so nearby points and other radii
+    reuse the tiles fetched before. Tiles expire after `ttl` seconds and at most `maxsize`
+    tiles are kept, evicting the least recently used ones.
+    """
+
+    def __init__(self, retrieval: WeatherStationRetrieval, tile_degrees: float = 1.0,
+                 ttl: Optional[float] = 900, maxsize: int = 512):
+        self.retrieval = retrieval
+        self.tile_degrees = tile_degrees
+        self._rows = int(np.ceil(180 / tile_degrees))
+        self._columns = int(np.ceil(360 / tile_degrees))
+        self._tiles = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def fetch_closest_station(self, lat: float, lng: float) -> Optional[Dict]:
+        return self.retrieval.fetch_closest_station(lat, lng)
+
+    def fetch_range_stations(self, lat: float, lng: float, radius: float = 10) -> List[Dict]:
+        """Fetches the stations within the radius from the cached tiles, nearest first."""
+        stations = [station for tile in self.covering_tiles(lat, lng, radius) for station in self.tile_stations(tile)]
+        if not stations:
+            return []
+        lats = np.fromiter((station['lat'] for station in stations), dtype=np.float64, count=len(stations))
+        lngs = np.fromiter((station['lng'] for station in stations), dtype=np.float64, count=len(stations))
+        distances = haversine_many(lat, lng, lats, lngs)
+        inside = np.flatnonzero(distances <= radius)
+        return [stations[i] for i in inside[np.argsort(distances[inside], kind='stable')]]
+
+    def covering_tiles(self, lat: float, lng: float, radius: float) -> List[tuple]:
+        """Returns the (row, column) of every tile intersecting the bounding box of the circle."""
+        delta_lat = np.degrees(radius / EARTH_RADIUS_KM)
+        south, north = max(lat - delta_lat, -90.0), min(lat + delta_lat, 90.0)
+        rows = range(self._row(south), self._row(north) + 1)
+
+        if delta_lat >= 90 - abs(lat):
+            columns = range(self._columns)  # the circle contains a pole
+        else:
+            # widest longitude extent of a spherical circle
+            delta_lng = np.degrees(np.arcsin(min(np.sin(radius / EARTH_RADIUS_KM) / np.cos(np.radians(lat)), 1.0)))
+            first, last = self._column(lng - delta_lng), self._column(lng + delta_lng)
+            if first <= last:
+                columns = range(first, last + 1)
+            else:  # the circle crosses the antimeridian
+                columns = list(range(first, self._columns)) + list(range(0, last + 1))
+        return [(row, column) for row in rows for column in columns]
+
+    def clear(self) -> None:
+        self._tiles.clear()
+
+    def _row(self, lat: float) -> int:
+        return min(int((lat + 90) // self.tile_degrees), self._rows - 1)
+
+    def _column(self, lng: float) -> int:
+        return int(((lng + 180) % 360) // self.tile_degrees) % self._columns
+
+    def tile_stations(self, tile: tuple) -> List[Dict]:
+        """Returns the (cached) stations of the (row, column) tile."""
+        return self._tiles.get_or_set(tile, lambda: self._fetch_tile(*tile))
+
+    def _fetch_tile(self, row: int, column: int) -> List[Dict]:
+        south = row * self.tile_degrees - 90
+        west = column * self.tile_degrees - 180
+        north, east = min(south + self.tile_degrees, 90.0), west + self.tile_degrees
+        centre_lat, centre_lng = (south + north) / 2, west + self.tile_degrees / 2
+        # the circle around the centre of the tile passing through its farthest corner covers the tile
+        corners = haversine_many(centre_lat, centre_lng, np.array([south, south, north, north]),
+                                 np.array([west, east, west, east]))
+        candidates = self.retrieval.fetch_range_stations(centre_lat, centre_lng, radius=float(corners.max()) + 1e-6)
+        return [station for station in candidates
+                if self._row(station['lat']) == row and self._column(station['lng']) == column]
+
+
+def _unit_vectors_rad(lat, lng):
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)))
+
+
+def _unit_vectors(lat: float, lng: float):
+    return _unit_vectors_rad(np.radians([lat]), np.radians([lng]))[0]
+
+
+_station_index = None
+_station_index_lock = threading.Lock()
+
+
+def get_station_index() -> InMemoryStationIndex:
+    """Returns the process-wide in-memory station index, creating it on first use."""
+    global _station_index
+    with _station_index_lock:
+        if _station_index is None:
+            _station_index = InMemoryStationIndex()
+        return _station_index
+
+
+_station_cache = None
+
+
+def get_station_cache() -> TileStationCache:
+    """Returns the process-wide tile cache in front of the station index, creating it on first use."""
+    global _station_cache
+    station_index = get_station_index()
+    with _station_index_lock:
+        if _station_cache is None:
+            _station_cache = TileStationCache(station_index)
+        return _station_cache
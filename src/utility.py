@@ -1,5 +1,11 @@
 import numpy as np
+from functools import lru_cache
 from math import radians, cos, sin, asin, sqrt
+from typing import List, Optional, Tuple
+from geopy.distance import geodesic
+
+EARTH_RADIUS_KM = 6371  # mean radius of the earth
+
 
 def valid_range(x, valid):
     """Filter values based on a valid range."""
@@ -17,365 +23,456 @@ def haversine(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
     dlat = lat2 - lat1 
     a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
     c = 2 * asin(sqrt(a)) 
-    # Radius of earth in kilometers is 6371
-    km = 6371 * c
+    km = EARTH_RADIUS_KM * c
     return km
 
-def utci_optimised(tdb, v, delta_t_tr, pa):
-    return (
-        tdb
-        + 0.607562052
-        + (-0.0227712343) * tdb
-        + (8.06470249 * (10 ** (-4))) * tdb * tdb
-        + (-1.54271372 * (10 ** (-4))) * tdb * tdb * tdb
-        + (-3.24651735 * (10 ** (-6))) * tdb * tdb * tdb * tdb
-        + (7.32602852 * (10 ** (-8))) * tdb * tdb * tdb * tdb * tdb
-        + (1.35959073 * (10 ** (-9))) * tdb * tdb * tdb * tdb * tdb * tdb
-        + (-2.25836520) * v
-        + 0.0880326035 * tdb * v
-        + 0.00216844454 * tdb * tdb * v
-        + (-1.53347087 * (10 ** (-5))) * tdb * tdb * tdb * v
-        + (-5.72983704 * (10 ** (-7))) * tdb * tdb * tdb * tdb * v
-        + (-2.55090145 * (10 ** (-9))) * tdb * tdb * tdb * tdb * tdb * v
-        + (-0.751269505) * v * v
-        + (-0.00408350271) * tdb * v * v
-        + (-5.21670675 * (10 ** (-5))) * tdb * tdb * v * v
-        + (1.94544667 * (10 ** (-6))) * tdb * tdb * tdb * v * v
-        + (1.14099531 * (10 ** (-8))) * tdb * tdb * tdb * tdb * v * v
-        + 0.158137256 * v * v * v
-        + (-6.57263143 * (10 ** (-5))) * tdb * v * v * v
-        + (2.22697524 * (10 ** (-7))) * tdb * tdb * v * v * v
-        + (-4.16117031 * (10 ** (-8))) * tdb * tdb * tdb * v * v * v
-        + (-0.0127762753) * v * v * v * v
-        + (9.66891875 * (10 ** (-6))) * tdb * v * v * v * v
-        + (2.52785852 * (10 ** (-9))) * tdb * tdb * v * v * v * v
-        + (4.56306672 * (10 ** (-4))) * v * v * v * v * v
-        + (-1.74202546 * (10 ** (-7))) * tdb * v * v * v * v * v
-        + (-5.91491269 * (10 ** (-6))) * v * v * v * v * v * v
-        + 0.398374029 * delta_t_tr
-        + (1.83945314 * (10 ** (-4))) * tdb * delta_t_tr
-        + (-1.73754510 * (10 ** (-4))) * tdb * tdb * delta_t_tr
-        + (-7.60781159 * (10 ** (-7))) * tdb * tdb * tdb * delta_t_tr
-        + (3.77830287 * (10 ** (-8))) * tdb * tdb * tdb * tdb * delta_t_tr
-        + (5.43079673 * (10 ** (-10))) * tdb * tdb * tdb * tdb * tdb * delta_t_tr
-        + (-0.0200518269) * v * delta_t_tr
-        + (8.92859837 * (10 ** (-4))) * tdb * v * delta_t_tr
-        + (3.45433048 * (10 ** (-6))) * tdb * tdb * v * delta_t_tr
-        + (-3.77925774 * (10 ** (-7))) * tdb * tdb * tdb * v * delta_t_tr
-        + (-1.69699377 * (10 ** (-9))) * tdb * tdb * tdb * tdb * v * delta_t_tr
-        + (1.69992415 * (10 ** (-4))) * v * v * delta_t_tr
-        + (-4.99204314 * (10 ** (-5))) * tdb * v * v * delta_t_tr
-        + (2.47417178 * (10 ** (-7))) * tdb * tdb * v * v * delta_t_tr
-        + (1.07596466 * (10 ** (-8))) * tdb * tdb * tdb * v * v * delta_t_tr
-        + (8.49242932 * (10 ** (-5))) * v * v * v * delta_t_tr
-        + (1.35191328 * (10 ** (-6))) * tdb * v * v * v * delta_t_tr
-        + (-6.21531254 * (10 ** (-9))) * tdb * tdb * v * v * v * delta_t_tr
-        + (-4.99410301 * (10 ** (-6))) * v * v * v * v * delta_t_tr
-        + (-1.89489258 * (10 ** (-8))) * tdb * v * v * v * v * delta_t_tr
-        + (8.15300114 * (10 ** (-8))) * v * v * v * v * v * delta_t_tr
-        + (7.55043090 * (10 ** (-4))) * delta_t_tr * delta_t_tr
-        + (-5.65095215 * (10 ** (-5))) * tdb * delta_t_tr * delta_t_tr
-        + (-4.52166564 * (10 ** (-7))) * tdb * tdb * delta_t_tr * delta_t_tr
-        + (2.46688878 * (10 ** (-8))) * tdb * tdb * tdb * delta_t_tr * delta_t_tr
-        + (2.42674348 * (10 ** (-10))) * tdb * tdb * tdb * tdb * delta_t_tr * delta_t_tr
-        + (1.54547250 * (10 ** (-4))) * v * delta_t_tr * delta_t_tr
-        + (5.24110970 * (10 ** (-6))) * tdb * v * delta_t_tr * delta_t_tr
-        + (-8.75874982 * (10 ** (-8))) * tdb * tdb * v * delta_t_tr * delta_t_tr
-        + (-1.50743064 * (10 ** (-9))) * tdb * tdb * tdb * v * delta_t_tr * delta_t_tr
-        + (-1.56236307 * (10 ** (-5))) * v * v * delta_t_tr * delta_t_tr
-        + (-1.33895614 * (10 ** (-7))) * tdb * v * v * delta_t_tr * delta_t_tr
-        + (2.49709824 * (10 ** (-9))) * tdb * tdb * v * v * delta_t_tr * delta_t_tr
-        + (6.51711721 * (10 ** (-7))) * v * v * v * delta_t_tr * delta_t_tr
-        + (1.94960053 * (10 ** (-9))) * tdb * v * v * v * delta_t_tr * delta_t_tr
-        + (-1.00361113 * (10 ** (-8))) * v * v * v * v * delta_t_tr * delta_t_tr
-        + (-1.21206673 * (10 ** (-5))) * delta_t_tr * delta_t_tr * delta_t_tr
-        + (-2.18203660 * (10 ** (-7))) * tdb * delta_t_tr * delta_t_tr * delta_t_tr
-        + (7.51269482 * (10 ** (-9))) * tdb * tdb * delta_t_tr * delta_t_tr * delta_t_tr
-        + (9.79063848 * (10 ** (-11)))
-        * tdb
-        * tdb
-        * tdb
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        + (1.25006734 * (10 ** (-6))) * v * delta_t_tr * delta_t_tr * delta_t_tr
-        + (-1.81584736 * (10 ** (-9))) * tdb * v * delta_t_tr * delta_t_tr * delta_t_tr
-        + (-3.52197671 * (10 ** (-10)))
-        * tdb
-        * tdb
-        * v
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        + (-3.36514630 * (10 ** (-8))) * v * v * delta_t_tr * delta_t_tr * delta_t_tr
-        + (1.35908359 * (10 ** (-10)))
-        * tdb
-        * v
-        * v
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        + (4.17032620 * (10 ** (-10)))
-        * v
-        * v
-        * v
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        + (-1.30369025 * (10 ** (-9)))
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        + (4.13908461 * (10 ** (-10)))
-        * tdb
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        + (9.22652254 * (10 ** (-12)))
-        * tdb
-        * tdb
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        + (-5.08220384 * (10 ** (-9)))
-        * v
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        + (-2.24730961 * (10 ** (-11)))
-        * tdb
-        * v
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        + (1.17139133 * (10 ** (-10)))
-        * v
-        * v
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        + (6.62154879 * (10 ** (-10)))
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        + (4.03863260 * (10 ** (-13)))
-        * tdb
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        + (1.95087203 * (10 ** (-12)))
-        * v
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        + (-4.73602469 * (10 ** (-12)))
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        + 5.12733497 * pa
-        + (-0.312788561) * tdb * pa
-        + (-0.0196701861) * tdb * tdb * pa
-        + (9.99690870 * (10 ** (-4))) * tdb * tdb * tdb * pa
-        + (9.51738512 * (10 ** (-6))) * tdb * tdb * tdb * tdb * pa
-        + (-4.66426341 * (10 ** (-7))) * tdb * tdb * tdb * tdb * tdb * pa
-        + 0.548050612 * v * pa
-        + (-0.00330552823) * tdb * v * pa
-        + (-0.00164119440) * tdb * tdb * v * pa
-        + (-5.16670694 * (10 ** (-6))) * tdb * tdb * tdb * v * pa
-        + (9.52692432 * (10 ** (-7))) * tdb * tdb * tdb * tdb * v * pa
-        + (-0.0429223622) * v * v * pa
-        + 0.00500845667 * tdb * v * v * pa
-        + (1.00601257 * (10 ** (-6))) * tdb * tdb * v * v * pa
-        + (-1.81748644 * (10 ** (-6))) * tdb * tdb * tdb * v * v * pa
-        + (-1.25813502 * (10 ** (-3))) * v * v * v * pa
-        + (-1.79330391 * (10 ** (-4))) * tdb * v * v * v * pa
-        + (2.34994441 * (10 ** (-6))) * tdb * tdb * v * v * v * pa
-        + (1.29735808 * (10 ** (-4))) * v * v * v * v * pa
-        + (1.29064870 * (10 ** (-6))) * tdb * v * v * v * v * pa
-        + (-2.28558686 * (10 ** (-6))) * v * v * v * v * v * pa
-        + (-0.0369476348) * delta_t_tr * pa
-        + 0.00162325322 * tdb * delta_t_tr * pa
-        + (-3.14279680 * (10 ** (-5))) * tdb * tdb * delta_t_tr * pa
-        + (2.59835559 * (10 ** (-6))) * tdb * tdb * tdb * delta_t_tr * pa
-        + (-4.77136523 * (10 ** (-8))) * tdb * tdb * tdb * tdb * delta_t_tr * pa
-        + (8.64203390 * (10 ** (-3))) * v * delta_t_tr * pa
-        + (-6.87405181 * (10 ** (-4))) * tdb * v * delta_t_tr * pa
-        + (-9.13863872 * (10 ** (-6))) * tdb * tdb * v * delta_t_tr * pa
-        + (5.15916806 * (10 ** (-7))) * tdb * tdb * tdb * v * delta_t_tr * pa
-        + (-3.59217476 * (10 ** (-5))) * v * v * delta_t_tr * pa
-        + (3.28696511 * (10 ** (-5))) * tdb * v * v * delta_t_tr * pa
-        + (-7.10542454 * (10 ** (-7))) * tdb * tdb * v * v * delta_t_tr * pa
-        + (-1.24382300 * (10 ** (-5))) * v * v * v * delta_t_tr * pa
-        + (-7.38584400 * (10 ** (-9))) * tdb * v * v * v * delta_t_tr * pa
-        + (2.20609296 * (10 ** (-7))) * v * v * v * v * delta_t_tr * pa
-        + (-7.32469180 * (10 ** (-4))) * delta_t_tr * delta_t_tr * pa
-        + (-1.87381964 * (10 ** (-5))) * tdb * delta_t_tr * delta_t_tr * pa
-        + (4.80925239 * (10 ** (-6))) * tdb * tdb * delta_t_tr * delta_t_tr * pa
-        + (-8.75492040 * (10 ** (-8))) * tdb * tdb * tdb * delta_t_tr * delta_t_tr * pa
-        + (2.77862930 * (10 ** (-5))) * v * delta_t_tr * delta_t_tr * pa
-        + (-5.06004592 * (10 ** (-6))) * tdb * v * delta_t_tr * delta_t_tr * pa
-        + (1.14325367 * (10 ** (-7))) * tdb * tdb * v * delta_t_tr * delta_t_tr * pa
-        + (2.53016723 * (10 ** (-6))) * v * v * delta_t_tr * delta_t_tr * pa
-        + (-1.72857035 * (10 ** (-8))) * tdb * v * v * delta_t_tr * delta_t_tr * pa
-        + (-3.95079398 * (10 ** (-8))) * v * v * v * delta_t_tr * delta_t_tr * pa
-        + (-3.59413173 * (10 ** (-7))) * delta_t_tr * delta_t_tr * delta_t_tr * pa
-        + (7.04388046 * (10 ** (-7))) * tdb * delta_t_tr * delta_t_tr * delta_t_tr * pa
-        + (-1.89309167 * (10 ** (-8)))
-        * tdb
-        * tdb
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * pa
-        + (-4.79768731 * (10 ** (-7))) * v * delta_t_tr * delta_t_tr * delta_t_tr * pa
-        + (7.96079978 * (10 ** (-9)))
-        * tdb
-        * v
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * pa
-        + (1.62897058 * (10 ** (-9)))
-        * v
-        * v
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * pa
-        + (3.94367674 * (10 ** (-8)))
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * pa
-        + (-1.18566247 * (10 ** (-9)))
-        * tdb
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * pa
-        + (3.34678041 * (10 ** (-10)))
-        * v
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * pa
-        + (-1.15606447 * (10 ** (-10)))
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * pa
-        + (-2.80626406) * pa * pa
-        + 0.548712484 * tdb * pa * pa
-        + (-0.00399428410) * tdb * tdb * pa * pa
-        + (-9.54009191 * (10 ** (-4))) * tdb * tdb * tdb * pa * pa
-        + (1.93090978 * (10 ** (-5))) * tdb * tdb * tdb * tdb * pa * pa
-        + (-0.308806365) * v * pa * pa
-        + 0.0116952364 * tdb * v * pa * pa
-        + (4.95271903 * (10 ** (-4))) * tdb * tdb * v * pa * pa
-        + (-1.90710882 * (10 ** (-5))) * tdb * tdb * tdb * v * pa * pa
-        + 0.00210787756 * v * v * pa * pa
-        + (-6.98445738 * (10 ** (-4))) * tdb * v * v * pa * pa
-        + (2.30109073 * (10 ** (-5))) * tdb * tdb * v * v * pa * pa
-        + (4.17856590 * (10 ** (-4))) * v * v * v * pa * pa
-        + (-1.27043871 * (10 ** (-5))) * tdb * v * v * v * pa * pa
-        + (-3.04620472 * (10 ** (-6))) * v * v * v * v * pa * pa
-        + 0.0514507424 * delta_t_tr * pa * pa
-        + (-0.00432510997) * tdb * delta_t_tr * pa * pa
-        + (8.99281156 * (10 ** (-5))) * tdb * tdb * delta_t_tr * pa * pa
-        + (-7.14663943 * (10 ** (-7))) * tdb * tdb * tdb * delta_t_tr * pa * pa
-        + (-2.66016305 * (10 ** (-4))) * v * delta_t_tr * pa * pa
-        + (2.63789586 * (10 ** (-4))) * tdb * v * delta_t_tr * pa * pa
-        + (-7.01199003 * (10 ** (-6))) * tdb * tdb * v * delta_t_tr * pa * pa
-        + (-1.06823306 * (10 ** (-4))) * v * v * delta_t_tr * pa * pa
-        + (3.61341136 * (10 ** (-6))) * tdb * v * v * delta_t_tr * pa * pa
-        + (2.29748967 * (10 ** (-7))) * v * v * v * delta_t_tr * pa * pa
-        + (3.04788893 * (10 ** (-4))) * delta_t_tr * delta_t_tr * pa * pa
-        + (-6.42070836 * (10 ** (-5))) * tdb * delta_t_tr * delta_t_tr * pa * pa
-        + (1.16257971 * (10 ** (-6))) * tdb * tdb * delta_t_tr * delta_t_tr * pa * pa
-        + (7.68023384 * (10 ** (-6))) * v * delta_t_tr * delta_t_tr * pa * pa
-        + (-5.47446896 * (10 ** (-7))) * tdb * v * delta_t_tr * delta_t_tr * pa * pa
-        + (-3.59937910 * (10 ** (-8))) * v * v * delta_t_tr * delta_t_tr * pa * pa
-        + (-4.36497725 * (10 ** (-6))) * delta_t_tr * delta_t_tr * delta_t_tr * pa * pa
-        + (1.68737969 * (10 ** (-7)))
-        * tdb
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * pa
-        * pa
-        + (2.67489271 * (10 ** (-8)))
-        * v
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * pa
-        * pa
-        + (3.23926897 * (10 ** (-9)))
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * pa
-        * pa
-        + (-0.0353874123) * pa * pa * pa
-        + (-0.221201190) * tdb * pa * pa * pa
-        + 0.0155126038 * tdb * tdb * pa * pa * pa
-        + (-2.63917279 * (10 ** (-4))) * tdb * tdb * tdb * pa * pa * pa
-        + 0.0453433455 * v * pa * pa * pa
-        + (-0.00432943862) * tdb * v * pa * pa * pa
-        + (1.45389826 * (10 ** (-4))) * tdb * tdb * v * pa * pa * pa
-        + (2.17508610 * (10 ** (-4))) * v * v * pa * pa * pa
-        + (-6.66724702 * (10 ** (-5))) * tdb * v * v * pa * pa * pa
-        + (3.33217140 * (10 ** (-5))) * v * v * v * pa * pa * pa
-        + (-0.00226921615) * delta_t_tr * pa * pa * pa
-        + (3.80261982 * (10 ** (-4))) * tdb * delta_t_tr * pa * pa * pa
-        + (-5.45314314 * (10 ** (-9))) * tdb * tdb * delta_t_tr * pa * pa * pa
-        + (-7.96355448 * (10 ** (-4))) * v * delta_t_tr * pa * pa * pa
-        + (2.53458034 * (10 ** (-5))) * tdb * v * delta_t_tr * pa * pa * pa
-        + (-6.31223658 * (10 ** (-6))) * v * v * delta_t_tr * pa * pa * pa
-        + (3.02122035 * (10 ** (-4))) * delta_t_tr * delta_t_tr * pa * pa * pa
-        + (-4.77403547 * (10 ** (-6))) * tdb * delta_t_tr * delta_t_tr * pa * pa * pa
-        + (1.73825715 * (10 ** (-6))) * v * delta_t_tr * delta_t_tr * pa * pa * pa
-        + (-4.09087898 * (10 ** (-7)))
-        * delta_t_tr
-        * delta_t_tr
-        * delta_t_tr
-        * pa
-        * pa
-        * pa
-        + 0.614155345 * pa * pa * pa * pa
-        + (-0.0616755931) * tdb * pa * pa * pa * pa
-        + 0.00133374846 * tdb * tdb * pa * pa * pa * pa
-        + 0.00355375387 * v * pa * pa * pa * pa
-        + (-5.13027851 * (10 ** (-4))) * tdb * v * pa * pa * pa * pa
-        + (1.02449757 * (10 ** (-4))) * v * v * pa * pa * pa * pa
-        + (-0.00148526421) * delta_t_tr * pa * pa * pa * pa
-        + (-4.11469183 * (10 ** (-5))) * tdb * delta_t_tr * pa * pa * pa * pa
-        + (-6.80434415 * (10 ** (-6))) * v * delta_t_tr * pa * pa * pa * pa
-        + (-9.77675906 * (10 ** (-6))) * delta_t_tr * delta_t_tr * pa * pa * pa * pa
-        + 0.0882773108 * pa * pa * pa * pa * pa
-        + (-0.00301859306) * tdb * pa * pa * pa * pa * pa
-        + 0.00104452989 * v * pa * pa * pa * pa * pa
-        + (2.47090539 * (10 ** (-4))) * delta_t_tr * pa * pa * pa * pa * pa
-        + 0.00148348065 * pa * pa * pa * pa * pa * pa
-    ) 
\ No newline at end of file
+def haversine_many(lat: float, lng: float, lats, lngs, dtype=np.float64, chunk_size: int = 65536) -> np.ndarray:
+    """
+    Calculate the great circle distance in kilometers from one point to many points
+    (specified in decimal degrees) in a single vectorised pass.
+
+    Parameters:
+    - lat, lng (float): Coordinates of the reference point.
+    - lats, lngs (array_like): Coordinates of the other points.
+    - dtype: Floating point type used for the computation and the result (np.float32 or np.float64).
+    - chunk_size (int): Maximum number of points processed at once, which bounds the temporaries.
+
+    Returns:
+    - np.ndarray: Distances with the same shape as `lats`.
+    """
+    lats = np.asarray(lats, dtype=dtype)
+    lngs = np.asarray(lngs, dtype=dtype)
+    lat_rad = np.radians(np.asarray(lat, dtype=dtype))
+    lng_rad = np.radians(np.asarray(lng, dtype=dtype))
+    cos_lat = np.cos(lat_rad)
+
+    flat_lats, flat_lngs = lats.ravel(), lngs.ravel()
+    km = np.empty(flat_lats.shape, dtype=dtype)
+    for start in range(0, flat_lats.size, chunk_size):
+        stop = start + chunk_size
+        km[start:stop] = _haversine_kernel(lat_rad, lng_rad, cos_lat,
+                                           np.radians(flat_lats[start:stop]), np.radians(flat_lngs[start:stop]))
+    return km.reshape(lats.shape)
+
+def haversine_matrix(lats1, lngs1, lats2, lngs2, dtype=np.float64, chunk_size: int = 1024) -> np.ndarray:
+    """
+    Calculate the pairwise great circle distances in kilometers between two sets of points
+    (specified in decimal degrees).
+
+    Parameters:
+    - lats1, lngs1 (array_like): Coordinates of the first set of points (n).
+    - lats2, lngs2 (array_like): Coordinates of the second set of points (m).
+    - dtype: Floating point type used for the computation and the result (np.float32 or np.float64).
+    - chunk_size (int): Number of rows of the matrix evaluated at once.
+
+    Returns:
+    - np.ndarray: An (n, m) matrix of distances.
+    """
+    lat1 = np.radians(np.asarray(lats1, dtype=dtype).ravel())
+    lng1 = np.radians(np.asarray(lngs1, dtype=dtype).ravel())
+    lat2 = np.radians(np.asarray(lats2, dtype=dtype).ravel())
+    lng2 = np.radians(np.asarray(lngs2, dtype=dtype).ravel())
+    cos_lat1 = np.cos(lat1)
+
+    km = np.empty((lat1.size, lat2.size), dtype=dtype)
+    for start in range(0, lat1.size, chunk_size):
+        rows = slice(start, start + chunk_size)
+        km[rows] = _haversine_kernel(lat1[rows, None], lng1[rows, None], cos_lat1[rows, None], lat2, lng2)
+    return km
+
+def _haversine_kernel(lat1, lng1, cos_lat1, lat2, lng2):
+    """Haversine formula on radians, broadcasting the first point(s) against the second."""
+    a = np.sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+
+def destination_points(lat: float, lng: float, distance: float, bearings) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the points at a great circle distance from a point for many bearings at once.
+
+    Parameters:
+    - lat (float): Latitude of the start point in degrees.
+    - lng (float): Longitude of the start point in degrees.
+    - distance (float): Distance in km.
+    - bearings: Bearings in degrees clockwise from north.
+
+    Returns:
+    - Tuple[np.ndarray, np.ndarray]: The latitudes and longitudes of the points in degrees.
+    """
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    bearings = np.radians(np.asarray(bearings, dtype=np.float64))
+    angle = distance / EARTH_RADIUS_KM
+    sin_lat1, cos_lat1 = np.sin(lat1), np.cos(lat1)
+    sin_angle, cos_angle = np.sin(angle), np.cos(angle)
+
+    sin_lat2 = sin_lat1 * cos_angle + cos_lat1 * sin_angle * np.cos(bearings)
+    lat2 = np.arcsin(np.clip(sin_lat2, -1.0, 1.0))
+    lng2 = lng1 + np.arctan2(np.sin(bearings) * sin_angle * cos_lat1, cos_angle - sin_lat1 * sin_lat2)
+    return np.degrees(lat2), (np.degrees(lng2) + 540) % 360 - 180
+
+
+def circle_vertex_count(radius: float, tolerance: float = 0.01, minimum: int = 16, maximum: int = 360) -> int:
+    """
+    Number of vertices for which the polygon of a circle with the radius [km] deviates at most
+    `tolerance` [km] from the circle (the sagitta of each edge), within [minimum, maximum].
+    """
+    if radius <= tolerance:
+        return minimum
+    return int(np.clip(np.ceil(np.pi / np.arccos(1 - tolerance / radius)), minimum, maximum))
+
+
+def geodesic_circle(lat: float, lng: float, radius: float, vertices: Optional[int] = None,
+                    method: str = 'spherical') -> List[Tuple[float, float]]:
+    """
+    Returns the vertices of the circle with the radius [km] around a point, as (lat, lng) tuples.
+
+    The default spherical method computes all vertices in one vectorised call and caches the
+    result by the point and radius quantised to about a metre. `method='geodesic'` uses geopy's
+    ellipsoidal (Karney) solution per vertex instead, which is slower but useful for validation;
+    the two differ by at most about 0.5% of the radius.
+
+    Parameters:
+    - lat (float): Latitude of the centre in degrees.
+    - lng (float): Longitude of the centre in degrees.
+    - radius (float): Radius in km.
+    - vertices (int): Number of vertices, by default adapted to the radius with `circle_vertex_count`.
+    - method (str): 'spherical' or 'geodesic'.
+    """
+    if method not in ('spherical', 'geodesic'):
+        raise ValueError(f"Unknown method '{method}'")
+    vertices = vertices or circle_vertex_count(radius)
+    return list(_circle(round(lat, 5), round(lng, 5), round(radius, 3), vertices, method))
+
+
+@lru_cache(maxsize=256)
+def _circle(lat: float, lng: float, radius: float, vertices: int, method: str) -> Tuple[Tuple[float, float], ...]:
+    bearings = np.arange(vertices) * (360.0 / vertices)
+    if method == 'geodesic':
+        circle = geodesic(kilometers=radius)
+        return tuple((point[0], point[1]) for point in (circle.destination((lat, lng), bearing) for bearing in bearings))
+    lats, lngs = destination_points(lat, lng, radius, bearings)
+    return tuple(zip(lats.tolist(), lngs.tolist()))
+
+
+# Coefficients of the 6th order UTCI regression polynomial (Broede et al., 2012). Every monomial
+# tdb^i * v^j * delta_t_tr^k * pa^l with i + j + k + l <= 6 is present; the table is keyed by
+# (j, k, l) and holds the coefficients of the polynomial in tdb for that combination (i = 0, 1, ...).
+# The leading `tdb` of the UTCI definition is folded into the linear tdb coefficient of (0, 0, 0).
+UTCI_COEFFICIENTS = {
+    (0, 0, 0): (6.07562052e-1, 9.772287657e-1, 8.06470249e-4, -1.54271372e-4, -3.24651735e-6, 7.32602852e-8, 1.35959073e-9),
+    (1, 0, 0): (-2.2583652e0, 8.80326035e-2, 2.16844454e-3, -1.53347087e-5, -5.72983704e-7, -2.55090145e-9),
+    (2, 0, 0): (-7.51269505e-1, -4.08350271e-3, -5.21670675e-5, 1.94544667e-6, 1.14099531e-8),
+    (3, 0, 0): (1.58137256e-1, -6.57263143e-5, 2.22697524e-7, -4.16117031e-8),
+    (4, 0, 0): (-1.27762753e-2, 9.66891875e-6, 2.52785852e-9),
+    (5, 0, 0): (4.56306672e-4, -1.74202546e-7),
+    (6, 0, 0): (-5.91491269e-6,),
+    (0, 1, 0): (3.98374029e-1, 1.83945314e-4, -1.7375451e-4, -7.60781159e-7, 3.77830287e-8, 5.43079673e-10),
+    (1, 1, 0): (-2.00518269e-2, 8.92859837e-4, 3.45433048e-6, -3.77925774e-7, -1.69699377e-9),
+    (2, 1, 0): (1.69992415e-4, -4.99204314e-5, 2.47417178e-7, 1.07596466e-8),
+    (3, 1, 0): (8.49242932e-5, 1.35191328e-6, -6.21531254e-9),
+    (4, 1, 0): (-4.99410301e-6, -1.89489258e-8),
+    (5, 1, 0): (8.15300114e-8,),
+    (0, 2, 0): (7.5504309e-4, -5.65095215e-5, -4.52166564e-7, 2.46688878e-8, 2.42674348e-10),
+    (1, 2, 0): (1.5454725e-4, 5.2411097e-6, -8.75874982e-8, -1.50743064e-9),
+    (2, 2, 0): (-1.56236307e-5, -1.33895614e-7, 2.49709824e-9),
+    (3, 2, 0): (6.51711721e-7, 1.94960053e-9),
+    (4, 2, 0): (-1.00361113e-8,),
+    (0, 3, 0): (-1.21206673e-5, -2.1820366e-7, 7.51269482e-9, 9.79063848e-11),
+    (1, 3, 0): (1.25006734e-6, -1.81584736e-9, -3.52197671e-10),
+    (2, 3, 0): (-3.3651463e-8, 1.35908359e-10),
+    (3, 3, 0): (4.1703262e-10,),
+    (0, 4, 0): (-1.30369025e-9, 4.13908461e-10, 9.22652254e-12),
+    (1, 4, 0): (-5.08220384e-9, -2.24730961e-11),
+    (2, 4, 0): (1.17139133e-10,),
+    (0, 5, 0): (6.62154879e-10, 4.0386326e-13),
+    (1, 5, 0): (1.95087203e-12,),
+    (0, 6, 0): (-4.73602469e-12,),
+    (0, 0, 1): (5.12733497e0, -3.12788561e-1, -1.96701861e-2, 9.9969087e-4, 9.51738512e-6, -4.66426341e-7),
+    (1, 0, 1): (5.48050612e-1, -3.30552823e-3, -1.6411944e-3, -5.16670694e-6, 9.52692432e-7),
+    (2, 0, 1): (-4.29223622e-2, 5.00845667e-3, 1.00601257e-6, -1.81748644e-6),
+    (3, 0, 1): (-1.25813502e-3, -1.79330391e-4, 2.34994441e-6),
+    (4, 0, 1): (1.29735808e-4, 1.2906487e-6),
+    (5, 0, 1): (-2.28558686e-6,),
+    (0, 1, 1): (-3.69476348e-2, 1.62325322e-3, -3.1427968e-5, 2.59835559e-6, -4.77136523e-8),
+    (1, 1, 1): (8.6420339e-3, -6.87405181e-4, -9.13863872e-6, 5.15916806e-7),
+    (2, 1, 1): (-3.59217476e-5, 3.28696511e-5, -7.10542454e-7),
+    (3, 1, 1): (-1.243823e-5, -7.385844e-9),
+    (4, 1, 1): (2.20609296e-7,),
+    (0, 2, 1): (-7.3246918e-4, -1.87381964e-5, 4.80925239e-6, -8.7549204e-8),
+    (1, 2, 1): (2.7786293e-5, -5.06004592e-6, 1.14325367e-7),
+    (2, 2, 1): (2.53016723e-6, -1.72857035e-8),
+    (3, 2, 1): (-3.95079398e-8,),
+    (0, 3, 1): (-3.59413173e-7, 7.04388046e-7, -1.89309167e-8),
+    (1, 3, 1): (-4.79768731e-7, 7.96079978e-9),
+    (2, 3, 1): (1.62897058e-9,),
+    (0, 4, 1): (3.94367674e-8, -1.18566247e-9),
+    (1, 4, 1): (3.34678041e-10,),
+    (0, 5, 1): (-1.15606447e-10,),
+    (0, 0, 2): (-2.80626406e0, 5.48712484e-1, -3.9942841e-3, -9.54009191e-4, 1.93090978e-5),
+    (1, 0, 2): (-3.08806365e-1, 1.16952364e-2, 4.95271903e-4, -1.90710882e-5),
+    (2, 0, 2): (2.10787756e-3, -6.98445738e-4, 2.30109073e-5),
+    (3, 0, 2): (4.1785659e-4, -1.27043871e-5),
+    (4, 0, 2): (-3.04620472e-6,),
+    (0, 1, 2): (5.14507424e-2, -4.32510997e-3, 8.99281156e-5, -7.14663943e-7),
+    (1, 1, 2): (-2.66016305e-4, 2.63789586e-4, -7.01199003e-6),
+    (2, 1, 2): (-1.06823306e-4, 3.61341136e-6),
+    (3, 1, 2): (2.29748967e-7,),
+    (0, 2, 2): (3.04788893e-4, -6.42070836e-5, 1.16257971e-6),
+    (1, 2, 2): (7.68023384e-6, -5.47446896e-7),
+    (2, 2, 2): (-3.5993791e-8,),
+    (0, 3, 2): (-4.36497725e-6, 1.68737969e-7),
+    (1, 3, 2): (2.67489271e-8,),
+    (0, 4, 2): (3.23926897e-9,),
+    (0, 0, 3): (-3.53874123e-2, -2.2120119e-1, 1.55126038e-2, -2.63917279e-4),
+    (1, 0, 3): (4.53433455e-2, -4.32943862e-3, 1.45389826e-4),
+    (2, 0, 3): (2.1750861e-4, -6.66724702e-5),
+    (3, 0, 3): (3.3321714e-5,),
+    (0, 1, 3): (-2.26921615e-3, 3.80261982e-4, -5.45314314e-9),
+    (1, 1, 3): (-7.96355448e-4, 2.53458034e-5),
+    (2, 1, 3): (-6.31223658e-6,),
+    (0, 2, 3): (3.02122035e-4, -4.77403547e-6),
+    (1, 2, 3): (1.73825715e-6,),
+    (0, 3, 3): (-4.09087898e-7,),
+    (0, 0, 4): (6.14155345e-1, -6.16755931e-2, 1.33374846e-3),
+    (1, 0, 4): (3.55375387e-3, -5.13027851e-4),
+    (2, 0, 4): (1.02449757e-4,),
+    (0, 1, 4): (-1.48526421e-3, -4.11469183e-5),
+    (1, 1, 4): (-6.80434415e-6,),
+    (0, 2, 4): (-9.77675906e-6,),
+    (0, 0, 5): (8.82773108e-2, -3.01859306e-3),
+    (1, 0, 5): (1.04452989e-3,),
+    (0, 1, 5): (2.47090539e-4,),
+    (0, 0, 6): (1.48348065e-3,),
+}
+UTCI_ORDER = 6
+
+_UTCI_KEYS = list(UTCI_COEFFICIENTS)
+_UTCI_ROWS = {key: row for row, key in enumerate(_UTCI_KEYS)}
+_UTCI_TDB_MATRIX = np.zeros((len(_UTCI_KEYS), UTCI_ORDER + 1))
+for _key, _coefficients in UTCI_COEFFICIENTS.items():
+    _UTCI_TDB_MATRIX[_UTCI_ROWS[_key], :len(_coefficients)] = _coefficients
+
+
+def utci_optimised(tdb, v, delta_t_tr, pa, out=None, dtype=np.float64, chunk_size: int = 16384):
+    """
+    Evaluates the UTCI regression polynomial on scalars or (broadcastable) arrays.
+
+    The powers of `tdb` are computed once per chunk and multiplied with the coefficient table in
+    a single matrix product, which yields the tdb-polynomial of every (v, delta_t_tr, pa)
+    combination. These are then folded with nested Horner steps in v, delta_t_tr and pa, all
+    in place, so no temporaries are allocated per term. The result agrees with the expanded
+    polynomial to within 1e-9 degC in float64 (1e-2 degC in float32) over the valid input range.
+
+    Parameters:
+    - tdb: Dry bulb air temperature [degC].
+    - v: Wind speed 10 m above ground level [m/s].
+    - delta_t_tr: Mean radiant temperature minus air temperature [K].
+    - pa: Water vapour pressure [kPa].
+    - out (np.ndarray): Optional output array with the broadcast shape of the inputs.
+    - dtype: Floating point type of the computation (np.float32 or np.float64).
+    - chunk_size (int): Number of values evaluated at once, which bounds the working memory.
+
+    Returns:
+    - The UTCI approximation [degC], a scalar for scalar inputs.
+    """
+    tdb, v, delta_t_tr, pa = np.broadcast_arrays(*(np.asarray(x, dtype=dtype) for x in (tdb, v, delta_t_tr, pa)))
+    shape = tdb.shape
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    elif out.shape != shape:
+        raise ValueError(f"out has shape {out.shape}, expected {shape}")
+    target = out if out.flags.c_contiguous else np.empty(shape, dtype=dtype)
+
+    flat_target = target.reshape(-1)
+    flat_inputs = [x.reshape(-1) for x in (tdb, v, delta_t_tr, pa)]
+    matrix = _UTCI_TDB_MATRIX.astype(dtype, copy=False)
+    for start in range(0, flat_target.size, chunk_size):
+        stop = min(start + chunk_size, flat_target.size)
+        flat_target[start:stop] = _utci_chunk(matrix, *(x[start:stop] for x in flat_inputs))
+    if target is not out:
+        out[...] = target
+
+    return out[()] if out.ndim == 0 else out
+
+
+def _utci_chunk(matrix, tdb, v, delta_t_tr, pa):
+    powers = np.empty((UTCI_ORDER + 1, tdb.size), dtype=matrix.dtype)
+    powers[0] = 1
+    powers[1] = tdb
+    for i in range(2, UTCI_ORDER + 1):
+        np.multiply(powers[i - 1], tdb, out=powers[i])
+
+    # one row per (v, delta_t_tr, pa) combination, holding its polynomial in tdb
+    terms = matrix @ powers
+
+    def row(j, k, l):
+        return terms[_UTCI_ROWS[(j, k, l)]]
+
+    # Horner in v, then delta_t_tr, then pa, accumulating into the row of the highest power
+    for l in range(UTCI_ORDER + 1):
+        for k in range(UTCI_ORDER + 1 - l):
+            acc = row(UTCI_ORDER - k - l, k, l)
+            for j in range(UTCI_ORDER - 1 - k - l, -1, -1):
+                acc *= v
+                acc += row(j, k, l)
+            if acc is not row(0, k, l):
+                row(0, k, l)[...] = acc
+        acc = row(0, UTCI_ORDER - l, l)
+        for k in range(UTCI_ORDER - 1 - l, -1, -1):
+            acc *= delta_t_tr
+            acc += row(0, k, l)
+        if acc is not row(0, 0, l):
+            row(0, 0, l)[...] = acc
+    acc = row(0, 0, UTCI_ORDER)
+    for l in range(UTCI_ORDER - 1, -1, -1):
+        acc *= pa
+        acc += row(0, 0, l)
+    return acc
+
+
+SATURATION_VAPOUR_PRESSURE_COEFFICIENTS = (
+    -2836.5744,
+    -6028.076559,
+    19.54263612,
+    -0.02737830188,
+    0.000016261698,
+    7.0229056e-10,
+    -1.8680009e-13,
+)  # coefficients of tk ** -2 ... tk ** 4
+SATURATION_VAPOUR_PRESSURE_LOG_COEFFICIENT = 2.7150305
+
+
+def _as_output(x, out, work):
+    x = np.asarray(x, dtype=np.float64)
+    if out is None:
+        out = np.empty(x.shape)
+    elif out.shape != x.shape:
+        raise ValueError(f"out has shape {out.shape}, expected {x.shape}")
+    if work is None:
+        work = np.empty(x.shape)
+    elif work.shape != x.shape:
+        raise ValueError(f"work has shape {work.shape}, expected {x.shape}")
+    return x, out, work
+
+
+def _result(out):
+    return out[()] if out.ndim == 0 else out
+
+
+def saturation_vapour_pressure(t_db, out=None, work=None):
+    """
+    Calculates the saturation vapour pressure of air with the (adjusted) Hardy formulation used by UTCI.
+
+    The coefficient series is evaluated as one Horner polynomial in the absolute temperature,
+    divided by tk twice for the reciprocal terms, entirely within the `out` and `work` buffers.
+    Passing both makes repeated calls over the hourly data allocation free.
+
+    Parameters:
+    - t_db: Dry bulb temperature [degC], scalar or array.
+    - out (np.ndarray): Optional float64 array, in the shape of `t_db`, receiving the result.
+    - work (np.ndarray): Optional float64 scratch array in the shape of `t_db`.
+
+    Returns:
+    - The saturation vapour pressure [hPa], a scalar for scalar inputs.
+    """
+    t_db, out, work = _as_output(t_db, out, work)
+    tk = np.add(t_db, 273.15, out=work)
+
+    out.fill(SATURATION_VAPOUR_PRESSURE_COEFFICIENTS[-1])
+    for coefficient in SATURATION_VAPOUR_PRESSURE_COEFFICIENTS[-2::-1]:
+        out *= tk
+        out += coefficient
+    out /= tk
+    out /= tk
+
+    log_term = np.log1p(tk, out=work)
+    log_term *= SATURATION_VAPOUR_PRESSURE_LOG_COEFFICIENT
+    out += log_term
+    np.exp(out, out=out)
+    out *= 0.01
+    return _result(out)
+
+
+def vapour_pressure(t_db, rh, out=None, work=None):
+    """Calculates the partial water vapour pressure [hPa] from the dry bulb temperature [degC] and relative humidity [%]."""
+    t_db, rh = np.broadcast_arrays(np.asarray(t_db, dtype=np.float64), np.asarray(rh, dtype=np.float64))
+    t_db, out, work = _as_output(t_db, out, work)
+    saturation_vapour_pressure(t_db, out=out, work=work)
+    out *= rh
+    out /= 100.0
+    return _result(out)
+
+
+def dew_point(t_db, rh, out=None, work=None, iterations: int = 4):
+    """
+    Calculates the dew point temperature [degC] by inverting `saturation_vapour_pressure` for
+    the vapour pressure of the air, with a fixed number of Newton steps on its logarithm
+    starting from the Magnus estimate.
+
+    Parameters:
+    - t_db: Dry bulb temperature [degC].
+    - rh: Relative humidity [%]; zero humidity gives NaN.
+    - out (np.ndarray): Optional output array in the shape of the inputs.
+    - work (np.ndarray): Optional scratch array in the shape of the inputs.
+    - iterations (int): Number of Newton steps.
+
+    Returns:
+    - The dew point temperature [degC], a scalar for scalar inputs.
+    """
+    t_db, rh = np.broadcast_arrays(np.asarray(t_db, dtype=np.float64), np.asarray(rh, dtype=np.float64))
+    t_db, out, work = _as_output(t_db, out, work)
+    target, slope, residual = (np.empty(t_db.shape) for _ in range(3))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vapour_pressure(t_db, rh, out=target, work=work)
+        np.log(target, out=target)
+
+        gamma = np.log(rh / 100.0) + 17.62 * t_db / (243.12 + t_db)
+        np.divide(243.12 * gamma, 17.62 - gamma, out=out)
+
+        for _ in range(iterations):
+            tk = np.add(out, 273.15, out=work)
+            # d ln(es) / d tk: the series differentiated term by term, again by Horner
+            slope.fill(4 * SATURATION_VAPOUR_PRESSURE_COEFFICIENTS[-1])
+            for power in range(5, -1, -1):
+                slope *= tk
+                slope += (power - 2) * SATURATION_VAPOUR_PRESSURE_COEFFICIENTS[power]
+            for _ in range(3):
+                slope /= tk
+            tk += 1.0
+            np.divide(SATURATION_VAPOUR_PRESSURE_LOG_COEFFICIENT, tk, out=tk)
+            slope += tk
+
+            saturation_vapour_pressure(out, out=residual, work=work)
+            np.log(residual, out=residual)
+            residual -= target
+            residual /= slope
+            out -= residual
+    return _result(out)
+
+
+def humidity_ratio(t_db, rh, pressure=101325.0, out=None, work=None):
+    """Calculates the humidity ratio [kg water / kg dry air] at the given atmospheric pressure [Pa]."""
+    t_db, rh = np.broadcast_arrays(np.asarray(t_db, dtype=np.float64), np.asarray(rh, dtype=np.float64))
+    t_db, out, work = _as_output(t_db, out, work)
+    vapour_pressure(t_db, rh, out=out, work=work)
+    out *= 100.0  # hPa to Pa
+    # 0.621945 * pw / (p - pw), rearranged to stay within the buffer
+    with np.errstate(divide='ignore'):
+        np.divide(pressure, out, out=out)
+    out -= 1.0
+    np.reciprocal(out, out=out)
+    out *= 0.621945
+    return _result(out)
+
+
+def enthalpy(t_db, rh, pressure=101325.0, out=None, work=None):
+    """Calculates the specific enthalpy of moist air [kJ/kg] relative to dry air at 0 degC."""
+    t_db, rh = np.broadcast_arrays(np.asarray(t_db, dtype=np.float64), np.asarray(rh, dtype=np.float64))
+    t_db, out, work = _as_output(t_db, out, work)
+    humidity_ratio(t_db, rh, pressure, out=out, work=work)
+    np.multiply(t_db, 1.86, out=work)
+    work += 2501.0
+    out *= work
+    np.multiply(t_db, 1.006, out=work)
+    out += work
+    return _result(out)
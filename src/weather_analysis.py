@@ -1,51 +1,268 @@
-from src.utility import utci_optimised
-from src.data_objects import WeatherData
+from src.caching import LRUCache
+from src.utility import utci_optimised, saturation_vapour_pressure
+from src.data_objects import WeatherData, MISSING_WIND
+from ladybug.analysisperiod import AnalysisPeriod
+from typing import Dict, List, Optional
 import numpy as np
 import json
+import os
+import threading
+
+
+UTCI_WIND_RANGE = (0.5, 17.0)  # wind speeds [m/s] for which the UTCI polynomial is valid
+CATEGORIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'categories.json')
+
+
+class CategoryBins:
+    """
+    A category table compiled into sorted bin edges, so whole arrays are categorised in one pass.
+
+    The tables map `"lower, upper"` keys (either side may be `null`) onto labels, matching
+    values with lower < value <= upper and giving the first matching entry precedence. The
+    bounds split the axis into elementary segments in which that first match is constant,
+    so each segment gets its label once and values are looked up with `np.searchsorted`.
+    """
+
+    UNKNOWN = "unknown"
+
+    def __init__(self, edges: np.ndarray, segment_codes: np.ndarray, labels: np.ndarray):
+        self.edges = edges
+        self.segment_codes = segment_codes
+        self.labels = labels
+
+    @classmethod
+    def from_dict(cls, category_dict: dict) -> 'CategoryBins':
+        bounds = []
+        for key in category_dict:
+            lower, upper = (None if bound == "null" else float(bound) for bound in key.split(', '))
+            bounds.append((lower, upper))
+
+        edges = np.unique([bound for pair in bounds for bound in pair if bound is not None])
+        labels = list(dict.fromkeys(category_dict.values())) + [cls.UNKNOWN]
+        segment_lows = np.concatenate(([-np.inf], edges))
+        segment_highs = np.concatenate((edges, [np.inf]))
+
+        segment_codes = np.full(len(edges) + 2, len(labels) - 1, dtype=np.intp)  # the extra segment holds NaN
+        for segment, (low, high) in enumerate(zip(segment_lows, segment_highs)):
+            for (lower, upper), category in zip(bounds, category_dict.values()):
+                if (lower is None or lower <= low) and (upper is None or upper >= high):
+                    segment_codes[segment] = labels.index(category)
+                    break
+        return cls(edges, segment_codes, np.array(labels))
+
+    def codes(self, values) -> np.ndarray:
+        """Returns the index into `labels` of every value."""
+        values = np.asarray(values, dtype=np.float64)
+        segments = np.where(np.isnan(values), len(self.segment_codes) - 1,
+                            np.searchsorted(self.edges, values, side='left'))
+        return self.segment_codes[segments]
+
+    def classify(self, values) -> np.ndarray:
+        """Returns the label of every value, in the shape of the values."""
+        return self.labels[self.codes(values)]
+
+    def counts(self, values) -> np.ndarray:
+        """
+        Counts the values per label along the last axis, e.g. the hours per category of every
+        station in a stations x hours array. The last axis of the result follows `labels`.
+        """
+        codes = np.atleast_1d(self.codes(values))
+        rows = codes.reshape(-1, codes.shape[-1])
+        offsets = np.arange(rows.shape[0])[:, None] * len(self.labels)
+        counts = np.bincount((rows + offsets).ravel(), minlength=rows.shape[0] * len(self.labels))
+        return counts.reshape(codes.shape[:-1] + (len(self.labels),))
+
+    def fractions(self, values) -> np.ndarray:
+        """Like `counts`, as the fraction of the values along the last axis."""
+        return self.counts(values) / np.atleast_1d(values).shape[-1]
+
+
+_category_tables = {}
+_compiled_bins = LRUCache(maxsize=32)
+_category_lock = threading.Lock()
+
+
+def _data_period(field, size: int) -> AnalysisPeriod:
+    """The analysis period of the hourly values of a collection, inferred from their count when the header has none."""
+    period = getattr(getattr(field, 'header', None), 'analysis_period', None)
+    if not isinstance(period, AnalysisPeriod):
+        if size not in (8760, 8784):
+            raise ValueError(f"Expected a year of hourly values, got {size}")
+        period = AnalysisPeriod(is_leap_year=size == 8784)
+    if period.timestep != 1 or len(period.hoys) != size:
+        raise ValueError(f"Expected hourly values for {period}, got {size} values at timestep {period.timestep}")
+    return period
+
+
+def _hour_keys(period: AnalysisPeriod) -> np.ndarray:
+    """(month, day, hour) of every hour of the period as one integer, independent of the leap year setting."""
+    hoys = np.rint(np.asarray(period.hoys, dtype=np.float64)).astype(np.int64)
+    days_per_month = np.array([31, 29 if period.is_leap_year else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+    month_starts = np.concatenate(([0], np.cumsum(days_per_month)[:-1]))
+    days = hoys // 24
+    months = np.searchsorted(month_starts, days, side='right') - 1
+    return (months * 32 + days - month_starts[months]) * 24 + hoys % 24
+
+
+def _period_positions(data_period: AnalysisPeriod, analysis_period: AnalysisPeriod) -> np.ndarray:
+    """
+    Returns the positions of the hours of `analysis_period` in values covering `data_period`,
+    matching them by their date and hour rather than by hour of the year.
+    """
+    if analysis_period.timestep != 1:
+        raise ValueError(f"The UTCI is calculated per hour, got an analysis period at timestep {analysis_period.timestep}")
+    data_keys, keys = _hour_keys(data_period), _hour_keys(analysis_period)
+    order = np.argsort(data_keys, kind='stable')
+    index = np.minimum(np.searchsorted(data_keys[order], keys), len(order) - 1)
+    positions = order[index]
+    missing = data_keys[positions] != keys
+    if missing.any():
+        raise ValueError(f"{int(missing.sum())} hours of {analysis_period} are not part of the weather data ({data_period})")
+    return positions
+
+
+def load_categories(file_path: str = CATEGORIES_PATH, reload_on_change: bool = False) -> dict:
+    """
+    Returns the category tables of the file, reading and parsing it only once per process.
+
+    Parameters:
+    - file_path (str): The JSON file with the tables, by default the one shipped in this package.
+    - reload_on_change (bool): Check the modification time of the file on every call and read it
+      again when it changed, so edited tables are picked up without a restart.
+
+    Returns:
+    - dict: The tables, shared between callers; treat them as read-only.
+    """
+    path = os.path.abspath(file_path)
+    with _category_lock:
+        entry = _category_tables.get(path)
+        if entry is not None and not reload_on_change:
+            return entry[1]
+        mtime = os.stat(path).st_mtime_ns
+        if entry is None or entry[0] != mtime:
+            with open(path, 'r') as file:
+                entry = (mtime, json.load(file))
+            _category_tables[path] = entry
+        return entry[1]
+
+
+def compile_categories(categories: dict) -> Dict[str, CategoryBins]:
+    """
+    Returns the `CategoryBins` of every table, compiling the tables only the first time they are
+    seen. The most recently used configurations are kept.
+    """
+    key = tuple((name, tuple(table.items())) for name, table in categories.items())
+    return _compiled_bins.get_or_set(
+        key, lambda: {name: CategoryBins.from_dict(table) for name, table in categories.items()})
 
 
 class UTCICalculator():
 
+    # re-read categories.json when it is edited (checks its modification time once per calculator)
+    reload_categories = False
+
     def __init__(self, weather_data: WeatherData):
         self.weather_data = weather_data
-        self.categories = self._load_categories("src/categories.json")
+        self.categories = self._load_categories(CATEGORIES_PATH)
+        self.category_bins = compile_categories(self.categories)
 
     def calculate(self):
         eh_pa, delta_t_tr, pa = self._calculate_environmental_factors()
         
-        utci_approx = utci_optimised(self.weather_data.dry_bulb_temp.average, self.weather_data.wind_speed.average, delta_t_tr, pa)
-        output = {'utci': np.round_(utci_approx, 5).tolist()}
+        wind_speed = np.clip(self.weather_data.wind_speed.average, *UTCI_WIND_RANGE)
+        utci_approx = utci_optimised(self.weather_data.dry_bulb_temp.average, wind_speed, delta_t_tr, pa)
+        output = {'utci': np.round(utci_approx, 5).tolist()}
 
-        output['stress_category'] = self._get_category(utci_approx, self.categories['STRESS_CATEGORIES'])
-        output['comfort_rating'] = self._get_category(utci_approx, self.categories['COMFORT_RATINGS'])
+        output['stress_category'] = self._get_category(utci_approx, 'STRESS_CATEGORIES')
+        output['comfort_rating'] = self._get_category(utci_approx, 'COMFORT_RATINGS')
 
         return output
-    
+
+    def calculate_hourly(self, analysis_period: Optional[AnalysisPeriod] = None) -> Dict[str, np.ndarray]:
+        """
+        Calculates the UTCI for every hour of the weather data instead of for the annual averages.
+
+        Parameters:
+        - analysis_period (AnalysisPeriod): Optional period to restrict the calculation to.
+
+        Returns:
+        - Dict[str, np.ndarray]: The hourly 'utci' values with their 'stress_category' and 'comfort_rating'.
+        """
+        return self.calculate_arrays(*self._hourly_inputs(self.weather_data, analysis_period))
+
+    def calculate_stations(self, stations: List[WeatherData],
+                           analysis_period: Optional[AnalysisPeriod] = None) -> Dict[str, np.ndarray]:
+        """
+        Calculates the hourly UTCI of several stations in one call, stacked with a row per station.
+        """
+        inputs = [self._hourly_inputs(weather_data, analysis_period) for weather_data in stations]
+        return self.calculate_arrays(*(np.vstack(column) for column in zip(*inputs)))
+
+    def calculate_arrays(self, dry_bulb_temp, radiant_temp, wind_speed, relative_humidity) -> Dict[str, np.ndarray]:
+        """
+        Calculates the UTCI of arrays of any (broadcastable) shape, for example hours or stations x hours.
+        Wind speeds are clamped to `UTCI_WIND_RANGE`; hours with a missing wind speed (the EPW 999
+        sentinel) get a NaN UTCI, which is categorised as unknown.
+
+        Returns:
+        - Dict[str, np.ndarray]: 'utci' with its 'stress_category' and 'comfort_rating' labels, in the input shape.
+        """
+        dry_bulb_temp, radiant_temp, wind_speed, relative_humidity = np.broadcast_arrays(
+            *(np.asarray(x, dtype=np.float64) for x in (dry_bulb_temp, radiant_temp, wind_speed, relative_humidity)))
+        missing = ~np.isfinite(wind_speed) | (wind_speed < 0) | (wind_speed >= MISSING_WIND)
+        wind_speed = np.clip(wind_speed, *UTCI_WIND_RANGE)
+        pa = saturation_vapour_pressure(dry_bulb_temp, out=np.empty(dry_bulb_temp.shape),
+                                        work=np.empty(dry_bulb_temp.shape))
+        pa *= relative_humidity
+        pa /= 1000.0  # percent and hPa to kPa
+        delta_t_tr = np.subtract(radiant_temp, dry_bulb_temp)
+        utci_approx = utci_optimised(dry_bulb_temp, wind_speed, delta_t_tr, pa)
+        if missing.any():
+            utci_approx[missing] = np.nan
+        return {
+            'utci': utci_approx,
+            'stress_category': self.category_bins['STRESS_CATEGORIES'].classify(utci_approx),
+            'comfort_rating': self.category_bins['COMFORT_RATINGS'].classify(utci_approx),
+        }
+
+    def category_hours(self, utci_values, table: str = 'STRESS_CATEGORIES') -> Dict[str, np.ndarray]:
+        """
+        Summarises hourly UTCI values per category of the table.
+
+        Returns:
+        - Dict[str, np.ndarray]: The 'labels' with the 'counts' and 'fractions' of the hours per label
+          (per station for a stations x hours array).
+        """
+        bins = self.category_bins[table]
+        return {'labels': bins.labels, 'counts': bins.counts(utci_values), 'fractions': bins.fractions(utci_values)}
+
     @staticmethod
-    def _load_categories(file_path):
-        with open(file_path, 'r') as file:
-            return json.load(file)
+    def _hourly_inputs(weather_data: WeatherData, analysis_period: Optional[AnalysisPeriod] = None):
+        fields = (weather_data.dry_bulb_temp, weather_data.radiant_temp,
+                  weather_data.wind_speed, weather_data.relative_humidity)
+        arrays = [np.asarray(field.values, dtype=np.float64) for field in fields]
+        if analysis_period is not None:
+            positions = _period_positions(_data_period(fields[0], arrays[0].size), analysis_period)
+            arrays = [array[positions] for array in arrays]
+        return arrays
 
-    def _get_category(self, utci_value: float, category_dict: dict) -> str:
+    @classmethod
+    def _load_categories(cls, file_path):
+        return load_categories(file_path, reload_on_change=cls.reload_categories)
+
+    def _get_category(self, utci_value: float, table: str) -> str:
         """
         Determines the category of the given UTCI value based on predefined bounds.
 
         Parameters:
         - utci_value (float): The Universal Thermal Climate Index value to categorize.
-        - category_dict (dict): A dictionary mapping string bounds to category labels.
+        - table (str): The name of the category table, e.g. 'STRESS_CATEGORIES'.
 
         Returns:
         - str: The category label if a matching range is found; "unknown" otherwise.
 
         """
-        for key, category in category_dict.items():
-            bounds = key.split(', ')
-            lower = float(bounds[0]) if bounds[0] != "null" else None
-            upper = float(bounds[1]) if bounds[1] != "null" else None
-
-            if (lower is None or utci_value > lower) and (upper is None or utci_value <= upper):
-                return category
-        return "unknown"
+        return str(self.category_bins[table].classify(utci_value))
 
     def _calculate_environmental_factors(self):
         """"
@@ -74,19 +291,4 @@ class UTCICalculator():
         - es (float): The saturation vapor pressure in hectoPascals (hPa), which indicates the maximum amount of water vapor 
                     that air can hold at the specified temperature.
         """
-        
-        g = [
-            -2836.5744,
-            -6028.076559,
-            19.54263612,
-            -0.02737830188,
-            0.000016261698,
-            (7.0229056 * np.power(10.0, -10)),
-            (-1.8680009 * np.power(10.0, -13)),
-        ]
-        tk = t_db + 273.15 
-        es = 2.7150305 * np.log1p(tk)
-        for count, i in enumerate(g):
-            es = es + (i * np.power(tk, count - 2))
-        es = np.exp(es) * 0.01 
-        return es
\ No newline at end of file
+        return saturation_vapour_pressure(t_db)
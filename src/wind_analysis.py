@@ -0,0 +1,103 @@
+from typing import Dict, Iterable, Optional, Sequence
+import numpy as np
+from src.data_objects import WeatherData, WindStats, DEFAULT_SPEED_BANDS, band_indices, sector_indices, sector_labels, \
+    valid_wind
+
+
+MONTH_NAMES = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+DAYS_PER_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+# meteorological seasons of the northern hemisphere, by month number
+SEASONS = {
+    'Winter': (12, 1, 2),
+    'Spring': (3, 4, 5),
+    'Summer': (6, 7, 8),
+    'Autumn': (9, 10, 11),
+}
+SOUTHERN_SEASON_NAMES = {'Winter': 'Summer', 'Spring': 'Autumn', 'Summer': 'Winter', 'Autumn': 'Spring'}
+DAY_HOURS = range(6, 18)
+
+
+class WindAnalysis:
+    """
+    Wind rose analytics for one station.
+
+    All hours are counted once into a single histogram of month x hour of day x direction
+    sector x speed band (with the summed speeds alongside for the averages). Every rose (the
+    annual one, per month or season, day or night, or any other selection of months and
+    hours) is then a sum over a slice of that histogram, so no variant needs another pass
+    over the hourly data.
+    """
+
+    def __init__(self, weather_data: WeatherData, sectors: int = 16,
+                 speed_bands: Sequence[float] = DEFAULT_SPEED_BANDS):
+        self.sectors = sectors
+        self.speed_bands = np.asarray(speed_bands, dtype=np.float64)
+        self.labels = sector_labels(sectors)
+        self.southern_hemisphere = weather_data.location is not None and weather_data.location.latitude < 0
+
+        directions = np.asarray(weather_data.wind_direction.values, dtype=np.float64)
+        speeds = np.asarray(weather_data.wind_speed.values, dtype=np.float64)
+        month, hour = self._month_and_hour(directions.size)
+        valid = valid_wind(directions, speeds)
+        if not valid.all():
+            directions, speeds, month, hour = directions[valid], speeds[valid], month[valid], hour[valid]
+
+        bands = len(self.speed_bands)
+        cell = (month * 24 + hour) * sectors + sector_indices(directions, sectors)
+        self.counts = np.bincount(cell * bands + band_indices(speeds, self.speed_bands),
+                                  minlength=12 * 24 * sectors * bands).reshape(12, 24, sectors, bands)
+        self.speed_sums = np.bincount(cell, weights=speeds, minlength=12 * 24 * sectors).reshape(12, 24, sectors)
+
+    @staticmethod
+    def _month_and_hour(size: int):
+        """Month (0-11) and hour of day of every value of a year of hourly data starting on the 1st of January."""
+        days = size // 24
+        if size % 24 or days not in (365, 366):
+            raise ValueError(f"Expected a year of hourly values, got {size}")
+        days_per_month = np.array(DAYS_PER_MONTH)
+        days_per_month[1] += days - 365
+        month = np.repeat(np.repeat(np.arange(12), days_per_month), 24)
+        hour = np.tile(np.arange(24), days)
+        return month, hour
+
+    def rose(self, months: Optional[Iterable[int]] = None, hours: Optional[Iterable[int]] = None) -> WindStats:
+        """
+        Returns the wind statistics of the selected hours.
+
+        Parameters:
+        - months: Month numbers (1-12) to include, all by default.
+        - hours: Hours of the day (0-23) to include, all by default.
+
+        Returns:
+        - WindStats: The frequencies and average speeds per sector and speed band.
+        """
+        month_index = slice(None) if months is None else np.asarray(list(months), dtype=np.intp) - 1
+        hour_index = slice(None) if hours is None else np.asarray(list(hours), dtype=np.intp)
+        band_frequency = self.counts[month_index][:, hour_index].sum(axis=(0, 1))
+        speed_sums = self.speed_sums[month_index][:, hour_index].sum(axis=(0, 1))
+        frequency = band_frequency.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            average_speed = speed_sums / frequency
+        return WindStats(
+            directions=np.arange(self.sectors) * (360.0 / self.sectors),
+            labels=self.labels,
+            speed_bands=self.speed_bands,
+            frequency=frequency,
+            average_speed=average_speed,
+            band_frequency=band_frequency,
+        )
+
+    def monthly_roses(self) -> Dict[str, WindStats]:
+        """Returns the rose of every month, keyed by the month name."""
+        return {name: self.rose(months=[month]) for month, name in enumerate(MONTH_NAMES, start=1)}
+
+    def seasonal_roses(self) -> Dict[str, WindStats]:
+        """Returns the rose of every meteorological season, named for the hemisphere of the station."""
+        names = SOUTHERN_SEASON_NAMES if self.southern_hemisphere else {name: name for name in SEASONS}
+        return {names[season]: self.rose(months=months) for season, months in SEASONS.items()}
+
+    def diurnal_roses(self, day_hours: Iterable[int] = DAY_HOURS) -> Dict[str, WindStats]:
+        """Returns the roses of the day time hours and of the remaining (night) hours."""
+        day_hours = sorted(set(day_hours))
+        night_hours = [hour for hour in range(24) if hour not in day_hours]
+        return {'Day': self.rose(hours=day_hours), 'Night': self.rose(hours=night_hours)}
@@ -6,3 +6,83 @@ print(root_dir)
 src_dir = root_dir
 
 sys.path.insert(0, str(src_dir))
+
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from ladybug.epw import EPW
+from src.data_objects import WeatherData
+
+
+@pytest.fixture
+def weather_data():
+    """Weather data built from a synthetic (non-constant) Ladybug EPW."""
+    epw = EPW.from_missing_values()
+    hours = range(8760)
+    epw.dry_bulb_temperature.values = [10 + 10 * ((h % 24) / 24) + (h // 24) / 36.5 for h in hours]
+    epw.dew_point_temperature.values = [5 + (h % 24) / 4 for h in hours]
+    epw.wind_speed.values = [(h * 7) % 13 / 2 for h in hours]
+    epw.wind_direction.values = [(h * 37) % 360 for h in hours]
+    epw.relative_humidity.values = [40 + (h * 11) % 50 for h in hours]
+    epw.total_sky_cover.values = [h % 11 for h in hours]
+    return WeatherData(
+        dry_bulb_temp=epw.dry_bulb_temperature,
+        radiant_temp=epw.dew_point_temperature,
+        wind_speed=epw.wind_speed,
+        wind_direction=epw.wind_direction,
+        relative_humidity=epw.relative_humidity,
+        total_sky_cover=epw.total_sky_cover,
+    )
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Serves `files` ({path: (body, etag)}) and honours If-None-Match, recording every request.
+    The first `failures[path]` requests of a path are answered with a 503.
+    """
+    files = {}
+    failures = {}
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append((self.path, self.headers.get('If-None-Match')))
+        if self.failures.get(self.path, 0) > 0:
+            self.failures[self.path] -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        if self.path not in self.files:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body, etag = self.files[self.path]
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """Local HTTP server standing in for the EPW file host."""
+    handler = type('Handler', (StubHandler,), {
+        'files': {'/a.zip': (b'a' * 100, '"a1"'), '/b.zip': (b'b' * 100, '"b1"'), '/c.zip': (b'c' * 100, '"c1"')},
+        'failures': {},
+        'requests_seen': [],
+    })
+    server = HTTPServer(('127.0.0.1', 0), handler)
+    server.handler = handler
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,45 @@
+import json
+from unittest.mock import MagicMock, patch
+import pytest
+from munch import Munch
+from src.chart_cache import ChartCache
+from src.data_objects import StationQueryResult
+
+
+@pytest.fixture
+def app_module():
+    with patch('src.speckle_integration.GraphQLSpeckleIntegration.get_projects', return_value=[]):
+        import app
+    return app
+
+@pytest.fixture
+def stations():
+    return StationQueryResult.from_stations([{'_id': f'id-{i}', 'name': f'Station {i}', 'lat': 51.5 + i / 10,
+                                              'lng': -0.1, 'url': f'https://example.com/{i}.zip'} for i in range(3)])
+
+def test_station_comparison_view_reports_unavailable_station(app_module, stations, weather_data, monkeypatch):
+    def download_method(station):
+        method = MagicMock()
+        if station['_id'] == 'id-1':
+            method.get_weather_data.side_effect = ConnectionError('host unreachable')
+            method.content_hash.side_effect = ConnectionError('host unreachable')
+        else:
+            method.get_weather_data.return_value = weather_data
+        return method
+
+    downloader = MagicMock()
+    downloader.cache.content_hash.return_value = None
+    monkeypatch.setattr(app_module, 'load_weather_stations', lambda lat, lon, radius: stations)
+    monkeypatch.setattr(app_module, '_station_download_method', download_method)
+    monkeypatch.setattr(app_module, 'get_downloader', lambda: downloader)
+    monkeypatch.setattr(app_module, 'get_chart_cache', lambda cache=ChartCache(): cache)
+
+    params = Munch(step_1=Munch(geo_point=Munch(lat=51.5, lon=-0.1), radius=50))
+    controller = app_module.ModelController()
+    # the view decorator binds the method to the view object, so the controller is passed explicitly
+    result = controller.get_station_comparison_view(controller, params=params)
+
+    figure = json.loads(result.figure) if isinstance(result.figure, str) else result.figure
+    assert [trace['name'] for trace in figure['data'][:2]] == ['Station 0', 'Station 2']
+    assert 'Not available: Station 1 (host unreachable)' in figure['layout']['title']['text']
+    downloader.download.assert_not_called()
@@ -0,0 +1,48 @@
+import threading
+import time
+from src.caching import LRUCache
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the least recently used
+    cache.set('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert len(cache) == 2
+
+def test_get_default():
+    cache = LRUCache()
+    assert cache.get('missing') is None
+    assert cache.get('missing', 5) == 5
+
+def test_get_or_set_computes_once_for_concurrent_callers():
+    cache = LRUCache()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_set('key', factory))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['value'] * 5
+    assert len(calls) == 1
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('src.caching.time.monotonic', lambda: now[0])
+    cache = LRUCache(maxsize=4, ttl=60)
+    cache.set('key', 'value')
+
+    now[0] += 59
+    assert cache.get('key') == 'value'
+    now[0] += 2
+    assert 'key' not in cache
+    assert cache.get_or_set('key', lambda: 'fresh') == 'fresh'
@@ -0,0 +1,48 @@
+import json
+import numpy as np
+import plotly.graph_objects as go
+from unittest.mock import MagicMock
+from src.chart_cache import compact_array, compact_figure, figure_json, ChartCache, TYPED_ARRAYS
+
+
+def test_compact_array_integers():
+    compact = compact_array(np.array([0.0, 3.0, 10.0]))
+    assert compact.dtype == np.int8
+    np.testing.assert_array_equal(compact, [0, 3, 10])
+    assert compact_array(np.array([0, 40000])).dtype == np.uint16
+    assert compact_array(np.array([-1, 40000])).dtype == np.int32
+
+def test_compact_array_floats():
+    compact = compact_array(np.array([1.23456, -7.891, np.nan]))
+    np.testing.assert_allclose(compact, [1.23, -7.89, np.nan], rtol=1e-6)
+    assert compact.dtype == (np.float32 if TYPED_ARRAYS else np.float64)
+    assert compact_array(['a', 'b']) == ['a', 'b']
+
+def test_figure_json_is_compact():
+    z = np.random.default_rng(0).normal(10, 5, size=(24, 365))
+    fig = go.Figure(go.Heatmap(z=z, x=np.arange(1, 366), y=np.arange(24) * 60))
+    plain = fig.to_json()
+    compact = figure_json(go.Figure(fig), decimals=2)
+
+    assert len(compact) < len(plain)
+    heatmap = json.loads(compact)['data'][0]
+    if TYPED_ARRAYS:
+        assert heatmap['z']['dtype'] == 'f4'
+
+def test_compact_figure_polar_marker():
+    fig = compact_figure(go.Figure(go.Barpolar(r=[1.234, 2.0], theta=[0, 90], marker=dict(color=[3.456, 5.5]))))
+    np.testing.assert_allclose(fig.data[0].r, [1.23, 2.0], rtol=1e-6)
+    np.testing.assert_allclose(fig.data[0].marker.color, [3.46, 5.5], rtol=1e-6)
+
+def test_chart_cache_renders_once():
+    cache = ChartCache(maxsize=2)
+    build = MagicMock(return_value=go.Figure(go.Heatmap(z=[[1.0, 2.0]])))
+
+    first = cache.get_or_render(('station', 'heatmap', ()), build)
+    second = cache.get_or_render(('station', 'heatmap', ()), build)
+
+    assert first == second
+    build.assert_called_once()
+    cache.clear()
+    cache.get_or_render(('station', 'heatmap', ()), build)
+    assert build.call_count == 2
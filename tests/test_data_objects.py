@@ -1,6 +1,8 @@
+import dataclasses
 import pytest
 from unittest.mock import Mock, create_autospec
-from src.data_objects import WeatherData, SpeckleProject  
+import numpy as np
+from src.data_objects import WeatherData, SpeckleProject, HourlyArray, StationQueryResult, sector_indices
 from ladybug.datacollection import HourlyContinuousCollection
 
 
@@ -93,4 +95,83 @@ def test_speckle_project_initialization():
     # Test default values
     default_project = SpeckleProject(stream_id=stream_id, name=name)
     assert default_project.lat is None
-    assert default_project.long is None
\ No newline at end of file
+    assert default_project.long is None
+
+def test_hourly_array_matches_collection(weather_data):
+    array = HourlyArray.from_collection(weather_data.dry_bulb_temp)
+    assert array.average == pytest.approx(weather_data.dry_bulb_temp.average)
+    assert len(array) == 8760
+    assert array.datetime_strings == weather_data.dry_bulb_temp.datetime_strings
+    assert array.to_collection().values == pytest.approx(weather_data.dry_bulb_temp.values)
+
+def test_hourly_array_unit_conversion(weather_data):
+    array = HourlyArray.from_collection(weather_data.dry_bulb_temp)
+    ip = array.convert_to_ip()
+    assert ip.unit == 'F'
+    np.testing.assert_allclose(ip.values, array.values * 1.8 + 32)
+    np.testing.assert_allclose(ip.convert_to_si().values, array.values)
+    assert array.unit == 'C'
+
+
+def test_get_wind_stats(weather_data):
+    stats = weather_data.get_wind_stats(sectors=16, speed_bands=(0, 2, 4))
+    directions = np.asarray(weather_data.wind_direction.values)
+    speeds = np.asarray(weather_data.wind_speed.values)
+
+    assert stats.labels[0] == 'N' and stats.labels[4] == 'E'
+    assert stats.frequency.sum() == 8760
+    np.testing.assert_array_equal(stats.band_frequency.sum(axis=1), stats.frequency)
+    # the north sector spans 348.75 up to (not including) 11.25 degrees
+    north = (directions >= 348.75) | (directions < 11.25)
+    assert stats.frequency[0] == north.sum()
+    assert stats.average_speed[0] == pytest.approx(speeds[north].mean())
+    assert stats.band_frequency[0, 2] == (north & (speeds >= 4)).sum()
+
+@pytest.mark.parametrize("sectors", [8, 16, 36])
+def test_get_wind_stats_sectors(weather_data, sectors):
+    stats = weather_data.get_wind_stats(sectors=sectors)
+    assert len(stats.labels) == len(stats.frequency) == sectors
+    assert stats.band_frequency.shape == (sectors, 6)
+    assert stats.frequency.sum() == 8760
+
+def test_sector_indices_wraps():
+    np.testing.assert_array_equal(sector_indices(np.array([0, 11.24, 11.25, 359, 360]), 16), [0, 0, 1, 0, 0])
+
+def test_get_wind_stats_excludes_missing_hours(weather_data):
+    directions = HourlyArray.from_collection(weather_data.wind_direction)
+    speeds = HourlyArray.from_collection(weather_data.wind_speed)
+    directions.values[:10] = 999
+    speeds.values[10:15] = 999
+    data = dataclasses.replace(weather_data, wind_direction=directions, wind_speed=speeds)
+
+    stats = data.get_wind_stats(sectors=16)
+    assert stats.frequency.sum() == 8760 - 15
+    assert np.nanmax(stats.average_speed) < 999
+    assert stats.band_frequency[:, -1].sum() == (np.asarray(speeds.values[15:]) >= 10).sum()
+
+def test_station_query_result():
+    stations = [{'_id': 'a', 'lat': 51.5, 'lng': -0.1, 'name': 'London'},
+                {'_id': 'b', 'lat': 52.2, 'lng': 0.12, 'name': 'Cambridge'}]
+    result = StationQueryResult.from_stations(stations, describe=lambda station: f"**Name**:{station['name']}")
+
+    assert len(result) == 2
+    assert [station['name'] for station in result] == ['London', 'Cambridge']
+    assert result.get('b')['name'] == 'Cambridge'
+    assert result.get('missing') is None and result.get(None) is None
+    assert 'a' in result
+    np.testing.assert_array_equal(result.lats, [51.5, 52.2])
+    np.testing.assert_array_equal(result.lngs, [-0.1, 0.12])
+    assert result.descriptions['a'] == '**Name**:London'
+
+def test_station_query_result_nearest():
+    stations = [{'_id': 'a', 'lat': 52.2, 'lng': 0.12}, {'_id': 'b', 'lat': 51.5, 'lng': -0.1},
+                {'_id': 'c', 'lat': 51.75, 'lng': -1.25}]
+    result = StationQueryResult.from_stations(stations)
+    assert [station['_id'] for station in result.nearest(51.5, -0.12, 2)] == ['b', 'a']
+    assert StationQueryResult.from_stations([]).nearest(0, 0, 3) == []
+
+def test_station_query_result_empty():
+    result = StationQueryResult.from_stations([])
+    assert len(result) == 0
+    assert result.lats.shape == (0,)
+    assert result.descriptions == {}
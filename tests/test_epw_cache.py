@@ -0,0 +1,90 @@
+import os
+import time
+import numpy as np
+import pytest
+from unittest.mock import Mock
+from src.epw_cache import EpwZipCache, WeatherDataCache, _evict_lru
+
+
+def test_cache_hit_does_not_download_again(stub_server, tmp_path):
+    cache = EpwZipCache(root=str(tmp_path))
+    assert cache.get(f"{stub_server.url}/a.zip") == b'a' * 100
+    assert cache.get(f"{stub_server.url}/a.zip") == b'a' * 100
+    assert len(stub_server.handler.requests_seen) == 1
+
+def test_stale_entry_is_revalidated_with_etag(stub_server, tmp_path):
+    cache = EpwZipCache(root=str(tmp_path), max_age=0)
+    cache.get(f"{stub_server.url}/a.zip")
+    assert cache.get(f"{stub_server.url}/a.zip") == b'a' * 100
+    assert stub_server.handler.requests_seen == [('/a.zip', None), ('/a.zip', '"a1"')]
+
+def test_changed_content_replaces_entry(stub_server, tmp_path):
+    cache = EpwZipCache(root=str(tmp_path), max_age=0)
+    cache.get(f"{stub_server.url}/a.zip")
+    first_hash = cache.content_hash(f"{stub_server.url}/a.zip")
+    stub_server.handler.files['/a.zip'] = (b'new content', '"a2"')
+    assert cache.get(f"{stub_server.url}/a.zip") == b'new content'
+    assert cache.content_hash(f"{stub_server.url}/a.zip") != first_hash
+
+def test_missing_file_raises(stub_server, tmp_path):
+    cache = EpwZipCache(root=str(tmp_path))
+    with pytest.raises(Exception):
+        cache.get(f"{stub_server.url}/missing.zip")
+    assert cache.content_hash(f"{stub_server.url}/missing.zip") is None
+
+def test_lru_eviction(stub_server, tmp_path):
+    cache = EpwZipCache(root=str(tmp_path), max_bytes=250)
+    cache.get(f"{stub_server.url}/a.zip")
+    cache.get(f"{stub_server.url}/b.zip")
+    blob_a = os.path.join(str(tmp_path), 'blobs', cache.content_hash(f"{stub_server.url}/a.zip"))
+    os.utime(blob_a, (0, 0))  # make a the least recently used
+    cache.get(f"{stub_server.url}/c.zip")
+    assert cache.content_hash(f"{stub_server.url}/a.zip") is None
+    assert cache.content_hash(f"{stub_server.url}/b.zip") is not None
+    assert cache.content_hash(f"{stub_server.url}/c.zip") is not None
+    assert not [name for name in os.listdir(os.path.join(str(tmp_path), 'blobs')) if name.startswith('.tmp-')]
+
+def test_weather_data_cache_memory_and_disk_tiers(tmp_path, weather_data):
+    loader = Mock(return_value=weather_data)
+    cache = WeatherDataCache(root=str(tmp_path))
+    first = cache.get_or_load('station', 'hash', loader)
+    assert cache.get_or_load('station', 'hash', loader) is first
+    assert loader.call_count == 1
+    np.testing.assert_array_equal(first.dry_bulb_temp.values, weather_data.dry_bulb_temp.values)
+
+    # a new worker only has the disk tier
+    other_worker = WeatherDataCache(root=str(tmp_path))
+    loaded = other_worker.get_or_load('station', 'hash', loader)
+    assert loader.call_count == 1
+    np.testing.assert_array_equal(loaded.wind_speed.values, weather_data.wind_speed.values)
+
+    # a different archive hash is parsed again
+    other_worker.get_or_load('station', 'other-hash', loader)
+    assert loader.call_count == 2
+
+def test_eviction_removes_columnar_files_together(tmp_path):
+    for age, stem in ((300, 'old'), (200, 'middle'), (100, 'new')):
+        for extension, size in (('.npy', 100), ('.json', 10)):
+            path = tmp_path / (stem + extension)
+            path.write_bytes(b'x' * size)
+            os.utime(path, (time.time() - age, time.time() - age))
+    os.utime(tmp_path / 'old.json')  # recently read metadata keeps the whole entry alive
+
+    _evict_lru(str(tmp_path), max_bytes=250)
+    assert sorted(os.listdir(tmp_path)) == ['new.json', 'new.npy', 'old.json', 'old.npy']
+
+def test_commit_survives_concurrent_eviction(tmp_path, monkeypatch):
+    cache = EpwZipCache(root=str(tmp_path))
+    cache.store('https://example.com/a.zip', b'archive')
+    blob = cache._blob_path(cache.content_hash('https://example.com/a.zip'))
+    utime, evicted = os.utime, []
+
+    def evicted_utime(path, *args, **kwargs):
+        if path == blob and not evicted:
+            os.remove(blob)  # another worker evicts the blob right before it is touched
+            evicted.append(path)
+        return utime(path, *args, **kwargs)
+
+    monkeypatch.setattr('src.epw_cache.os.utime', evicted_utime)
+    assert cache.store('https://example.com/b.zip', b'archive') == b'archive'
+    assert cache.lookup('https://example.com/b.zip') == (b'archive', True)
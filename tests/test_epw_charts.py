@@ -1,23 +1,25 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from src.epw_charts import epw_temp_flood_plot, epw_rh_flood_plot, epw_cloud_flood_plot, epw_wind_rose
-import pandas as pd
+from src.epw_charts import epw_temp_flood_plot, epw_rh_flood_plot, epw_cloud_flood_plot, epw_wind_rose, day_hour_grid, \
+    heatmap_figure, heatmap_figures, HeatmapSpec, HEATMAP_SPECS
+import numpy as np
+from src.data_objects import WindStats
 
 # Mocking an EPW object
 @pytest.fixture
 def mock_epw():
     mock = MagicMock()
-    mock.dry_bulb_temp.datetime_strings = ["01 Jan 00:00", "02 Jan 01:00"]
-    mock.dry_bulb_temp.values = [20, 22]
-    mock.relative_humidity.datetime_strings = ["01 Jan 00:00", "02 Jan 01:00"]
-    mock.relative_humidity.values = [50, 60]
-    mock.total_sky_cover.datetime_strings = ["01 Jan 00:00", "02 Jan 01:00"]
-    mock.total_sky_cover.values = [5, 7]
-    mock.get_wind_stats.return_value = {
-        'Frequency': pd.Series([5, 10]),
-        'Wind Direction Bin': pd.Series([0, 90]),
-        'Average_Speed': pd.Series([3.5, 5.5])
-    }
+    mock.dry_bulb_temp.values = [20, 22] * 4380
+    mock.relative_humidity.values = [50, 60] * 4380
+    mock.total_sky_cover.values = [5, 7] * 4380
+    mock.get_wind_stats.return_value = WindStats(
+        directions=np.array([0.0, 180.0]),
+        labels=['N', 'S'],
+        speed_bands=np.array([0.0, 4.0]),
+        frequency=np.array([5, 10]),
+        average_speed=np.array([3.5, 5.5]),
+        band_frequency=np.array([[3, 2], [4, 6]])
+    )
     return mock
 
 def test_epw_temp_flood_plot(mock_epw):
@@ -51,3 +53,43 @@ def test_epw_wind_rose(mock_epw):
         mock_layout.assert_called()
         mock_figure.assert_called()
         assert isinstance(result, MagicMock)
+
+def test_day_hour_grid():
+    values = np.arange(8760)
+    z = day_hour_grid(values)
+    assert z.shape == (24, 365)
+    assert z[0, 0] == 0 and z[23, 0] == 23 and z[5, 1] == 29
+    assert day_hour_grid(np.arange(8784.0)).shape == (24, 366)
+    with pytest.raises(ValueError):
+        day_hour_grid(np.arange(100))
+
+def test_epw_temp_flood_plot_matrix(mock_epw):
+    fig = epw_temp_flood_plot(mock_epw)
+    heatmap = fig.data[0]
+    assert np.shape(heatmap.z) == (24, 365)
+    assert heatmap.x[0] == 1 and heatmap.x[-1] == 365
+    assert heatmap.y[-1] == 23 * 60
+
+def test_heatmap_figure_from_numpy_column():
+    spec = HeatmapSpec('Global Horizontal Radiation', 'Radiation (Wh/m2)', 'hot')
+    fig = heatmap_figure(np.arange(8784.0), spec)
+    heatmap = fig.data[0]
+    assert np.shape(heatmap.z) == (24, 366)
+    assert heatmap.colorbar.title.text == 'Radiation (Wh/m2)'
+    assert fig.layout.title.text == 'Global Horizontal Radiation'
+
+def test_heatmap_figures_batch(weather_data):
+    figures = heatmap_figures(weather_data, ['dry_bulb_temp', 'relative_humidity'])
+    assert list(figures) == ['dry_bulb_temp', 'relative_humidity']
+    np.testing.assert_array_equal(figures['dry_bulb_temp'].data[0].z,
+                                  day_hour_grid(weather_data.dry_bulb_temp.values))
+    assert figures['relative_humidity'].layout.title.text == HEATMAP_SPECS['relative_humidity'].title
+    assert set(heatmap_figures(weather_data)) == set(HEATMAP_SPECS)
+
+def test_epw_wind_rose_stacks_speed_bands(weather_data):
+    fig = epw_wind_rose(weather_data, sectors=8)
+    assert len(fig.data) == 6
+    assert list(fig.data[0].theta) == ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']
+    assert fig.data[-1].name == '>10 m/s'
+    assert sum(np.sum(trace.r) for trace in fig.data) == pytest.approx(100)
+    fig.to_json()
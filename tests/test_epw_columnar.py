@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from src.data_objects import HourlyArray
+from src.epw_columnar import WEATHER_FIELDS, read_columnar, write_columnar
+
+def test_columnar_round_trip(tmp_path, weather_data):
+    path = str(tmp_path / 'station')
+    write_columnar(weather_data, path)
+    loaded = read_columnar(path)
+
+    assert loaded.units == 'SI'
+    for field in WEATHER_FIELDS:
+        original, restored = getattr(weather_data, field), getattr(loaded, field)
+        assert isinstance(restored, HourlyArray)
+        assert isinstance(restored.values, np.memmap)
+        np.testing.assert_array_equal(restored.values, original.values)
+        assert restored.header.to_dict() == original.header.to_dict()
+    assert loaded.dry_bulb_temp.average == pytest.approx(weather_data.dry_bulb_temp.average)
+    assert loaded.dry_bulb_temp.datetime_strings[:2] == ['01 Jan 00:00', '01 Jan 01:00']
+
+def test_columnar_round_trip_keeps_ip_units(tmp_path, weather_data):
+    for field in WEATHER_FIELDS:
+        setattr(weather_data, field, HourlyArray.from_collection(getattr(weather_data, field)))
+    weather_data.convert_to_ip()
+    assert weather_data.units == 'IP'
+    path = str(tmp_path / 'station')
+    write_columnar(weather_data, path)
+    loaded = read_columnar(path)
+
+    assert loaded.units == 'IP' and loaded.dry_bulb_temp.unit == 'F'
+    for field in WEATHER_FIELDS:
+        np.testing.assert_array_equal(getattr(loaded, field).values, getattr(weather_data, field).values)
+
+def test_columnar_without_mmap(tmp_path, weather_data):
+    path = str(tmp_path / 'station')
+    write_columnar(weather_data, path)
+    assert not isinstance(read_columnar(path, mmap=False).wind_speed.values, np.memmap)
+
+def test_columnar_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_columnar(str(tmp_path / 'missing'))
@@ -0,0 +1,80 @@
+import threading
+import time
+import aiohttp
+import pytest
+from src.epw_cache import EpwZipCache
+from src.epw_download import AsyncEpwDownloader
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    downloader = AsyncEpwDownloader(EpwZipCache(root=str(tmp_path)), backoff=0.01)
+    yield downloader
+    downloader.close()
+
+def test_download_streams_into_cache(stub_server, downloader):
+    url = f"{stub_server.url}/a.zip"
+    assert downloader.download(url) == b'a' * 100
+    assert downloader.cache.content_hash(url) is not None
+    assert downloader.download(url) == b'a' * 100
+    assert len(stub_server.handler.requests_seen) == 1
+
+def test_download_revalidates_stale_entry(stub_server, downloader):
+    downloader.cache.max_age = 0
+    url = f"{stub_server.url}/a.zip"
+    downloader.download(url)
+    assert downloader.download(url) == b'a' * 100
+    assert stub_server.handler.requests_seen[-1] == ('/a.zip', '"a1"')
+
+def test_download_retries_server_errors(stub_server, downloader):
+    stub_server.handler.failures['/a.zip'] = 2
+    assert downloader.download(f"{stub_server.url}/a.zip") == b'a' * 100
+    assert len(stub_server.handler.requests_seen) == 3
+
+def test_download_does_not_retry_missing_file(stub_server, downloader):
+    with pytest.raises(aiohttp.ClientResponseError):
+        downloader.download(f"{stub_server.url}/missing.zip")
+    assert len(stub_server.handler.requests_seen) == 1
+
+def test_prefetch_downloads_every_station_once(stub_server, downloader):
+    urls = [f"{stub_server.url}/{name}.zip" for name in ('a', 'b', 'c', 'a')]
+    results = downloader.prefetch(urls).result(timeout=10)
+    assert sorted(results) == [b'a' * 100, b'b' * 100, b'c' * 100]
+    assert sorted(path for path, _ in stub_server.handler.requests_seen) == ['/a.zip', '/b.zip', '/c.zip']
+    assert downloader.prefetch(urls).result(timeout=10) == []
+
+def test_cache_io_runs_off_the_event_loop(stub_server, downloader):
+    threads = []
+    lookup = downloader.cache.lookup
+
+    def recording_lookup(url):
+        threads.append(threading.current_thread().name)
+        return lookup(url)
+
+    downloader.cache.lookup = recording_lookup
+    downloader.download(f"{stub_server.url}/a.zip")
+    assert threads and all(name.startswith('epw-io') for name in threads)
+
+def test_certificate_verification_is_configurable(tmp_path, monkeypatch):
+    def verify_ssl(**options):
+        downloader = AsyncEpwDownloader(EpwZipCache(root=str(tmp_path)), **options)
+        downloader.close()
+        return downloader.verify_ssl
+
+    monkeypatch.delenv('EPW_VERIFY_SSL', raising=False)
+    assert not verify_ssl()
+    monkeypatch.setenv('EPW_VERIFY_SSL', '1')
+    assert verify_ssl() and not verify_ssl(verify_ssl=False)
+
+def test_backoff_releases_the_concurrency_slot(stub_server, tmp_path):
+    downloader = AsyncEpwDownloader(EpwZipCache(root=str(tmp_path)), max_concurrency=1, backoff=1.0)
+    try:
+        stub_server.handler.failures['/a.zip'] = 1
+        failing = downloader._submit(downloader.fetch(f"{stub_server.url}/a.zip"))
+        time.sleep(0.3)  # the first attempt failed and /a.zip is backing off
+        started = time.monotonic()
+        assert downloader.download(f"{stub_server.url}/b.zip") == b'b' * 100
+        assert time.monotonic() - started < 0.5
+        assert failing.result(timeout=10) == b'a' * 100
+    finally:
+        downloader.close()
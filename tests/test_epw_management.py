@@ -1,6 +1,12 @@
+import hashlib
+import io
+import zipfile
 import pytest
 from unittest.mock import Mock, patch
-from src.epw_management import DownloadMethod
+import numpy as np
+from ladybug.epw import EPW
+from src.epw_cache import EpwZipCache
+from src.epw_management import DownloadMethod, LadybugEpwParser, NumpyEpwParser, EPW_FIELD_NUMBERS
 
 @pytest.fixture
 def mock_requests_get(mocker):
@@ -12,19 +18,9 @@ def mock_zipfile(mocker):
 
 @pytest.fixture
 def mock_epw(mocker):
-    mocker.patch('ladybug.epw.EPW')
+    return mocker.patch('src.epw_management.EPW')
 
-@pytest.fixture
-def mock_tempfile(mocker):
-    # Mock the temporary directory to always return a fixed path
-    return mocker.patch('tempfile.TemporaryDirectory', return_value=mocker.MagicMock(__enter__=Mock(return_value='/fake/dir'), __exit__=Mock()))
-
-@pytest.fixture
-def mock_os_path_join(mocker):
-    # Ensure os.path.join mock returns a predictable path
-    mocker.patch('os.path.join', return_value='/fake/dir/data.epw')
-
-def test_download_method_successful(mock_requests_get, mock_zipfile, mock_tempfile, mock_os_path_join, mock_epw):
+def test_download_method_successful(mock_requests_get, mock_zipfile, mock_epw):
     # Setup mock for requests.get
     mock_response = Mock()
     mock_response.raise_for_status = Mock()
@@ -34,12 +30,108 @@ def test_download_method_successful(mock_requests_get, mock_zipfile, mock_tempfi
     # Setup mock for zipfile.ZipFile
     mock_zip = mock_zipfile.return_value.__enter__.return_value
     mock_zip.namelist.return_value = ['data.epw']
-    mock_zip.extract = Mock()
+    mock_zip.read.return_value = b'LOCATION,Fake\r\nDATA'
 
     # Instantiate the downloader and call the method
-    downloader = DownloadMethod(url="http://example.com/fake.zip")
+    downloader = DownloadMethod(url="http://example.com/fake.zip", parser=LadybugEpwParser())
     downloader.get_weather_data()
     
     # Assertions to ensure everything was called correctly
     mock_requests_get.assert_called_once_with("http://example.com/fake.zip", verify=False)
-    mock_zip.extract.assert_called_once_with('data.epw', '/fake/dir')
+    mock_zip.read.assert_called_once_with('data.epw')
+    mock_epw.from_file_string.assert_called_once_with('LOCATION,Fake\nDATA\n')
+
+def test_weather_data_is_parsed_without_temp_files(mocker):
+    epw = EPW.from_missing_values()
+    epw.dry_bulb_temperature.values = [float(h % 24) for h in range(8760)]
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zip_ref:
+        zip_ref.writestr('station.epw', epw.to_file_string())
+    archive.seek(0)
+    mocker.patch('tempfile.TemporaryDirectory', side_effect=AssertionError('no temp files expected'))
+
+    weather_data = DownloadMethod(url="http://example.com/fake.zip")._read_weather_data(archive)
+    np.testing.assert_array_equal(weather_data.dry_bulb_temp.values, epw.dry_bulb_temperature.values)
+    assert weather_data.units == 'SI'
+
+def test_archive_without_epw(mocker):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zip_ref:
+        zip_ref.writestr('readme.txt', 'no weather here')
+    with pytest.raises(FileNotFoundError):
+        DownloadMethod(url="http://example.com/fake.zip")._read_weather_data(archive)
+
+def test_download_method_uses_cache(mock_requests_get):
+    cache = Mock()
+    cache.get.return_value = b'Cached zip content'
+    downloader = DownloadMethod(url="http://example.com/fake.zip", cache=cache)
+    assert downloader.get_zip_in_memory().read() == b'Cached zip content'
+    cache.get.assert_called_once_with("http://example.com/fake.zip")
+    mock_requests_get.assert_not_called()
+
+def test_download_method_content_hash_follows_the_archive(tmp_path, mock_requests_get):
+    cache = EpwZipCache(root=str(tmp_path), max_age=0)
+    mock_requests_get.return_value.status_code = 200
+    mock_requests_get.return_value.content = b'version 1'
+    mock_requests_get.return_value.headers = {}
+    downloader = DownloadMethod(url="http://example.com/fake.zip", cache=cache)
+    first = downloader.content_hash()
+
+    mock_requests_get.return_value.content = b'version 2'
+    assert downloader.content_hash() != first
+    assert downloader.content_hash() == hashlib.sha256(b'version 2').hexdigest()
+
+def test_download_method_reuses_parsed_weather_data(mocker):
+    cache = Mock()
+    cache.content_hash.return_value = 'abc123'
+    weather_cache = Mock()
+    weather_cache.get_or_load.return_value = 'weather data'
+    read_weather_data = mocker.patch.object(DownloadMethod, '_read_weather_data')
+
+    downloader = DownloadMethod(url="http://example.com/fake.zip", cache=cache, weather_cache=weather_cache, station_id='42')
+    assert downloader.get_weather_data() == 'weather data'
+    weather_cache.get_or_load.assert_called_once()
+    assert weather_cache.get_or_load.call_args[0][:2] == ('42', 'abc123')
+    cache.get.assert_not_called()  # the hash of a fresh archive is known without reading it
+    read_weather_data.assert_not_called()
+
+
+@pytest.fixture
+def epw_text():
+    epw = EPW.from_missing_values()
+    rng = np.random.default_rng(1)
+    epw.location.city = 'London Gatwick'
+    epw.location.country = 'GBR'
+    epw.location.latitude = 51.15
+    epw.location.longitude = -0.18
+    epw.dry_bulb_temperature.values = rng.uniform(-10, 35, 8760).round(1).tolist()
+    epw.dew_point_temperature.values = rng.uniform(-15, 20, 8760).round(1).tolist()
+    epw.relative_humidity.values = rng.integers(10, 100, 8760).tolist()
+    epw.wind_direction.values = rng.integers(0, 360, 8760).tolist()
+    epw.wind_speed.values = rng.uniform(0, 20, 8760).round(1).tolist()
+    epw.total_sky_cover.values = rng.integers(0, 10, 8760).tolist()
+    return epw.to_file_string()
+
+def test_numpy_parser_matches_ladybug(epw_text):
+    fast, reference = NumpyEpwParser().parse(epw_text), LadybugEpwParser().parse(epw_text)
+    for field in EPW_FIELD_NUMBERS:
+        fast_field, reference_field = getattr(fast, field), getattr(reference, field)
+        assert isinstance(fast_field.values, np.ndarray)
+        np.testing.assert_array_equal(fast_field.values, reference_field.values)
+        assert fast_field.header.to_dict() == reference_field.header.to_dict()
+        assert fast_field.datetime_strings[:3] == reference_field.datetime_strings[:3]
+    assert fast.location.to_dict() == reference.location.to_dict()
+    assert fast.units == reference.units == 'SI'
+
+def test_numpy_parser_rejects_partial_year(epw_text):
+    truncated = '\n'.join(epw_text.split('\n')[:100]) + '\n'
+    with pytest.raises(ValueError):
+        NumpyEpwParser().parse(truncated)
+
+def test_download_method_uses_downloader(mock_requests_get):
+    downloader = Mock()
+    downloader.download.return_value = b'Downloaded zip content'
+    method = DownloadMethod(url="http://example.com/fake.zip", downloader=downloader)
+    assert method.get_zip_in_memory().read() == b'Downloaded zip content'
+    assert method.cache is downloader.cache
+    mock_requests_get.assert_not_called()
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+from src.data_objects import StationQueryResult
+from src.map_clustering import (StationClusters, MapClusterCache, cluster_stations, cluster_subdivisions,
+                                grid_cells, group_stations)
+from src.station_retrieval import TileStationCache
+
+
+def _stations(points):
+    return [{'_id': str(i), 'name': f'Station {i}', 'lat': lat, 'lng': lng} for i, (lat, lng) in enumerate(points)]
+
+
+DENSE = [(51.51, -0.12), (51.511, -0.121), (51.512, -0.122), (51.513, -0.123)]
+SPARSE = [(52.5, 1.0), (50.0, -3.0)]
+
+
+@pytest.fixture
+def tile_cache():
+    retrieval = MagicMock()
+    retrieval.fetch_range_stations.return_value = _stations(DENSE + SPARSE)
+    return TileStationCache(retrieval, tile_degrees=1.0)
+
+
+def test_cluster_subdivisions_are_zoom_levels():
+    assert cluster_subdivisions(100) == 16
+    assert cluster_subdivisions(80) == cluster_subdivisions(100)
+    assert cluster_subdivisions(50) == 32
+    assert cluster_subdivisions(0) == 64
+
+
+def test_grid_cells_nest_in_tiles():
+    # cells are square at the latitude of the tile: at 60 degrees a row of 8 cells spans 4 columns
+    cells = grid_cells(np.array([60.01, 60.01, 60.01]), np.array([0.01, 0.24, 0.26]), subdivisions=8)
+    assert cells[0] == cells[1] != cells[2]
+    # a tile border always separates cells, also across the antimeridian
+    cells = grid_cells(np.array([51.99, 52.01, 0.5, 0.5]), np.array([0.5, 0.5, 179.99, -179.99]), subdivisions=1)
+    assert len(set(cells)) == 4
+
+
+def test_group_stations():
+    groups = group_stations(_stations(DENSE + SPARSE), subdivisions=16, min_cluster_size=3)
+    assert groups == [['0', '1', '2', '3']]
+    assert group_stations(_stations(DENSE[:2]), subdivisions=16) == []
+    assert group_stations([], subdivisions=16) == []
+
+
+def test_cluster_stations_keeps_only_stations_in_range():
+    result = StationQueryResult.from_stations(_stations(DENSE + SPARSE))
+    clusters = cluster_stations(result, [['0', '1', '2', '3']], min_cluster_size=3)
+    assert clusters.singles == ['4', '5'] and clusters.members == [['0', '1', '2', '3']]
+    np.testing.assert_allclose([clusters.lats[0], clusters.lngs[0]], np.mean(DENSE, axis=0))
+
+    # only two members in range: not enough for a cluster
+    partial = StationQueryResult.from_stations(_stations(DENSE)[:2])
+    clusters = cluster_stations(partial, [['0', '1', '2', '3']], min_cluster_size=3)
+    assert clusters.singles == ['0', '1'] and clusters.members == []
+
+
+def test_release_keeps_selected_station_visible():
+    result = StationQueryResult.from_stations(_stations(DENSE[:3]))
+    clusters = cluster_stations(result, [['0', '1', '2']], min_cluster_size=2)
+    released = clusters.release('1')
+    assert released.singles == ['1'] and released.members == [['0', '2']]
+    # the cluster moves to the centroid of the stations it still holds
+    np.testing.assert_allclose([released.lats[0], released.lngs[0]], np.mean([DENSE[0], DENSE[2]], axis=0))
+    assert clusters.members == [['0', '1', '2']]  # the cached clusters are left untouched
+    dissolved = released.release('0')
+    assert dissolved.singles == ['1', '0', '2'] and dissolved.members == [] and dissolved.lats.size == 0
+    assert clusters.release('missing') is clusters and clusters.release(None) is clusters
+
+
+def test_map_cluster_cache_reuses_groups(tile_cache, monkeypatch):
+    cache = MapClusterCache(tile_cache)
+    result = StationQueryResult.from_stations(_stations(DENSE + SPARSE))
+    clusters = cache.clusters(result, 51.5, -0.1, 100)
+    assert clusters.members == [['0', '1', '2', '3']]
+
+    grouped = MagicMock(side_effect=group_stations)
+    monkeypatch.setattr('src.map_clustering.group_stations', grouped)
+    # a nearby query on the same zoom level only reuses the cached groups
+    assert cache.clusters(result, 51.52, -0.11, 90).members == clusters.members
+    grouped.assert_not_called()
+
+
+def test_unclustered():
+    clusters = StationClusters.unclustered(StationQueryResult.from_stations(_stations([(0, 0), (1, 1)])))
+    assert clusters.singles == ['0', '1'] and clusters.counts.size == 0
@@ -0,0 +1,66 @@
+import threading
+import time
+import numpy as np
+import pytest
+from src.station_comparison import compare_stations, load_stations, summarise_stations, StationComparison
+from src.epw_charts import station_comparison_figure
+
+
+@pytest.fixture
+def stations():
+    return [{'_id': f'id-{i}', 'name': f'Station {i}', 'url': f'https://example.com/{i}.zip'} for i in range(3)]
+
+def test_compare_stations(weather_data, stations):
+    def loader(station):
+        if station['_id'] == 'id-1':
+            raise ConnectionError('unavailable')
+        return weather_data
+
+    comparison = compare_stations(stations, loader, max_workers=2)
+
+    assert isinstance(comparison, StationComparison)
+    assert comparison.station_ids == ['id-0', 'id-2']
+    assert comparison.names == ['Station 0', 'Station 2']
+    assert comparison.errors == {'id-1': 'unavailable'}
+    assert comparison.error_names == {'id-1': 'Station 1'}
+    assert 'Not available: Station 1 (unavailable)' in station_comparison_figure(comparison).layout.title.text
+    assert comparison.monthly_mean_temp.shape == (2, 12)
+    np.testing.assert_allclose(comparison.utci_fractions.sum(axis=1), 1.0)
+
+def test_compare_stations_none_loaded(stations):
+    def loader(station):
+        raise ConnectionError('unavailable')
+    assert compare_stations(stations, loader) is None
+
+def test_summarise_stations(weather_data):
+    summary = summarise_stations([weather_data], heating_base=15.5, cooling_base=18.0, percentiles=(50,))
+    temp = np.asarray(weather_data.dry_bulb_temp.values)
+    daily = temp.reshape(365, 24).mean(axis=1)
+
+    assert summary['monthly_mean_temp'][0, 0] == pytest.approx(temp[:31 * 24].mean())
+    assert summary['monthly_mean_temp'][0, 11] == pytest.approx(temp[-31 * 24:].mean())
+    assert summary['temp_percentiles'][0, 0] == pytest.approx(np.median(temp))
+    assert summary['degree_days'][0, 0] == pytest.approx(np.maximum(15.5 - daily, 0).sum())
+    assert summary['degree_days'][0, 1] == pytest.approx(np.maximum(daily - 18.0, 0).sum())
+
+def test_load_stations_is_bounded(stations):
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def loader(station):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return station['name']
+
+    results = load_stations(stations * 2, loader, max_workers=2)
+    assert peak[0] == 2
+    assert list(results.values()) == ['Station 0', 'Station 1', 'Station 2']
+
+def test_station_comparison_figure(weather_data, stations):
+    comparison = compare_stations(stations, lambda station: weather_data)
+    fig = station_comparison_figure(comparison)
+    assert [trace.name for trace in fig.data[:3]] == ['Station 0', 'Station 1', 'Station 2']
+    fig.to_json()
@@ -1,6 +1,11 @@
 import pytest
+import numpy as np
 from unittest.mock import patch, MagicMock
-from src.station_retrieval import MongoEpwStorage
+from pymongo.errors import OperationFailure
+from src import station_retrieval
+from src.station_retrieval import MongoEpwStorage, InMemoryStationIndex, backfill_geo_locations, \
+    get_mongo_client, MongoInstrumentation, STATION_PROJECTION, TileStationCache
+from src.utility import haversine
 
 @pytest.fixture
 def mock_mongo_client(mocker):
@@ -31,3 +36,224 @@ def test_fetch_range_stations(storage):
     stations_in_range = storage.fetch_range_stations(34.05, -118.25, 4000)
     assert len(stations_in_range) == 2
     assert set(station['name'] for station in stations_in_range) == {'Los Angeles', 'New York'}
+
+
+@pytest.fixture
+def geo_storage(mock_mongo_client):
+    mock_mongo_client.index_information.return_value = {
+        '_id_': {'key': [('_id', 1)]},
+        'location_2dsphere': {'key': [('location', '2dsphere')]},
+    }
+    storage = MongoEpwStorage()
+    storage.collection = mock_mongo_client
+    return storage
+
+def test_fetch_range_stations_uses_geo_index(geo_storage):
+    geo_storage.collection.find.return_value = [{'lat': 34.05, 'lng': -118.25, 'name': 'Los Angeles'}]
+    stations_in_range = geo_storage.fetch_range_stations(34.05, -118.25, 63.71)
+    assert [station['name'] for station in stations_in_range] == ['Los Angeles']
+    query = geo_storage.collection.find.call_args[0][0]
+    center, radians = query['location']['$geoWithin']['$centerSphere']
+    assert center == [-118.25, 34.05]
+    assert radians == pytest.approx(0.01)
+
+def test_fetch_closest_station_uses_geo_near(geo_storage):
+    geo_storage.collection.aggregate.return_value = iter([{'name': 'Los Angeles', 'distance': 12.0}])
+    closest_station = geo_storage.fetch_closest_station(34.05, -118.25)
+    assert closest_station['name'] == 'Los Angeles'
+    pipeline = geo_storage.collection.aggregate.call_args[0][0]
+    assert pipeline[0]['$geoNear']['near']['coordinates'] == [-118.25, 34.05]
+    assert pipeline[1] == {'$limit': 1}
+
+def test_geo_query_failure_falls_back_to_scan(geo_storage):
+    geo_storage.collection.find.side_effect = [OperationFailure('no geo index'),
+                                               [{'lat': 34.05, 'lng': -118.25, 'name': 'Los Angeles'}]]
+    stations_in_range = geo_storage.fetch_range_stations(34.05, -118.25, 10)
+    assert [station['name'] for station in stations_in_range] == ['Los Angeles']
+    assert geo_storage.collection.find.call_args[0][0] == {}
+    assert geo_storage.has_geo_index() is False
+
+def test_backfill_geo_locations():
+    collection = MagicMock()
+    collection.update_many.return_value.modified_count = 3
+    assert backfill_geo_locations(collection) == 3
+    update = collection.update_many.call_args[0][1]
+    assert update == [{'$set': {'location': {'type': 'Point', 'coordinates': ['$lng', '$lat']}}}]
+    collection.create_index.assert_called_once_with([('location', '2dsphere')])
+
+
+@pytest.fixture
+def station_documents():
+    return [
+        {'_id': 1, 'lat': 51.50, 'lng': -0.12, 'name': 'London', 'updatedAt': 1},
+        {'_id': 2, 'lat': 51.75, 'lng': -1.25, 'name': 'Oxford', 'updatedAt': 2},
+        {'_id': 3, 'lat': 48.85, 'lng': 2.35, 'name': 'Paris', 'updatedAt': 3},
+        {'_id': 4, 'lat': 40.71, 'lng': -74.00, 'name': 'New York', 'updatedAt': 4},
+    ]
+
+@pytest.fixture
+def station_index(station_documents):
+    collection = MagicMock()
+    collection.find.return_value = list(station_documents)
+    return InMemoryStationIndex(collection=collection, refresh_interval=None)
+
+def test_index_fetch_closest_station(station_index):
+    assert station_index.fetch_closest_station(51.6, -1.0)['name'] == 'Oxford'
+
+def test_index_fetch_nearest_stations(station_index):
+    nearest = station_index.fetch_nearest_stations(51.5, -0.1, k=3)
+    assert [station['name'] for station in nearest] == ['London', 'Oxford', 'Paris']
+
+def test_index_fetch_range_stations_matches_haversine(station_index, station_documents):
+    for radius in (1, 90, 400, 6000):
+        expected = {doc['name'] for doc in station_documents if haversine(-0.12, 51.5, doc['lng'], doc['lat']) <= radius}
+        assert {station['name'] for station in station_index.fetch_range_stations(51.5, -0.12, radius)} == expected
+
+def test_index_refresh_uses_watermark(station_index):
+    station_index.load()
+    station_index.collection.find.return_value = [{'_id': 5, 'lat': 52.2, 'lng': 0.12, 'name': 'Cambridge', 'updatedAt': 5}]
+    assert station_index.refresh() == 1
+    assert station_index.collection.find.call_args[0][0] == {'updatedAt': {'$gt': 4}}
+    assert station_index.fetch_closest_station(52.2, 0.1)['name'] == 'Cambridge'
+
+def test_index_apply_change_delete(station_index):
+    station_index.load()
+    station_index.apply_change({'operationType': 'delete', 'documentKey': {'_id': 2}})
+    assert station_index.fetch_closest_station(51.75, -1.25)['name'] == 'London'
+
+def test_index_query_survives_concurrent_delete(station_index):
+    station_index.load()
+    snapshot = station_index._snapshot
+
+    def snapshot_then_delete():
+        result = snapshot()
+        station_index.apply_change({'operationType': 'delete', 'documentKey': {'_id': 2}})
+        return result
+
+    station_index._snapshot = snapshot_then_delete
+    # the query answers from the snapshot taken before the delete instead of failing on the deleted document
+    assert 'Oxford' in {station['name'] for station in station_index.fetch_range_stations(51.6, -0.7, 100)}
+    station_index._snapshot = snapshot
+    assert station_index.fetch_closest_station(51.75, -1.25)['name'] == 'London'
+
+def test_index_reloads_to_drop_deleted_documents(station_index, station_documents, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr('src.station_retrieval.time.monotonic', lambda: now[0])
+    station_index.reload_interval = 3600
+    station_index.load()
+    station_index.collection.find.return_value = station_documents[:1]
+    now[0] += 3601
+    assert station_index.refresh() == 1
+    assert station_index.collection.find.call_args[0][0] == {}
+    assert station_index.fetch_closest_station(51.75, -1.25)['name'] == 'London'
+
+def test_index_without_watermark_reloads(station_documents):
+    collection = MagicMock()
+    collection.find.return_value = [{key: value for key, value in doc.items() if key != 'updatedAt'}
+                                    for doc in station_documents]
+    index = InMemoryStationIndex(collection=collection, refresh_interval=None)
+    index.load()
+    collection.find.return_value = collection.find.return_value[:2]
+    assert index.refresh() == 2
+    assert collection.find.call_args[0][0] == {}
+
+def test_index_empty_collection():
+    collection = MagicMock()
+    collection.find.return_value = []
+    index = InMemoryStationIndex(collection=collection, refresh_interval=None)
+    assert index.fetch_closest_station(0, 0) is None
+    assert index.fetch_range_stations(0, 0, 100) == []
+
+
+def test_queries_project_station_fields(geo_storage):
+    geo_storage.collection.find.return_value = []
+    geo_storage.fetch_range_stations(34.05, -118.25, 10)
+    args, kwargs = geo_storage.collection.find.call_args
+    assert args[1] == STATION_PROJECTION
+    assert kwargs['batch_size'] == geo_storage.batch_size
+    assert '_id' not in STATION_PROJECTION and 'name' in STATION_PROJECTION
+
+def test_get_mongo_client_is_shared_and_reads_env(monkeypatch):
+    monkeypatch.setattr(station_retrieval, '_mongo_client', None)
+    monkeypatch.setenv('MONGODB_URI', 'mongodb://example.com:27017')
+    with patch('src.station_retrieval.MongoClient') as mock_client:
+        first = get_mongo_client()
+        assert get_mongo_client() is first
+    mock_client.assert_called_once()
+    args, kwargs = mock_client.call_args
+    assert args[0] == 'mongodb://example.com:27017'
+    assert kwargs['readPreference'] == 'secondaryPreferred'
+    assert kwargs['serverSelectionTimeoutMS'] > 0
+
+def test_instrumentation_hook_reports_queries_and_connections():
+    events = []
+    instrumentation = MongoInstrumentation(hook=lambda kind, stats: events.append((kind, stats)))
+    instrumentation.succeeded(MagicMock(command_name='find', database_name='dandelion', duration_micros=2500,
+                                        reply={'cursor': {'firstBatch': [{}, {}, {}]}}))
+    instrumentation.connection_ready(MagicMock(address=('example.com', 27017), duration=0.12))
+
+    assert events[0] == ('command', {'command': 'find', 'database': 'dandelion', 'duration_ms': 2.5, 'documents': 3})
+    assert events[1][0] == 'connection'
+    assert events[1][1]['duration_ms'] == pytest.approx(120)
+
+
+class ListRetrieval(InMemoryStationIndex):
+    """Station index over a fixed list of stations, counting the range queries."""
+
+    def __init__(self, stations):
+        collection = MagicMock()
+        collection.find.return_value = stations
+        super().__init__(collection=collection, refresh_interval=None)
+        self.range_queries = 0
+
+    def fetch_range_stations(self, lat, lng, radius=10):
+        self.range_queries += 1
+        return super().fetch_range_stations(lat, lng, radius)
+
+@pytest.fixture
+def grid_stations():
+    rng = np.random.default_rng(1)
+    lats, lngs = rng.uniform(48, 56, 400), rng.uniform(-4, 4, 400)
+    stations = [{'_id': i, 'lat': lat, 'lng': lng, 'name': f'station {i}'} for i, (lat, lng) in enumerate(zip(lats, lngs))]
+    # a few stations on both sides of the antimeridian
+    stations += [{'_id': 400 + i, 'lat': -17.0, 'lng': lng, 'name': f'pacific {i}'}
+                 for i, lng in enumerate((179.8, -179.9, 179.5))]
+    return stations
+
+@pytest.mark.parametrize("lat, lng, radius", [(52.0, 0.0, 10), (52.3, 0.7, 100), (55.9, -3.9, 60), (-17.0, 179.9, 50)])
+def test_tile_cache_matches_direct_query(grid_stations, lat, lng, radius):
+    retrieval = ListRetrieval(grid_stations)
+    cache = TileStationCache(retrieval, tile_degrees=0.5)
+    expected = retrieval.fetch_range_stations(lat, lng, radius)
+    result = cache.fetch_range_stations(lat, lng, radius)
+
+    assert sorted(station['_id'] for station in result) == sorted(station['_id'] for station in expected)
+    distances = [haversine(lng, lat, station['lng'], station['lat']) for station in result]
+    assert distances == sorted(distances)
+
+def test_tile_cache_reuses_tiles_for_nearby_queries(grid_stations):
+    retrieval = ListRetrieval(grid_stations)
+    cache = TileStationCache(retrieval, tile_degrees=1.0)
+    cache.fetch_range_stations(52.0, 0.0, 20)
+    queries = retrieval.range_queries
+
+    cache.fetch_range_stations(52.01, 0.02, 25)
+    cache.fetch_range_stations(52.1, -0.05, 15)
+    assert retrieval.range_queries == queries
+
+def test_tile_cache_ttl_and_size(grid_stations, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr('src.caching.time.monotonic', lambda: now[0])
+    retrieval = ListRetrieval(grid_stations)
+    cache = TileStationCache(retrieval, tile_degrees=1.0, ttl=60, maxsize=2)
+    cache.fetch_range_stations(52.5, 0.5, 5)
+    queries = retrieval.range_queries
+
+    now[0] += 61
+    cache.fetch_range_stations(52.5, 0.5, 5)
+    assert retrieval.range_queries == queries + 1
+    assert len(cache._tiles) <= 2
+
+def test_covering_tiles_near_pole():
+    cache = TileStationCache(MagicMock(), tile_degrees=10)
+    assert len(cache.covering_tiles(89.5, 0.0, 100)) == 36
@@ -1,6 +1,8 @@
 import numpy as np
 import pytest
-from src.utility import valid_range, haversine
+from src.utility import (valid_range, haversine, haversine_many, haversine_matrix, utci_optimised,
+                         saturation_vapour_pressure, vapour_pressure, dew_point, humidity_ratio, enthalpy,
+                         destination_points, circle_vertex_count, geodesic_circle)
 
 def test_all_elements_valid():
     x = np.array([1, 2, 3, 4])
@@ -45,4 +47,123 @@ def test_distance_to_same_point():
 
 def test_invalid_input():
     with pytest.raises(TypeError):
-        haversine('not a number', 'not a number', 'not a number', 'not a number')
\ No newline at end of file
+        haversine('not a number', 'not a number', 'not a number', 'not a number')
+
+def test_haversine_many_matches_scalar():
+    lats = np.array([51.5074, 40.7128, -33.8688, 35.6762])
+    lngs = np.array([-0.1278, -74.0060, 151.2093, 139.6503])
+    expected = [haversine(-74.0060, 40.7128, lng, lat) for lat, lng in zip(lats, lngs)]
+    np.testing.assert_allclose(haversine_many(40.7128, -74.0060, lats, lngs), expected)
+
+def test_haversine_many_chunking_and_float32():
+    rng = np.random.default_rng(0)
+    lats, lngs = rng.uniform(-90, 90, 1000), rng.uniform(-180, 180, 1000)
+    full = haversine_many(10.0, 20.0, lats, lngs)
+    np.testing.assert_allclose(haversine_many(10.0, 20.0, lats, lngs, chunk_size=7), full)
+    single = haversine_many(10.0, 20.0, lats, lngs, dtype=np.float32)
+    assert single.dtype == np.float32
+    np.testing.assert_allclose(single, full, atol=1.0)
+
+def test_haversine_matrix():
+    lats1, lngs1 = np.array([0.0, 51.5074]), np.array([0.0, -0.1278])
+    lats2, lngs2 = np.array([0.0, 40.7128, 51.5074]), np.array([1.0, -74.0060, -0.1278])
+    matrix = haversine_matrix(lats1, lngs1, lats2, lngs2, chunk_size=1)
+    assert matrix.shape == (2, 3)
+    for i in range(2):
+        np.testing.assert_allclose(matrix[i], haversine_many(lats1[i], lngs1[i], lats2, lngs2))
+
+# Reference values of the expanded UTCI polynomial: (tdb, v, delta_t_tr, pa) -> utci
+UTCI_REFERENCE = [
+    ((25.0, 1.5, 5.0, 1.9), 26.225608040755727),
+    ((-20.0, 8.0, -5.0, 0.1), -47.133318143298396),
+    ((35.0, 0.5, 30.0, 3.5), 45.44567693421677),
+    ((10.0, 4.0, 15.0, 1.0), 7.874626251187958),
+    ((0.0, 12.0, 0.0, 0.5), -28.993687606520247),
+]
+
+def test_utci_matches_reference_values():
+    for inputs, expected in UTCI_REFERENCE:
+        assert utci_optimised(*inputs) == pytest.approx(expected, abs=1e-9)
+
+def test_utci_vectorised_matches_scalar():
+    inputs = np.array([inputs for inputs, _ in UTCI_REFERENCE]).T
+    expected = [utci for _, utci in UTCI_REFERENCE]
+    np.testing.assert_allclose(utci_optimised(*inputs, chunk_size=2), expected, atol=1e-9)
+    np.testing.assert_allclose(utci_optimised(*inputs, dtype=np.float32), expected, atol=1e-2)
+
+def test_utci_out_buffer_and_broadcasting():
+    tdb = np.array([[25.0, 10.0], [0.0, -20.0]])
+    out = np.empty((2, 2))
+    result = utci_optimised(tdb, 1.5, 5.0, 1.0, out=out)
+    assert result is out
+    for index in np.ndindex(tdb.shape):
+        assert out[index] == pytest.approx(utci_optimised(tdb[index], 1.5, 5.0, 1.0))
+    with pytest.raises(ValueError):
+        utci_optimised(tdb, 1.5, 5.0, 1.0, out=np.empty(3))
+
+def _saturation_vapour_pressure_term_by_term(t_db):
+    g = [-2836.5744, -6028.076559, 19.54263612, -0.02737830188, 0.000016261698, 7.0229056e-10, -1.8680009e-13]
+    tk = t_db + 273.15
+    es = 2.7150305 * np.log1p(tk)
+    for count, i in enumerate(g):
+        es = es + (i * np.power(tk, count - 2))
+    return np.exp(es) * 0.01
+
+def test_saturation_vapour_pressure_matches_series():
+    t_db = np.linspace(-50, 50, 501)
+    np.testing.assert_allclose(saturation_vapour_pressure(t_db), _saturation_vapour_pressure_term_by_term(t_db), rtol=1e-12)
+    assert saturation_vapour_pressure(20.0) == pytest.approx(_saturation_vapour_pressure_term_by_term(20.0), rel=1e-12)
+
+def test_saturation_vapour_pressure_buffers():
+    t_db = np.linspace(-10, 40, 24)
+    out, work = np.empty(24), np.empty(24)
+    assert saturation_vapour_pressure(t_db, out=out, work=work) is out
+    np.testing.assert_allclose(out, _saturation_vapour_pressure_term_by_term(t_db), rtol=1e-12)
+    with pytest.raises(ValueError):
+        saturation_vapour_pressure(t_db, out=np.empty(3))
+
+def test_dew_point_inverts_vapour_pressure():
+    t_db = np.linspace(-30, 45, 76)
+    rh = np.linspace(5, 100, 76)
+    td = dew_point(t_db, rh)
+    np.testing.assert_allclose(saturation_vapour_pressure(td), vapour_pressure(t_db, rh), rtol=1e-9)
+    assert dew_point(20.0, 100.0) == pytest.approx(20.0)
+
+def test_humidity_ratio_and_enthalpy():
+    pw = vapour_pressure(20.0, 50.0) * 100
+    w = 0.621945 * pw / (101325 - pw)
+    assert humidity_ratio(20.0, 50.0) == pytest.approx(w)
+    assert enthalpy(20.0, 50.0) == pytest.approx(1.006 * 20 + w * (2501 + 1.86 * 20))
+    np.testing.assert_allclose(humidity_ratio(np.array([10.0, 20.0]), 50.0, pressure=90000.0),
+                               [humidity_ratio(10.0, 50.0, 90000.0), humidity_ratio(20.0, 50.0, 90000.0)])
+    assert humidity_ratio(20.0, 0.0) == 0.0
+
+def test_destination_points_lie_on_the_circle():
+    bearings = np.arange(0, 360, 15)
+    lats, lngs = destination_points(51.5, -0.12, 25, bearings)
+    np.testing.assert_allclose(haversine_many(51.5, -0.12, lats, lngs), 25, rtol=1e-9)
+    assert lats[0] > 51.5 and lngs[6] > -0.12  # north first, then east
+
+def test_destination_points_wrap_the_antimeridian():
+    _, lngs = destination_points(0.0, 179.95, 20, [90])
+    assert -180 <= lngs[0] < -179.5
+
+def test_circle_vertex_count_adapts_to_radius():
+    assert circle_vertex_count(0) == 16
+    counts = [circle_vertex_count(radius) for radius in (1, 10, 100)]
+    assert counts == sorted(counts) and counts[0] < counts[-1] <= 360
+
+def test_geodesic_circle_matches_ellipsoidal_solution():
+    spherical = np.array(geodesic_circle(51.5, -0.12, 50, vertices=36))
+    ellipsoidal = np.array(geodesic_circle(51.5, -0.12, 50, vertices=36, method='geodesic'))
+    offsets = haversine_many(spherical[:, 0], spherical[:, 1], ellipsoidal[:, 0], ellipsoidal[:, 1])
+    assert offsets.max() < 0.005 * 50
+
+def test_geodesic_circle_is_cached():
+    first = geodesic_circle(40.0, 10.0, 5)
+    assert geodesic_circle(40.000001, 10.000001, 5) == first
+    assert len(first) == circle_vertex_count(5) and isinstance(first[0], tuple)
+
+def test_geodesic_circle_invalid_method():
+    with pytest.raises(ValueError):
+        geodesic_circle(0, 0, 1, method='flat')
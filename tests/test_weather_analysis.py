@@ -1,7 +1,10 @@
 import pytest
 import json
+import os
+import numpy as np
+from ladybug.analysisperiod import AnalysisPeriod
 from unittest.mock import patch, MagicMock
-from src.weather_analysis import UTCICalculator
+from src.weather_analysis import UTCICalculator, CategoryBins, load_categories, compile_categories
 from src.data_objects import WeatherData
 
 @pytest.fixture
@@ -42,3 +45,147 @@ def test_utci_calculator(weather_data):
     assert 'comfort_rating' in result
     assert result['stress_category'] == "extreme cold stress"
     assert result['comfort_rating'] == "very uncomfortable"
+
+
+@pytest.fixture
+def hourly_weather_data():
+    hours = np.arange(8760)
+    return WeatherData(
+        dry_bulb_temp=MagicMock(values=10 + 10 * np.sin(hours / 24 * 2 * np.pi)),
+        wind_speed=MagicMock(values=(hours * 7) % 13 / 2),
+        wind_direction=MagicMock(),
+        relative_humidity=MagicMock(values=40.0 + (hours * 11) % 50),
+        radiant_temp=MagicMock(values=np.full(8760, 15.0)),
+        total_sky_cover=MagicMock()
+    )
+
+def test_utci_calculator_hourly(hourly_weather_data, mock_categories):
+    calculator = UTCICalculator(hourly_weather_data)
+    result = calculator.calculate_hourly()
+
+    assert isinstance(result['utci'], np.ndarray)
+    assert result['utci'].shape == (8760,)
+    assert result['stress_category'].shape == (8760,)
+    for hour in (0, 6, 4000):
+        single = UTCICalculator(WeatherData(
+            dry_bulb_temp=MagicMock(average=hourly_weather_data.dry_bulb_temp.values[hour]),
+            wind_speed=MagicMock(average=hourly_weather_data.wind_speed.values[hour]),
+            wind_direction=MagicMock(),
+            relative_humidity=MagicMock(average=hourly_weather_data.relative_humidity.values[hour]),
+            radiant_temp=MagicMock(average=hourly_weather_data.radiant_temp.values[hour]),
+            total_sky_cover=MagicMock()
+        )).calculate()
+        assert result['utci'][hour] == pytest.approx(single['utci'], abs=1e-5)
+        assert result['stress_category'][hour] == single['stress_category']
+        assert result['comfort_rating'][hour] == single['comfort_rating']
+
+def test_utci_calculator_hourly_analysis_period(hourly_weather_data, mock_categories):
+    calculator = UTCICalculator(hourly_weather_data)
+    period = AnalysisPeriod(st_month=6, end_month=8)
+    result = calculator.calculate_hourly(period)
+
+    hours = np.asarray(period.hoys, dtype=int)
+    assert result['utci'].shape == (len(hours),)
+    np.testing.assert_allclose(result['utci'], calculator.calculate_hourly()['utci'][hours])
+
+def test_utci_calculator_analysis_period_aligns_leap_years(mock_categories):
+    hours = np.arange(8784, dtype=np.float64)
+    leap_data = WeatherData(dry_bulb_temp=MagicMock(values=hours), wind_speed=MagicMock(values=np.full(8784, 1.0)),
+                            wind_direction=MagicMock(), relative_humidity=MagicMock(values=np.full(8784, 50.0)),
+                            radiant_temp=MagicMock(values=np.full(8784, 20.0)), total_sky_cover=MagicMock())
+    calculator = UTCICalculator(leap_data)
+    march = calculator._hourly_inputs(leap_data, AnalysisPeriod(st_month=3, end_month=3))[0]
+    assert march[0] == 60 * 24 and march.size == 31 * 24  # skips the 29th of February
+
+    with pytest.raises(ValueError):
+        calculator.calculate_hourly(AnalysisPeriod(st_month=3, end_month=3, timestep=2))
+
+def test_utci_calculator_analysis_period_rejects_missing_hours(hourly_weather_data, mock_categories):
+    calculator = UTCICalculator(hourly_weather_data)
+    with pytest.raises(ValueError):
+        calculator.calculate_hourly(AnalysisPeriod(st_month=2, end_month=2, end_day=29, is_leap_year=True))
+    hourly_weather_data.dry_bulb_temp.values = np.arange(4380.0)
+    with pytest.raises(ValueError):
+        calculator.calculate_hourly(AnalysisPeriod(st_month=6, end_month=8))
+
+def test_utci_calculator_clamps_wind_and_masks_missing_hours(weather_data, mock_categories):
+    calculator = UTCICalculator(weather_data)
+    result = calculator.calculate_arrays(20.0, 25.0, np.array([0.1, 0.5, 17.0, 30.0, 999.0]), 50.0)
+    utci = result['utci']
+    assert utci[0] == utci[1] and utci[3] == utci[2]
+    assert np.isnan(utci[4]) and not np.isnan(utci[:4]).any()
+    assert result['stress_category'][4] == 'unknown'
+    assert calculator.category_hours(utci)['counts'][-1] == 1
+
+def test_utci_calculator_stations(hourly_weather_data, mock_categories):
+    calculator = UTCICalculator(hourly_weather_data)
+    result = calculator.calculate_stations([hourly_weather_data, hourly_weather_data])
+
+    assert result['utci'].shape == (2, 8760)
+    np.testing.assert_allclose(result['utci'][1], calculator.calculate_hourly()['utci'])
+
+def test_category_bins_first_match():
+    categories = {"-13, null": "cold", "0, 9": "neutral", "26, null": "hot", "null, -40": "frozen"}
+    bins = CategoryBins.from_dict(categories)
+    values = np.array([-50.0, -40.0, -20.0, -13.0, -12.0, 0.0, 5.0, 9.0, 30.0, np.nan])
+    calculator = UTCICalculator.__new__(UTCICalculator)
+    calculator.category_bins = {'TABLE': bins}
+
+    expected = [calculator._get_category(value, 'TABLE') for value in values]
+    assert bins.classify(values).tolist() == expected
+    assert expected == ["frozen", "frozen", "unknown", "unknown", "cold", "cold", "cold", "cold", "cold", "unknown"]
+
+def test_category_bins_matches_scalar_lookup(mock_categories):
+    calculator = UTCICalculator(MagicMock())
+    values = np.linspace(-60, 60, 1201)
+    for table, category_dict in calculator.categories.items():
+        expected = []
+        for value in values:
+            label = "unknown"
+            for key, category in category_dict.items():
+                lower, upper = key.split(', ')
+                if (lower == "null" or value > float(lower)) and (upper == "null" or value <= float(upper)):
+                    label = category
+                    break
+            expected.append(label)
+        assert calculator.category_bins[table].classify(values).tolist() == expected
+
+def test_category_hours(mock_categories):
+    calculator = UTCICalculator(MagicMock())
+    utci = np.array([[-20.0, -5.0, 10.0, 30.0], [5.0, 5.0, 5.0, -20.0]])
+    summary = calculator.category_hours(utci)
+
+    assert summary['labels'].tolist() == ["extreme cold stress", "no thermal stress", "moderate heat stress",
+                                          "extreme heat stress", "unknown"]
+    assert summary['counts'].tolist() == [[3, 0, 0, 0, 1], [3, 0, 0, 0, 1]]
+    np.testing.assert_allclose(summary['fractions'][0], [0.75, 0, 0, 0, 0.25])
+
+def test_load_categories_is_cached_and_independent_of_cwd(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = load_categories()
+    assert 'STRESS_CATEGORIES' in first
+
+    with patch('builtins.open', side_effect=AssertionError("categories read again")):
+        assert load_categories() is first
+        calculator = UTCICalculator(MagicMock())
+    assert calculator.categories is first
+    assert calculator.category_bins is compile_categories(first)
+
+def test_load_categories_reload_on_change(tmp_path):
+    path = tmp_path / 'categories.json'
+    path.write_text(json.dumps({"STRESS_CATEGORIES": {"null, 0": "cold"}}))
+    first = load_categories(str(path))
+
+    path.write_text(json.dumps({"STRESS_CATEGORIES": {"null, 0": "freezing"}}))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+
+    assert load_categories(str(path)) is first
+    reloaded = load_categories(str(path), reload_on_change=True)
+    assert reloaded["STRESS_CATEGORIES"] == {"null, 0": "freezing"}
+    assert load_categories(str(path)) is reloaded
+
+def test_compile_categories_is_bounded():
+    from src.weather_analysis import _compiled_bins
+    for upper in range(_compiled_bins.maxsize + 5):
+        compile_categories({"STRESS_CATEGORIES": {f"null, {upper}": "cold", f"{upper}, null": "warm"}})
+    assert len(_compiled_bins) == _compiled_bins.maxsize
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from ladybug.location import Location
+from src.data_objects import HourlyArray
+from src.wind_analysis import WindAnalysis, MONTH_NAMES
+
+
+@pytest.fixture
+def analysis(weather_data):
+    return WindAnalysis(weather_data, sectors=8, speed_bands=(0, 2, 4))
+
+def test_annual_rose_matches_wind_stats(weather_data, analysis):
+    rose = analysis.rose()
+    stats = weather_data.get_wind_stats(sectors=8, speed_bands=(0, 2, 4))
+
+    np.testing.assert_array_equal(rose.band_frequency, stats.band_frequency)
+    np.testing.assert_allclose(rose.average_speed, stats.average_speed)
+    assert rose.labels == stats.labels
+
+def test_monthly_and_seasonal_roses_partition_the_year(analysis):
+    monthly = analysis.monthly_roses()
+    seasonal = analysis.seasonal_roses()
+    annual = analysis.rose().band_frequency
+
+    assert list(monthly) == list(MONTH_NAMES)
+    assert monthly['Jan'].frequency.sum() == 31 * 24
+    np.testing.assert_array_equal(sum(rose.band_frequency for rose in monthly.values()), annual)
+    np.testing.assert_array_equal(sum(rose.band_frequency for rose in seasonal.values()), annual)
+    assert seasonal['Summer'].frequency.sum() == (30 + 31 + 31) * 24
+
+def test_rose_slice_matches_filtered_hours(weather_data, analysis):
+    directions = np.asarray(weather_data.wind_direction.values)
+    speeds = np.asarray(weather_data.wind_speed.values)
+    hours = np.arange(8760) % 24
+    february = (np.arange(8760) >= 31 * 24) & (np.arange(8760) < 59 * 24)
+    selected = february & (hours >= 6) & (hours < 18)
+
+    rose = analysis.rose(months=[2], hours=range(6, 18))
+    north = (directions >= 337.5) | (directions < 22.5)
+    assert rose.frequency.sum() == selected.sum()
+    assert rose.frequency[0] == (selected & north).sum()
+    assert rose.average_speed[0] == pytest.approx(speeds[selected & north].mean())
+
+def test_diurnal_roses(analysis):
+    diurnal = analysis.diurnal_roses()
+    assert diurnal['Day'].frequency.sum() == 365 * 12
+    assert diurnal['Night'].frequency.sum() == 365 * 12
+
+def test_southern_hemisphere_seasons(weather_data):
+    weather_data.location = Location(latitude=-33.9)
+    seasonal = WindAnalysis(weather_data).seasonal_roses()
+    assert seasonal['Summer'].frequency.sum() == (31 + 31 + 28) * 24
+
+def test_render_slice(analysis):
+    from src.epw_charts import wind_rose_figure
+    fig = wind_rose_figure(analysis.monthly_roses()['Jul'], title='Wind Rose - July')
+    assert fig.layout.title.text == 'Wind Rose - July'
+    assert len(fig.data) == 3
+
+def test_missing_wind_hours_are_excluded(weather_data):
+    weather_data.wind_direction = HourlyArray.from_collection(weather_data.wind_direction)
+    weather_data.wind_speed = HourlyArray.from_collection(weather_data.wind_speed)
+    weather_data.wind_direction.values[:24] = 999  # the 1st of January
+    weather_data.wind_speed.values[24:30] = 999
+    analysis = WindAnalysis(weather_data, sectors=8, speed_bands=(0, 2, 4))
+
+    assert analysis.counts.sum() == 8760 - 30
+    assert analysis.monthly_roses()['Jan'].frequency.sum() == 31 * 24 - 30
+    speeds = np.asarray(weather_data.wind_speed.values)
+    assert analysis.rose().band_frequency[:, -1].sum() == ((speeds[30:] >= 4) & (speeds[30:] < 999)).sum()
+    assert np.nanmax(analysis.rose().average_speed) < 999